@@ -0,0 +1,20 @@
+from django.contrib import admin
+from .models import Watchlist, PriceAlert, Notification
+
+@admin.register(Watchlist)
+class WatchlistAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'account', 'created_at', 'updated_at')
+    ordering = ('name',)
+
+@admin.register(PriceAlert)
+class PriceAlertAdmin(admin.ModelAdmin):
+    list_display = ('id', 'account', 'symbol', 'direction', 'threshold', 'active', 'triggered_at')
+    list_filter = ('direction', 'active')
+    search_fields = ('symbol',)
+    ordering = ('symbol', 'threshold')
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'account', 'message', 'read', 'created_at')
+    list_filter = ('read',)
+    ordering = ('-created_at',)
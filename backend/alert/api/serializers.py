@@ -0,0 +1,44 @@
+from rest_framework import serializers
+from alert.models import Watchlist, PriceAlert, Notification
+
+class WatchlistSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Watchlist
+        fields = '__all__'
+        read_only_fields = ['id', 'account', 'created_at', 'updated_at']
+
+    def validate_symbols(self, symbols):
+        if not isinstance(symbols, list) or not all(isinstance(symbol, str) and symbol.strip() for symbol in symbols):
+            raise serializers.ValidationError("Provide a list of symbols.")
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols))
+        if len(symbols) > 100:
+            raise serializers.ValidationError("At most 100 symbols are allowed.")
+        if any(len(symbol) > 50 for symbol in symbols):
+            raise serializers.ValidationError("Symbols are at most 50 characters.")
+        return symbols
+
+class PriceAlertSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PriceAlert
+        fields = '__all__'
+        read_only_fields = ['id', 'account', 'active', 'triggered_at', 'created_at', 'updated_at']
+
+    def validate_symbol(self, symbol):
+        return symbol.strip().upper()
+
+    def validate_threshold(self, threshold):
+        if threshold <= 0:
+            raise serializers.ValidationError("Threshold must be positive.")
+        return threshold
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'message', 'symbol', 'price', 'alert', 'read', 'created_at']
+
+class NotificationQuerySerializer(serializers.Serializer):
+    unread = serializers.BooleanField(required=False, default=False)
+    limit = serializers.IntegerField(required=False, default=50, min_value=1, max_value=200)
+
+class NotificationReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
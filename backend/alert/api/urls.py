@@ -0,0 +1,24 @@
+from django.urls import path
+from .views import (watchlist_create,
+                    watchlist_list,
+                    watchlist_get,
+                    watchlist_update,
+                    watchlist_delete,
+                    alert_create,
+                    alert_list,
+                    alert_delete,
+                    notification_list,
+                    notification_read)
+
+urlpatterns = [
+    path('watchlist/create/', watchlist_create, name='watchlist-create'),
+    path('watchlist/list/', watchlist_list, name='watchlist-list'),
+    path('watchlist/<int:pk>/get/', watchlist_get, name='watchlist-get'),
+    path('watchlist/<int:pk>/update/', watchlist_update, name='watchlist-update'),
+    path('watchlist/<int:pk>/delete/', watchlist_delete, name='watchlist-delete'),
+    path('create/', alert_create, name='alert-create'),
+    path('list/', alert_list, name='alert-list'),
+    path('<int:pk>/delete/', alert_delete, name='alert-delete'),
+    path('notifications/', notification_list, name='notification-list'),
+    path('notifications/read/', notification_read, name='notification-read'),
+]
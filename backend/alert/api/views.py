@@ -0,0 +1,132 @@
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.authentication import TokenAuthentication
+from django.shortcuts import get_object_or_404
+from account.models import Account
+from .serializers import WatchlistSerializer, PriceAlertSerializer, NotificationSerializer, NotificationQuerySerializer, NotificationReadSerializer
+from alert.models import Watchlist, PriceAlert, Notification
+from finance.helpers import get_stock_prices
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def watchlist_create(request):
+    account = get_object_or_404(Account, pk=request.user.pk)
+    watchlist = WatchlistSerializer(data=request.data)
+    if watchlist.is_valid():
+        watchlist.save(account=account)
+        return Response(watchlist.data, status=status.HTTP_201_CREATED)
+    return Response(watchlist.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def watchlist_list(request):
+    account = get_object_or_404(Account, pk=request.user.pk)
+    watchlists = Watchlist.objects.filter(account=account)
+    serializer = WatchlistSerializer(watchlists, many=True)
+    return Response(serializer.data)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def watchlist_get(request, pk):
+    """
+    A watchlist with the current price of each of its symbols, fetched with one batch request.
+    URL: /alert/watchlist/<id>/get/
+    """
+    account = get_object_or_404(Account, pk=request.user.pk)
+    watchlist = get_object_or_404(Watchlist, pk=pk, account=account)
+    prices = get_stock_prices(watchlist.symbols) if watchlist.symbols else {}
+    return Response({**WatchlistSerializer(watchlist).data, "prices": prices})
+
+@api_view(['PUT'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def watchlist_update(request, pk):
+    account = get_object_or_404(Account, pk=request.user.pk)
+    watchlist = get_object_or_404(Watchlist, pk=pk, account=account)
+    serializer = WatchlistSerializer(watchlist, data=request.data, partial=True)
+    if serializer.is_valid():
+        serializer.save()
+        return Response(serializer.data)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['DELETE'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def watchlist_delete(request, pk):
+    account = get_object_or_404(Account, pk=request.user.pk)
+    watchlist = get_object_or_404(Watchlist, pk=pk, account=account)
+    watchlist.delete()
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def alert_create(request):
+    """
+    Creates a one-shot alert, notified the first time the price is at or above/below the threshold.
+    URL: /alert/create/ {"symbol": "AAPL", "direction": "above", "threshold": "250"}
+    """
+    account = get_object_or_404(Account, pk=request.user.pk)
+    alert = PriceAlertSerializer(data=request.data)
+    if alert.is_valid():
+        alert.save(account=account)
+        return Response(alert.data, status=status.HTTP_201_CREATED)
+    return Response(alert.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def alert_list(request):
+    account = get_object_or_404(Account, pk=request.user.pk)
+    alerts = PriceAlert.objects.filter(account=account).order_by('symbol', 'threshold')
+    serializer = PriceAlertSerializer(alerts, many=True)
+    return Response(serializer.data)
+
+@api_view(['DELETE'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def alert_delete(request, pk):
+    account = get_object_or_404(Account, pk=request.user.pk)
+    alert = get_object_or_404(PriceAlert, pk=pk, account=account)
+    alert.delete()
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def notification_list(request):
+    """
+    The user's latest notifications, newest first.
+    URL: /alert/notifications/?unread=true&limit=50 (both optional)
+    """
+    query = NotificationQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    notifications = Notification.objects.filter(account_id=request.user.pk)
+    if query.validated_data['unread']:
+        notifications = notifications.filter(read=False)
+    serializer = NotificationSerializer(notifications[:query.validated_data['limit']], many=True)
+    return Response(serializer.data)
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def notification_read(request):
+    """
+    Marks the given notifications (all of them without ids) as read.
+    URL: /alert/notifications/read/ {"ids": [1, 2]}
+    """
+    query = NotificationReadSerializer(data=request.data)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    notifications = Notification.objects.filter(account_id=request.user.pk, read=False)
+    if 'ids' in query.validated_data:
+        notifications = notifications.filter(pk__in=query.validated_data['ids'])
+    return Response({"updated": notifications.update(read=True)}, status=status.HTTP_200_OK)
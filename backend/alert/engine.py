@@ -0,0 +1,254 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from alert.models import Notification, PriceAlert
+from finance.helpers import get_stock_prices
+from portfolio.engine import raw_columns
+
+ALERT_DEFAULTS = {
+    'INTERVAL': 60,
+    'BATCH_SIZE': 5000,
+    'SYNC_OVERLAP': 60,
+}
+
+
+def alert_settings():
+    return {**ALERT_DEFAULTS, **getattr(settings, 'PRICE_ALERTS', {})}
+
+
+class SymbolAlerts:
+    """
+    The active alerts of one symbol, as two lists of (threshold, alert id)
+    sorted by threshold: 'above' alerts fire for thresholds <= price (a
+    prefix of the list), 'below' alerts for thresholds >= price (a suffix).
+    """
+
+    __slots__ = ('above', 'above_ids', 'below', 'below_ids')
+
+    def __init__(self):
+        self.above, self.above_ids = [], []
+        self.below, self.below_ids = [], []
+
+    def __len__(self):
+        return len(self.above) + len(self.below)
+
+    def extend(self, direction, thresholds, ids):
+        current, current_ids = self.side(direction)
+        merged = sorted(zip(current + thresholds, current_ids + ids))
+        values = [threshold for threshold, _ in merged], [alert_id for _, alert_id in merged]
+        if direction == 'above':
+            self.above, self.above_ids = values
+        else:
+            self.below, self.below_ids = values
+
+    def side(self, direction):
+        return (self.above, self.above_ids) if direction == 'above' else (self.below, self.below_ids)
+
+    def remove(self, direction, threshold, alert_id):
+        thresholds, ids = self.side(direction)
+        i = bisect_left(thresholds, threshold)
+        while i < len(thresholds) and thresholds[i] == threshold:
+            if ids[i] == alert_id:
+                del thresholds[i], ids[i]
+                return
+            i += 1
+
+    def discard(self, direction, alert_ids):
+        """
+        Removes a set of alert ids from one side in a single pass.
+        """
+        thresholds, ids = self.side(direction)
+        kept = [(threshold, alert_id) for threshold, alert_id in zip(thresholds, ids) if alert_id not in alert_ids]
+        values = [threshold for threshold, _ in kept], [alert_id for _, alert_id in kept]
+        if direction == 'above':
+            self.above, self.above_ids = values
+        else:
+            self.below, self.below_ids = values
+
+    def crossed(self, price):
+        """
+        The ids of the alerts `price` triggers: two bisects and a slice,
+        whatever the number of alerts.
+        """
+        above = bisect_right(self.above, price)
+        below = bisect_left(self.below, price)
+        return self.above_ids[:above] + self.below_ids[below:]
+
+
+class AlertIndex:
+    """
+    In-process index of the active price alerts by symbol (see SymbolAlerts).
+
+    The first sync loads every active alert; later syncs only read the alerts
+    updated since SYNC_OVERLAP seconds before the previous one started
+    (created, edited or deactivated anywhere), so a long-running evaluator
+    follows the API's writes without reloading. The overlap catches rows
+    stamped before a sync but committed after it ran; re-reading a row is
+    harmless.
+    Deleted alerts are left in place and discarded when they fire, since the
+    database is checked before notifying.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.symbols = {}
+        self.alerts = {}
+        self.synced_at = None
+
+    def __len__(self):
+        return len(self.alerts)
+
+    def add(self, rows):
+        """
+        Adds (id, symbol, direction, threshold) rows, replacing alerts already indexed.
+        """
+        self.remove(alert_id for alert_id, _, _, _ in rows)
+        groups = {}
+        for alert_id, symbol, direction, threshold in rows:
+            symbol = symbol.upper()
+            threshold = float(threshold)
+            self.alerts[alert_id] = (symbol, direction, threshold)
+            thresholds, ids = groups.setdefault((symbol, direction), ([], []))
+            thresholds.append(threshold)
+            ids.append(alert_id)
+        for (symbol, direction), (thresholds, ids) in groups.items():
+            self.symbols.setdefault(symbol, SymbolAlerts()).extend(direction, thresholds, ids)
+
+    def remove(self, alert_ids):
+        for alert_id in alert_ids:
+            indexed = self.alerts.pop(alert_id, None)
+            if indexed is None:
+                continue
+            symbol, direction, threshold = indexed
+            alerts = self.symbols[symbol]
+            alerts.remove(direction, threshold, alert_id)
+            if not len(alerts):
+                del self.symbols[symbol]
+
+    def discard(self, alert_ids):
+        """
+        Removes fired alerts: remove() for a few, one pass per touched list
+        for many.
+        """
+        with self.lock:
+            groups = {}
+            for alert_id in alert_ids:
+                indexed = self.alerts.pop(alert_id, None)
+                if indexed is not None:
+                    symbol, direction, _ = indexed
+                    groups.setdefault((symbol, direction), set()).add(alert_id)
+            for (symbol, direction), ids in groups.items():
+                self.symbols[symbol].discard(direction, ids)
+                if not len(self.symbols[symbol]):
+                    del self.symbols[symbol]
+
+    def sync(self):
+        started = timezone.now()
+        with self.lock:
+            if self.synced_at is None:
+                rows = PriceAlert.objects.filter(active=True)
+            else:
+                since = self.synced_at - timedelta(seconds=alert_settings()['SYNC_OVERLAP'])
+                rows = PriceAlert.objects.filter(updated_at__gte=since)
+            columns = raw_columns(rows.order_by().values_list('pk', 'symbol', 'direction', 'threshold', 'active'))
+            if columns:
+                self.remove(columns[0])
+                self.add([row[:4] for row in zip(*columns) if row[4]])
+            self.synced_at = started
+
+    def check(self, prices):
+        """
+        [(alert id, price)] of the alerts triggered by {symbol: price}. They
+        stay indexed until discarded, once the notifications are committed.
+        """
+        fired = []
+        with self.lock:
+            for symbol, price in prices.items():
+                alerts = self.symbols.get(symbol.upper())
+                if alerts is None or price is None:
+                    continue
+                fired.extend((alert_id, price) for alert_id in alerts.crossed(float(price)))
+        return fired
+
+
+_index = AlertIndex()
+
+
+def alert_index():
+    return _index
+
+
+class Sweep:
+    """
+    Outcome of one check_price_alerts run. `elapsed` is the time spent
+    matching prices against the index, `saved_in` the time spent writing
+    the notifications.
+    """
+
+    def __init__(self):
+        self.alerts = 0
+        self.symbols = 0
+        self.notifications = []
+        self.elapsed = 0.0
+        self.saved_in = 0.0
+
+
+def _message(symbol, direction, threshold, price):
+    verb = 'rose above' if direction == 'above' else 'fell below'
+    return f"{symbol} {verb} {threshold.normalize():f}: now {price}"
+
+
+def check_price_alerts(prices=None, now=None):
+    """
+    Matches prices against the active alerts and turns the triggered ones
+    into notifications.
+
+    The index is synced first; without `prices` the quotes of every indexed
+    symbol are fetched with one batch call. Triggered alerts that are still
+    active in the database are deactivated and notified in bulk; they leave the
+    index only once that is committed, so a failed write is retried by the
+    next sweep.
+    """
+    sweep = Sweep()
+    index = alert_index()
+    index.sync()
+    sweep.alerts = len(index)
+    if prices is None:
+        prices = get_stock_prices(list(index.symbols)) if index.symbols else {}
+    sweep.symbols = len(prices)
+
+    started = time.perf_counter()
+    fired = dict(index.check(prices))
+    sweep.elapsed = time.perf_counter() - started
+    if not fired:
+        return sweep
+
+    started = time.perf_counter()
+    now = now or timezone.now()
+    batch_size = alert_settings()['BATCH_SIZE']
+    ids = list(fired)
+    with db_transaction.atomic():
+        for first in range(0, len(ids), batch_size):
+            alerts = list(
+                PriceAlert.objects.select_for_update().filter(pk__in=ids[first:first + batch_size], active=True)
+                .values_list('pk', 'account_id', 'symbol', 'direction', 'threshold')
+            )
+            PriceAlert.objects.filter(pk__in=[alert[0] for alert in alerts]).update(active=False, triggered_at=now, updated_at=now)
+            sweep.notifications.extend(
+                Notification(
+                    account_id=account_id, alert_id=alert_id, symbol=symbol, price=Decimal(str(fired[alert_id])),
+                    message=_message(symbol, direction, threshold, fired[alert_id]),
+                )
+                for alert_id, account_id, symbol, direction, threshold in alerts
+            )
+        Notification.objects.bulk_create(sweep.notifications, batch_size=batch_size)
+    index.discard(ids)
+    sweep.saved_in = time.perf_counter() - started
+    return sweep
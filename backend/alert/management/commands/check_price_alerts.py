@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from alert.engine import alert_settings, check_price_alerts
+
+
+class Command(BaseCommand):
+    help = ("Check the active price alerts against the latest quotes and notify the triggered ones. "
+            "Run it on a schedule, or keep it running with --loop (the alert index then stays in memory).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep running, checking every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=alert_settings()['INTERVAL'],
+                            help="Seconds between checks with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            sweep = check_price_alerts()
+            self.stdout.write(self.style.SUCCESS(
+                f"Checked {sweep.alerts} alert(s) on {sweep.symbols} symbol(s) in {sweep.elapsed * 1000:.1f}ms; "
+                f"{len(sweep.notifications)} triggered, notified in {sweep.saved_in:.2f}s."
+            ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,63 @@
+from django.db import models
+from account.models import Account
+
+class Watchlist(models.Model):
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='watchlists')
+    name = models.CharField(max_length=100)
+    symbols = models.JSONField(default=list, help_text="Upper-case ticker symbols.")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PriceAlert(models.Model):
+    """
+    One-shot alert on a symbol's price: fires the first time the price is at
+    or above (direction 'above') or at or below ('below') the threshold, then
+    becomes inactive. Evaluated by alert.engine.
+    """
+    DIRECTIONS = [
+        ('above', 'Above'),
+        ('below', 'Below'),
+    ]
+
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='price_alerts')
+    symbol = models.CharField(max_length=50, help_text="Upper-case ticker symbol.")
+    direction = models.CharField(max_length=5, choices=DIRECTIONS)
+    threshold = models.DecimalField(max_digits=20, decimal_places=8)
+    active = models.BooleanField(default=True)
+    triggered_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='price_alert_updated_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.direction} {self.threshold}"
+
+
+class Notification(models.Model):
+    """
+    Message for a user, e.g. a triggered price alert; fetched by the frontend.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='notifications')
+    alert = models.ForeignKey(PriceAlert, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications')
+    message = models.CharField(max_length=255)
+    symbol = models.CharField(max_length=50, blank=True)
+    price = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True)
+    read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['account', 'read'], name='notification_account_read'),
+        ]
+
+    def __str__(self):
+        return self.message
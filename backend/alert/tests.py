@@ -0,0 +1,78 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from account.models import Account
+from alert.engine import AlertIndex, check_price_alerts
+from alert.models import Notification, PriceAlert
+
+
+class CheckPriceAlertsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user('alerts@example.com', 'password')
+
+    def setUp(self):
+        self.index = AlertIndex()
+        patcher = mock.patch('alert.engine._index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_alert(self, symbol, direction, threshold):
+        return PriceAlert.objects.create(account=self.account, symbol=symbol, direction=direction, threshold=Decimal(threshold))
+
+    def fired(self, prices):
+        return sorted(notification.alert_id for notification in check_price_alerts(prices).notifications)
+
+    def test_upward_crossing(self):
+        alert = self.make_alert('AAPL', 'above', '200')
+        lower = self.make_alert('AAPL', 'below', '150')
+        self.assertEqual(self.fired({'AAPL': 199.99}), [])
+        self.assertEqual(self.fired({'AAPL': 200.5}), [alert.pk])
+
+        alert.refresh_from_db()
+        self.assertFalse(alert.active)
+        self.assertIsNotNone(alert.triggered_at)
+        notification = Notification.objects.get(alert=alert)
+        self.assertEqual((notification.account, notification.symbol, notification.price), (self.account, 'AAPL', Decimal('200.5')))
+        self.assertTrue(PriceAlert.objects.get(pk=lower.pk).active)
+
+    def test_downward_crossing(self):
+        alert = self.make_alert('MSFT', 'below', '300')
+        self.make_alert('MSFT', 'above', '450')
+        self.assertEqual(self.fired({'msft': 300.01}), [])
+        self.assertEqual(self.fired({'msft': 299}), [alert.pk])
+        self.assertIn('fell below 300', Notification.objects.get(alert=alert).message)
+
+    def test_touch_and_recross_do_not_fire_again(self):
+        above = self.make_alert('AAPL', 'above', '200')
+        below = self.make_alert('AAPL', 'below', '150')
+        self.assertEqual(self.fired({'AAPL': 200}), [above.pk])
+        self.assertEqual(self.fired({'AAPL': 150}), [below.pk])
+        for price in (200, 149, 150, 201, 100, 250):
+            self.assertEqual(self.fired({'AAPL': price}), [])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_fired_alerts_leave_the_index_after_commit(self):
+        fired = self.make_alert('AAPL', 'above', '200')
+        waiting = self.make_alert('AAPL', 'above', '300')
+        self.index.sync()
+        self.assertEqual(len(self.index), 2)
+
+        self.fired({'AAPL': 250})
+        self.assertNotIn(fired.pk, self.index.alerts)
+        self.assertEqual(self.index.check({'AAPL': 400}), [(waiting.pk, 400)])
+
+    def test_rolled_back_write_does_not_fire(self):
+        alert = self.make_alert('AAPL', 'above', '200')
+        with mock.patch.object(Notification.objects, 'bulk_create', side_effect=RuntimeError('database is locked')):
+            with self.assertRaises(RuntimeError):
+                check_price_alerts({'AAPL': 210})
+
+        self.assertTrue(PriceAlert.objects.get(pk=alert.pk).active)
+        self.assertFalse(Notification.objects.exists())
+        self.assertIn(alert.pk, self.index.alerts)
+
+        self.assertEqual(self.fired({'AAPL': 210}), [alert.pk])
+        self.assertEqual(Notification.objects.filter(alert=alert).count(), 1)
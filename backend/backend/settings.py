@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,7 +49,8 @@ INSTALLED_APPS = [
     'portfolio',
     'transaction',
     'finance',
-    'chatbot'
+    'chatbot',
+    'alert',
 ]
 
 MIDDLEWARE = [
@@ -139,4 +141,133 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'account.Account'
 
 # CORS Headers
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Market Data
+# Use 'finance.providers.SyntheticProvider' to serve seeded offline data (load tests, benchmarks).
+MARKET_DATA_PROVIDER = {
+    'BACKEND': os.environ.get('MARKET_DATA_PROVIDER', 'finance.providers.YFinanceProvider'),
+    'OPTIONS': {},
+}
+
+if MARKET_DATA_PROVIDER['BACKEND'] == 'finance.providers.SyntheticProvider':
+    MARKET_DATA_PROVIDER['OPTIONS'] = {'seed': int(os.environ.get('MARKET_DATA_SEED', 0))}
+
+# Quote/metadata cache in front of the provider. TTLs are in seconds; the CLOSED_* values apply outside market hours.
+MARKET_DATA_CACHE = {
+    'MAX_ENTRIES': 2048,
+    'QUOTE_TTL': 15,
+    'INFO_TTL': 60 * 60,
+    'CLOSED_QUOTE_TTL': 15 * 60,
+    'CLOSED_INFO_TTL': 6 * 60 * 60,
+    'SECURITY_TTL': 60 * 60,
+}
+
+# Age after which refresh_securities re-fetches a symbol's metadata (schedule the command daily).
+SECURITY_REFRESH_AFTER_HOURS = 24
+
+# Server-sent quote stream (/finance/stream/): seconds between upstream polls of the subscribed
+# symbols, symbols per connection, keep-alive period and lifetime in seconds of the tickets
+# (/finance/stream/ticket/) that let a browser EventSource authenticate.
+QUOTE_STREAM = {
+    'INTERVAL': 5,
+    'MAX_SYMBOLS': 50,
+    'HEARTBEAT': 15,
+    'TICKET_TTL': 60,
+}
+
+# Price alerts (check_price_alerts): seconds between checks with --loop, rows per database batch
+# and seconds each incremental index sync re-reads before the previous one (for late commits).
+PRICE_ALERTS = {
+    'INTERVAL': 60,
+    'BATCH_SIZE': 5000,
+    'SYNC_OVERLAP': 60,
+}
+
+# Bulk transaction imports (/transaction/import/, import_transactions): rows parsed and saved per
+# chunk and number of invalid rows listed in the error report.
+TRANSACTION_IMPORT = {
+    'CHUNK_ROWS': 2000,
+    'MAX_REPORTED_ERRORS': 1000,
+}
+
+# Ledger replay engine: 'python' (Decimal FIFO loop) or 'numpy' (vectorized, exact fixed-point).
+PERFORMANCE_ENGINE = os.environ.get('PERFORMANCE_ENGINE', 'python')
+
+# A ledger checkpoint is saved every N replayed transactions (and at each month end) for point-in-time queries.
+LEDGER_CHECKPOINT_INTERVAL = 500
+
+# Directory of the memory-mapped columnar daily bar files (one sub-directory per symbol).
+BAR_STORE_DIR = BASE_DIR / 'bars'
+
+# Cache. Entries are only per-process memoization (quotes, ledger snapshots keyed by the ledger
+# versions, which are kept in the database), so each worker process may use its own local cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'portfolia',
+    }
+}
+
+# Seconds a versioned performance snapshot stays cached (a ledger write in any process moves its
+# version, so a stale one is never read).
+PERFORMANCE_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+# Per-symbol market data fan-out in portfolio recommendations (timeouts in seconds).
+RECOMMENDATION_FANOUT = {
+    'WORKERS': 8,
+    'CALL_TIMEOUT': 5,
+    'DEADLINE': 15,
+}
+
+# Portfolio risk analytics: benchmark for beta, lookback window in days, VaR confidence
+# and number of cached per-symbol-set return windows.
+RISK_ANALYTICS = {
+    'BENCHMARK': '^GSPC',
+    'LOOKBACK_DAYS': 365,
+    'CONFIDENCE': 0.95,
+    'CACHE_ENTRIES': 256,
+}
+
+# Monte Carlo projections: default and maximum number of paths, days of history resampled,
+# draws generated per chunk (bounds memory) and seconds a projection stays cached.
+PORTFOLIO_PROJECTION = {
+    'PATHS': 10000,
+    'MAX_PATHS': 100000,
+    'LOOKBACK_DAYS': 5 * 365,
+    'CHUNK_VALUES': 4000000,
+    'CACHE_TIMEOUT': 60 * 60 * 24,
+}
+
+# Automated trading (run_automated_trading): a holding is rebalanced when its value is off its
+# target by more than DRIFT_THRESHOLD of the portfolio's value; INTERVAL is the --loop period in seconds.
+AUTOMATED_TRADING = {
+    'DRIFT_THRESHOLD': 0.02,
+    'INTERVAL': 60 * 60 * 24,
+}
+
+# Strategy backtests: ranking windows (trading days), default rebalance interval, trading
+# cost in basis points, worker processes of the shared pool for parameter grids (None = one per
+# CPU), smallest grid sent to the pool (smaller ones run in the request), largest grid accepted
+# by the API, and the candidate symbols per Strategy.investment_type.
+STRATEGY_BACKTEST = {
+    'BENCHMARK': '^GSPC',
+    'MOMENTUM_DAYS': 126,
+    'VOLATILITY_DAYS': 63,
+    'REBALANCE_DAYS': 21,
+    'COST_BPS': 5,
+    'PROCESSES': None,
+    'PARALLEL_MIN': 8,
+    'MAX_GRID': 64,
+    'UNIVERSES': {
+        'stocks': ['AAPL', 'MSFT', 'AMZN', 'GOOGL', 'META', 'NVDA', 'JPM', 'JNJ', 'V', 'PG',
+                   'XOM', 'UNH', 'HD', 'KO', 'PEP', 'MRK', 'ABBV', 'COST', 'WMT', 'BAC'],
+        'bonds': ['AGG', 'BND', 'TLT', 'IEF', 'SHY', 'LQD', 'HYG', 'TIP'],
+        'crypto': ['BTC-USD', 'ETH-USD', 'SOL-USD', 'ADA-USD', 'XRP-USD', 'DOGE-USD'],
+        'real_estate': ['VNQ', 'O', 'PLD', 'AMT', 'SPG', 'EQIX', 'PSA', 'WELL'],
+        'index_funds': ['SPY', 'VTI', 'VOO', 'QQQ', 'IWM', 'DIA', 'VEA', 'VWO'],
+        'etfs': ['SPY', 'QQQ', 'IWM', 'EFA', 'EEM', 'AGG', 'TLT', 'GLD', 'VNQ', 'XLK', 'XLE', 'XLV'],
+        'commodities': ['GLD', 'SLV', 'USO', 'DBA', 'DBC', 'CPER', 'UNG', 'PPLT'],
+        'mixed': ['SPY', 'QQQ', 'IWM', 'EFA', 'AGG', 'TLT', 'GLD', 'VNQ', 'AAPL', 'MSFT', 'BTC-USD', 'ETH-USD'],
+    },
+}
\ No newline at end of file
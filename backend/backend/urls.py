@@ -10,4 +10,5 @@ urlpatterns = [
     path('transaction/', include('transaction.api.urls')),
     path('finance/', include('finance.api.urls')),
     path('chatbot/', include('chatbot.api.urls')),
+    path('alert/', include('alert.api.urls')),
 ]
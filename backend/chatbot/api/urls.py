@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import prompt
+from .views import prompt, prompt_async
 
 urlpatterns = [
     path('prompt/', prompt, name='prompt'),
-]
\ No newline at end of file
+    path('async/prompt/', prompt_async, name='prompt-async'),
+]
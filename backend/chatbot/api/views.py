@@ -1,3 +1,5 @@
+import asyncio
+
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
@@ -6,39 +8,42 @@ from rest_framework.permissions import IsAuthenticated
 from datetime import datetime, timedelta
 
 from .serializers import PromptSerializer
-from finance.helpers import fetch_stock_data
+from authentication.decorators import async_api_view, json_response
+from finance.barstore import read_bars, aread_bars
 
-@api_view(['POST'])
-@authentication_classes([TokenAuthentication])
-@permission_classes([IsAuthenticated])
-def prompt(request):
-    serializer = PromptSerializer(data=request.data)
-    if not serializer.is_valid():
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    prompt_text = serializer.validated_data.get('prompt', '').lower()
+INDEXES = {
+    "S&P 500": "^GSPC",
+    "Dow Jones": "^DJI",
+    "NASDAQ": "^IXIC",
+}
+
+def wants_market_insight(prompt_text):
+    return ("market" in prompt_text or "index" in prompt_text or "insight" in prompt_text or "analysis" in prompt_text)
+
+def index_window():
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=28)
+    return start_date, end_date
+
+def build_response(prompt_text, index_closes=None):
+    """
+    Builds the chatbot reply. `index_closes` maps each INDEXES label to its
+    close prices over the last 28 days, or to the exception raised fetching them;
+    it is only needed when the prompt asks for market insight.
+    """
     messages = []
-    
-    if ("market" in prompt_text or "index" in prompt_text or "insight" in prompt_text or "analysis" in prompt_text):
-        indexes = {
-            "S&P 500": "^GSPC",
-            "Dow Jones": "^DJI",
-            "NASDAQ": "^IXIC",
-        }
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=28)
+
+    if wants_market_insight(prompt_text):
         market_analysis = []
         valid_changes = []
-        for label, symbol in indexes.items():
-            market_data = fetch_stock_data(symbol, start=str(start_date), end=str(end_date))
-            if "error" in market_data:
+        for label, closes in index_closes.items():
+            if isinstance(closes, Exception):
                 market_analysis.append(f"{label}: Data not available.")
             else:
-                hist = market_data.get("historical_data", [])
-                if hist and len(hist) >= 2 and "Close" in hist[0] and "Close" in hist[-1]:
+                if len(closes) >= 2:
                     try:
-                        start_price = hist[0]["Close"]
-                        end_price = hist[-1]["Close"]
+                        start_price = float(closes[0])
+                        end_price = float(closes[-1])
                         if start_price and start_price != 0:
                             change_pct = ((end_price - start_price) / start_price) * 100
                             valid_changes.append(change_pct)
@@ -51,24 +56,66 @@ def prompt(request):
                 else:
                     analysis = f"{label}: Insufficient historical data."
                 market_analysis.append(analysis)
-        
+
         messages.append("\n".join(market_analysis))
 
         if valid_changes:
             avg_change = sum(valid_changes) / len(valid_changes)
             overall = "good" if avg_change >= 0 else "bad"
             messages.append(f"Overall, the market appears {overall} with an average change of {avg_change:.2f}%.")
-    
+
     if "portfolio" in prompt_text and "manage" in prompt_text:
         messages.append("To manage your portfolio, please go to Portfolio Management.")
-    
+
     if "strategy" in prompt_text and "manage" in prompt_text:
         messages.append("To manage your strategy, please go to Strategy Management.")
 
     if "what are you" in prompt_text:
         messages.append("I am a financial assistant designed to help you with stock market insights and portfolio management.")
- 
+
     if not messages:
         messages.append("I'm sorry, I don't understand the question.")
-        
-    return Response({"response": "\n\n".join(messages)}, status=status.HTTP_200_OK)
\ No newline at end of file
+
+    return {"response": "\n\n".join(messages)}
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def prompt(request):
+    serializer = PromptSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    prompt_text = serializer.validated_data.get('prompt', '').lower()
+    index_closes = {}
+    if wants_market_insight(prompt_text):
+        start_date, end_date = index_window()
+        for label, symbol in INDEXES.items():
+            try:
+                index_closes[label] = read_bars(symbol, start_date, end_date).close
+            except Exception as e:
+                index_closes[label] = e
+
+    return Response(build_response(prompt_text, index_closes), status=status.HTTP_200_OK)
+
+@async_api_view(['POST'])
+async def prompt_async(request):
+    """
+    Async variant of `prompt`: the three index histories are fetched concurrently.
+    """
+    serializer = PromptSerializer(data=request.data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    prompt_text = serializer.validated_data.get('prompt', '').lower()
+    index_closes = {}
+    if wants_market_insight(prompt_text):
+        start_date, end_date = index_window()
+        results = await asyncio.gather(
+            *(aread_bars(symbol, start_date, end_date) for symbol in INDEXES.values()),
+            return_exceptions=True,
+        )
+        for label, bars in zip(INDEXES, results):
+            index_closes[label] = bars if isinstance(bars, Exception) else bars.close
+
+    return json_response(build_response(prompt_text, index_closes), status=status.HTTP_200_OK)
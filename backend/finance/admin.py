@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Security
+
+@admin.register(Security)
+class SecurityAdmin(admin.ModelAdmin):
+    list_display = ('symbol', 'short_name', 'quote_type', 'currency', 'exchange', 'refreshed_at')
+    list_filter = ('quote_type', 'exchange')
+    search_fields = ('symbol', 'short_name', 'long_name')
+    ordering = ('symbol',)
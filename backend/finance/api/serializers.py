@@ -1,9 +1,35 @@
 from rest_framework import serializers
 
+from finance.stream import stream_settings
+
 class MarketDataQuerySerializer(serializers.Serializer):
     symbol = serializers.CharField(max_length=10)
     start_date = serializers.DateField()
     end_date = serializers.DateField()
 
 class StockInfoQuerySerializer(serializers.Serializer):
-    symbol = serializers.CharField(max_length=10)
\ No newline at end of file
+    symbol = serializers.CharField(max_length=10)
+
+class BatchMarketDataQuerySerializer(serializers.Serializer):
+    symbols = serializers.ListField(child=serializers.CharField(max_length=10), min_length=1, max_length=100)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if ('start_date' in data) != ('end_date' in data):
+            raise serializers.ValidationError("Provide both start_date and end_date to include history.")
+        return data
+
+class QuoteStreamQuerySerializer(serializers.Serializer):
+    symbols = serializers.CharField(help_text="Comma-separated symbols.")
+
+    def validate_symbols(self, value):
+        symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in value.split(',') if symbol.strip()))
+        if not symbols:
+            raise serializers.ValidationError("Provide at least one symbol.")
+        limit = stream_settings()['MAX_SYMBOLS']
+        if len(symbols) > limit:
+            raise serializers.ValidationError(f"At most {limit} symbols are allowed.")
+        if any(len(symbol) > 10 for symbol in symbols):
+            raise serializers.ValidationError("Symbols are at most 10 characters.")
+        return symbols
@@ -1,8 +1,18 @@
 from django.urls import path
-from .views import market_data, stock_info, fetch_stock_view
+from .views import (market_data, stock_info, fetch_stock_view, market_batch, market_cache_stats,
+                    market_data_async, stock_info_async, fetch_stock_view_async,
+                    quote_stream, quote_stream_ticket, quote_stream_stats)
 
 urlpatterns = [
     path('data/', market_data, name='market-data'),
     path('info/', stock_info, name='stock-info'),
-    path('fetch/', fetch_stock_view, name='fetch-stock-data')
+    path('fetch/', fetch_stock_view, name='fetch-stock-data'),
+    path('batch/', market_batch, name='market-batch'),
+    path('cache/', market_cache_stats, name='market-cache-stats'),
+    path('async/data/', market_data_async, name='market-data-async'),
+    path('async/info/', stock_info_async, name='stock-info-async'),
+    path('async/fetch/', fetch_stock_view_async, name='fetch-stock-data-async'),
+    path('stream/', quote_stream, name='quote-stream'),
+    path('stream/ticket/', quote_stream_ticket, name='quote-stream-ticket'),
+    path('stream/stats/', quote_stream_stats, name='quote-stream-stats'),
 ]
\ No newline at end of file
@@ -1,10 +1,16 @@
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.authentication import TokenAuthentication
-from .serializers import MarketDataQuerySerializer, StockInfoQuerySerializer
+from django.http import StreamingHttpResponse
+from .serializers import MarketDataQuerySerializer, StockInfoQuerySerializer, BatchMarketDataQuerySerializer, QuoteStreamQuerySerializer
+from authentication.decorators import async_api_view, json_response
 from finance.helpers import get_stock_history, get_stock_info, fetch_stock_data
+from finance.helpers import get_stock_prices, get_stock_infos, get_stock_histories
+from finance.helpers import aget_stock_history, aget_stock_info, afetch_stock_data
+from finance.cache import cache_stats
+from finance.stream import StreamTicketAuthentication, quote_events, stream_stats, stream_ticket, stream_settings
 
 @api_view(['POST'])
 @authentication_classes([TokenAuthentication])
@@ -46,4 +52,112 @@ def fetch_stock_view(request):
         if "error" in data:
             return Response(data, status=status.HTTP_400_BAD_REQUEST)
         return Response(data, status=status.HTTP_200_OK)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def market_batch(request):
+    """
+    Quotes and metadata for a list of symbols, plus their daily bars when a
+    date range is given, using one upstream request per kind of data.
+    Returns {symbol: {"price", "info", "history"}}.
+    """
+    serializer = BatchMarketDataQuerySerializer(data=request.data)
+    if serializer.is_valid():
+        symbols = [symbol.upper() for symbol in serializer.validated_data['symbols']]
+        prices = get_stock_prices(symbols)
+        infos = get_stock_infos(symbols)
+        histories = {}
+        if 'start_date' in serializer.validated_data:
+            histories = get_stock_histories(symbols, serializer.validated_data['start_date'],
+                                            serializer.validated_data['end_date'])
+        data = {}
+        for symbol in prices:
+            data[symbol] = {"price": prices[symbol], "info": infos.get(symbol)}
+            if histories:
+                data[symbol]["history"] = histories.get(symbol)
+        return Response(data, status=status.HTTP_200_OK)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def market_cache_stats(request):
+    """
+    Hit/miss/eviction counters of the market data caches (Superuser only).
+    """
+    return Response(cache_stats(), status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def quote_stream_ticket(request):
+    """
+    Short-lived ticket for /finance/stream/?ticket=..., since a browser EventSource cannot send the token header.
+    """
+    return Response({"ticket": stream_ticket(request.user), "expires_in": stream_settings()['TICKET_TTL']},
+                    status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def quote_stream_stats(request):
+    """
+    Subscribers, subscriptions per symbol, upstream polls and fan-out latency of the quote stream (Superuser only).
+    """
+    return Response(stream_stats(), status=status.HTTP_200_OK)
+
+
+# Async variants for ASGI deployments: the provider calls are awaited instead of blocking a worker thread.
+
+@async_api_view(['POST'])
+async def market_data_async(request):
+    serializer = MarketDataQuerySerializer(data=request.data)
+    if serializer.is_valid():
+        symbol = serializer.validated_data['symbol']
+        start_date = serializer.validated_data['start_date']
+        end_date = serializer.validated_data['end_date']
+        data = await aget_stock_history(symbol, start_date, end_date)
+        if data is None:
+            return json_response({"error": "No data found for the given parameters."},
+                                 status=status.HTTP_404_NOT_FOUND)
+        return json_response(data, status=status.HTTP_200_OK)
+    return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@async_api_view(['POST'])
+async def stock_info_async(request):
+    serializer = StockInfoQuerySerializer(data=request.data)
+    if serializer.is_valid():
+        symbol = serializer.validated_data['symbol']
+        info = await aget_stock_info(symbol)
+        return json_response(info, status=status.HTTP_200_OK)
+    return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@async_api_view(['POST'])
+async def fetch_stock_view_async(request):
+    serializer = MarketDataQuerySerializer(data=request.data)
+    if serializer.is_valid():
+        symbol = serializer.validated_data['symbol']
+        start_date = serializer.validated_data['start_date']
+        end_date = serializer.validated_data['end_date']
+        data = await afetch_stock_data(symbol, start_date, end_date)
+        if "error" in data:
+            return json_response(data, status=status.HTTP_400_BAD_REQUEST)
+        return json_response(data, status=status.HTTP_200_OK)
+    return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@async_api_view(['GET'], authentication_classes=[TokenAuthentication, StreamTicketAuthentication])
+async def quote_stream(request):
+    """
+    Server-sent events with the quotes of the requested symbols (ASGI only: the response never ends).
+    URL: /finance/stream/?symbols=AAPL,MSFT, authenticated by the token header or a ticket
+    from /finance/stream/ticket/ (&ticket=...).
+    """
+    serializer = QuoteStreamQuerySerializer(data=request.data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(quote_events(serializer.validated_data['symbols']), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from finance.cache import MARKET_TZ
+from finance.columnar import BarFile, BarSlice, MappedColumns, day_number, day_numbers
+from finance.providers import empty_history, get_provider, to_date
+
+DEFAULT_RANGE_DAYS = 30
+
+_mapped = MappedColumns()
+
+
+def market_today():
+    return datetime.now(MARKET_TZ).date()
+
+
+def requested_range(start=None, end=None):
+    """
+    Converts provider-style arguments (inclusive start, exclusive end, both optional)
+    into an inclusive (first, last) date pair clipped to today.
+    """
+    today = market_today()
+    end = to_date(end)
+    last = min(end - timedelta(days=1), today) if end else today
+    first = to_date(start) or last - timedelta(days=DEFAULT_RANGE_DAYS)
+    return first, last
+
+
+def bar_file(symbol):
+    return BarFile(str(settings.BAR_STORE_DIR), symbol.upper())
+
+
+def _download(symbol, first, last):
+    """
+    Fetches [first, last] upstream and returns it as a BarSlice.
+    """
+    return _to_slice(get_provider().get_history(symbol, start=first, end=last + timedelta(days=1)))
+
+
+def _to_slice(history):
+    if history.empty:
+        return BarSlice()
+    return BarSlice(
+        date=day_numbers(history.index.tz_localize(None).normalize().values),
+        open=history['Open'].to_numpy(dtype=np.float64),
+        high=history['High'].to_numpy(dtype=np.float64),
+        low=history['Low'].to_numpy(dtype=np.float64),
+        close=history['Close'].to_numpy(dtype=np.float64),
+        volume=history['Volume'].fillna(0).to_numpy(dtype=np.int64),
+        dividends=_optional(history, 'Dividends'),
+        splits=_optional(history, 'Stock Splits'),
+    )
+
+
+def _optional(history, column):
+    if column not in history:
+        return np.zeros(len(history), dtype=np.float64)
+    return history[column].fillna(0).to_numpy(dtype=np.float64)
+
+
+def ensure_range(symbol, first, last, download=_download):
+    """
+    Makes sure the store holds every bar of `symbol` between `first` and `last`
+    and returns the file's metadata.
+
+    Coverage is a contiguous [start, end] range of settled dates. Only the dates
+    missing at its edges are downloaded, and the right edge is refreshed at most
+    once per day. Today's bar is stored but never marked as settled, so the next
+    day's refresh replaces it; a file first written for today alone therefore
+    has end < start, an empty range.
+    `download(symbol, first, last)` returns the bars of an inclusive range as a
+    BarSlice; ensure_ranges passes one that slices a prefetched batch.
+    """
+    today = market_today()
+    settled = (today - timedelta(days=1)).isoformat()
+    bars = bar_file(symbol)
+    meta = bars.meta()
+    if meta is not None and not _needs_fetch(meta, first, last, today):
+        return meta
+
+    with bars.lock():
+        meta = bars.meta()
+        if meta is None or 'start' not in meta:
+            return bars.write(download(symbol, first, today), {
+                'start': first.isoformat(),
+                'end': settled,
+                'refreshed_on': today.isoformat(),
+            })
+
+        if first.isoformat() < meta['start']:
+            older = download(symbol, first, to_date(meta['start']) - timedelta(days=1))
+            meta = bars.write(older, {'start': first.isoformat()})
+        if last.isoformat() > meta['end'] and meta['refreshed_on'] < today.isoformat():
+            newer = download(symbol, to_date(meta['end']) + timedelta(days=1), today)
+            meta = bars.write(newer, {'end': max(meta['end'], settled), 'refreshed_on': today.isoformat()})
+        return meta
+
+
+def ensure_ranges(symbols, first, last):
+    """
+    Batch form of ensure_range: the symbols whose files miss part of
+    [first, last] are fetched with one multi-symbol history request spanning
+    all of their gaps, which is then written symbol by symbol.
+    """
+    today = market_today()
+    stale = []
+    for symbol in dict.fromkeys(s.upper() for s in symbols):
+        meta = bar_file(symbol).meta()
+        if meta is None or _needs_fetch(meta, first, last, today):
+            stale.append(symbol)
+    if not stale:
+        return
+
+    starts = [_gap_start(bar_file(symbol).meta(), first, today) for symbol in stale]
+    histories = get_provider().get_histories(stale, start=min(starts), end=today + timedelta(days=1))
+    fetched = {symbol: _to_slice(histories.get(symbol, empty_history())) for symbol in stale}
+
+    def prefetched(symbol, gap_first, gap_last):
+        bars = fetched[symbol]
+        lo = np.searchsorted(bars.date, day_number(gap_first), side='left')
+        hi = np.searchsorted(bars.date, day_number(gap_last), side='right')
+        return bars[lo:hi]
+
+    for symbol in stale:
+        ensure_range(symbol, first, last, download=prefetched)
+
+
+def _needs_fetch(meta, first, last, today):
+    """
+    Whether ensure_range would download anything. An empty range (end < start)
+    needs no special case: anything after its end is refreshed at most once a
+    day like any other right edge.
+    """
+    if 'start' not in meta:
+        return True
+    if first.isoformat() < meta['start']:
+        return True
+    return last.isoformat() > meta['end'] and meta['refreshed_on'] < today.isoformat()
+
+
+def _gap_start(meta, first, today):
+    """
+    First date ensure_range will download for a file that needs a fetch: the
+    left-edge gap if there is one, otherwise the day after the right edge.
+    """
+    if meta is None or 'start' not in meta or first.isoformat() < meta['start']:
+        return first
+    return min(to_date(meta['end']) + timedelta(days=1), today)
+
+
+def read_bars(symbol, start=None, end=None):
+    """
+    Returns the daily bars of `symbol` between `start` (inclusive) and `end`
+    (exclusive) as a BarSlice, filling gaps from the provider first.
+    The range lookup is a binary search over the memory-mapped date column and
+    the result is a zero-copy view.
+    """
+    first, last = requested_range(start, end)
+    if last < first:
+        return BarSlice()
+    bars = bar_file(symbol)
+    meta = ensure_range(bars.symbol, first, last)
+    columns = _mapped.get(bars, meta)
+    lo = np.searchsorted(columns.date, day_number(first), side='left')
+    hi = np.searchsorted(columns.date, day_number(last), side='right')
+    return columns[lo:hi]
+
+
+def read_bars_many(symbols, start=None, end=None):
+    """
+    Returns {symbol: BarSlice} for a shared date range, filling the gaps of
+    every symbol with a single upstream request.
+    """
+    first, last = requested_range(start, end)
+    if last >= first:
+        ensure_ranges(symbols, first, last)
+    return {symbol: read_bars(symbol, start, end) for symbol in symbols}
+
+
+def aligned_closes(bars, symbols, calendar):
+    """
+    Closes of `symbols` on the days of `calendar` (an array of day numbers) as
+    a (days x symbols) matrix, taking each symbol's last close on or before the
+    day and NaN before its first bar. `bars` maps symbols to BarSlices, as
+    returned by read_bars_many.
+    """
+    closes = np.full((len(calendar), len(symbols)), np.nan)
+    for column, symbol in enumerate(symbols):
+        symbol_bars = bars[symbol]
+        if not len(symbol_bars):
+            continue
+        at = np.searchsorted(symbol_bars.date, calendar, side='right') - 1
+        closes[:, column] = np.where(at >= 0, symbol_bars.close[np.maximum(at, 0)], np.nan)
+    return closes
+
+
+async def aread_bars(symbol, start=None, end=None):
+    """
+    Async read_bars: a covered range is read on the event loop, a gap-fill
+    download runs in a worker thread.
+    """
+    first, last = requested_range(start, end)
+    if last >= first:
+        meta = bar_file(symbol).meta()
+        if meta is None or _needs_fetch(meta, first, last, market_today()):
+            await sync_to_async(ensure_range, thread_sensitive=False)(symbol.upper(), first, last)
+    return read_bars(symbol, start, end)
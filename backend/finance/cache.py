@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, time as clock
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = clock(9, 30)
+MARKET_CLOSE = clock(16, 0)
+
+DEFAULTS = {
+    'MAX_ENTRIES': 2048,
+    'QUOTE_TTL': 15,
+    'INFO_TTL': 60 * 60,
+    'CLOSED_QUOTE_TTL': 15 * 60,
+    'CLOSED_INFO_TTL': 6 * 60 * 60,
+    'SECURITY_TTL': 60 * 60,
+}
+
+
+def cache_setting(name):
+    return getattr(settings, 'MARKET_DATA_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def is_market_open(now=None):
+    """
+    Returns True during regular US equity trading hours (weekdays 9:30-16:00 New York time).
+    Exchange holidays are not taken into account.
+    """
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+class _Call:
+    """
+    An in-flight upstream fetch that concurrent callers of the same key wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Thread-safe, bounded LRU cache whose entries expire after a TTL.
+
+    `get_or_load` collapses concurrent misses for the same key into a single call
+    of the loader (single-flight); the other threads block until it finishes and
+    share its result. Exceptions are propagated to every waiter and never cached.
+
+    Callbacks registered with `subscribe` receive {key: value} of every value
+    stored, after the cache lock is released, so they may read the cache. A
+    failing callback is logged and counted, never raised into the caller that
+    stored the value.
+    """
+
+    def __init__(self, name, max_entries, ttl, closed_ttl=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.closed_ttl = closed_ttl if closed_ttl is not None else ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._ainflight = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.listener_errors = 0
+
+    def current_ttl(self):
+        return self.ttl if is_market_open() else self.closed_ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._lookup(key)
+            return default if entry is None else entry[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.current_ttl() if ttl is None else ttl
+        with self._lock:
+            self._store(key, value, ttl)
+        self._notify({key: value})
+
+    def set_many(self, values, ttl=None):
+        ttl = self.current_ttl() if ttl is None else ttl
+        with self._lock:
+            for key, value in values.items():
+                self._store(key, value, ttl)
+        self._notify(values)
+
+    def subscribe(self, callback):
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, values):
+        for callback in list(self._listeners):
+            try:
+                callback(values)
+            except Exception:
+                self.listener_errors += 1
+                logger.exception("%s cache listener %r failed", self.name, callback)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_load(self, key, loader, ttl=None):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                self.misses += 1
+                call = self._inflight[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = loader()
+        except Exception as e:
+            call.error = e
+            raise
+        else:
+            self.set(key, call.value, ttl)
+            return call.value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def get_many_or_load(self, keys, loader, ttl=None):
+        """
+        Returns {key: value} for `keys`. The cached ones are served from memory and
+        all the others are loaded with a single `loader(missing_keys)` call, which
+        must return a {key: value} dict; its results are cached.
+        Batch loads are not coalesced with concurrent single-key loads.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._lookup(key)
+                if entry is None:
+                    missing.append(key)
+                else:
+                    found[key] = entry[1]
+            self.hits += len(found)
+            self.misses += len(missing)
+        if missing:
+            loaded = loader(missing)
+            ttl = self.current_ttl() if ttl is None else ttl
+            with self._lock:
+                for key in missing:
+                    if key in loaded:
+                        self._store(key, loaded[key], ttl)
+            self._notify({key: loaded[key] for key in missing if key in loaded})
+            found.update(loaded)
+        return {key: found.get(key) for key in dict.fromkeys(keys)}
+
+    async def aget_or_load(self, key, aloader, ttl=None):
+        """
+        Coroutine counterpart of get_or_load: concurrent misses on the same
+        event loop await one shared task instead of blocking a thread.
+        In-flight tasks are tracked per loop, since a task cannot be awaited
+        from another loop.
+        """
+        flight = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[1]
+            task = self._ainflight.get(flight)
+            if task is None:
+                self.misses += 1
+                task = self._ainflight[flight] = asyncio.ensure_future(self._aload(flight, aloader, ttl))
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _aload(self, flight, aloader, ttl):
+        try:
+            value = await aloader()
+            self.set(flight[1], value, ttl)
+            return value
+        finally:
+            with self._lock:
+                self._ainflight.pop(flight, None)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.current_ttl(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "listener_errors": self.listener_errors,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            }
+
+
+quote_cache = TTLCache(
+    'quotes',
+    max_entries=cache_setting('MAX_ENTRIES'),
+    ttl=cache_setting('QUOTE_TTL'),
+    closed_ttl=cache_setting('CLOSED_QUOTE_TTL'),
+)
+
+info_cache = TTLCache(
+    'info',
+    max_entries=cache_setting('MAX_ENTRIES'),
+    ttl=cache_setting('INFO_TTL'),
+    closed_ttl=cache_setting('CLOSED_INFO_TTL'),
+)
+
+# Security master rows (finance.securities); the table itself is the source of truth.
+security_cache = TTLCache(
+    'securities',
+    max_entries=cache_setting('MAX_ENTRIES'),
+    ttl=cache_setting('SECURITY_TTL'),
+)
+
+
+def cache_stats():
+    """
+    Returns the counters of every market data cache, keyed by cache name.
+    """
+    return {cache.name: cache.stats() for cache in (quote_cache, info_cache, security_cache)}
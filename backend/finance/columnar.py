@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time
+
+import numpy as np
+
+from finance.cache import MARKET_TZ
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+EPOCH = date(1970, 1, 1)
+
+COLUMNS = (
+    ('date', np.dtype('<i4')),
+    ('open', np.dtype('<f8')),
+    ('high', np.dtype('<f8')),
+    ('low', np.dtype('<f8')),
+    ('close', np.dtype('<f8')),
+    ('volume', np.dtype('<i8')),
+    ('dividends', np.dtype('<f8')),
+    ('splits', np.dtype('<f8')),
+)
+
+
+def day_number(value):
+    """
+    Days since 1970-01-01, the on-disk representation of a bar date.
+    """
+    return (value - EPOCH).days
+
+
+def day_numbers(dates):
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64).astype('<i4')
+
+
+class BarSlice:
+    """
+    A contiguous run of daily bars. Each attribute (date, open, high, low, close,
+    volume, dividends, splits) is a NumPy array; when read from a BarFile they
+    are zero-copy views into the memory-mapped columns, so slicing costs nothing
+    until a value is touched.
+    """
+
+    __slots__ = [name for name, _ in COLUMNS]
+
+    def __init__(self, **columns):
+        for name, dtype in COLUMNS:
+            setattr(self, name, columns.get(name, np.empty(0, dtype=dtype)))
+
+    def __len__(self):
+        return len(self.date)
+
+    def __getitem__(self, key):
+        return BarSlice(**{name: getattr(self, name)[key] for name, _ in COLUMNS})
+
+    def dates(self):
+        return self.date.astype('datetime64[D]')
+
+    def records(self):
+        """
+        List of {'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Dividends',
+        'Stock Splits'} dictionaries, with 'Date' at midnight New York time like
+        yfinance history indexes.
+        """
+        dates = [datetime.combine(d, time(), MARKET_TZ) for d in self.dates().tolist()]
+        return [
+            {"Date": d, "Open": o, "High": h, "Low": lo, "Close": c, "Volume": v, "Dividends": dv, "Stock Splits": sp}
+            for d, o, h, lo, c, v, dv, sp in zip(
+                dates, self.open.tolist(), self.high.tolist(), self.low.tolist(),
+                self.close.tolist(), self.volume.tolist(), self.dividends.tolist(), self.splits.tolist(),
+            )
+        ]
+
+
+class BarFile:
+    """
+    Append-only columnar storage for one symbol's daily bars.
+
+    The symbol directory holds one raw little-endian file per column plus
+    meta.json, which records the number of valid rows, the settled coverage
+    range and a generation counter. Rows are sorted by date. New bars are
+    appended at the end (only the trailing, not yet settled bar is ever
+    overwritten in place). Prepending older history writes a complete new set
+    of column files named after the next generation, and only then points
+    meta.json at it, so a lock-free reader maps either the old set or the new
+    one, never a mix. The previous generation is kept for readers still
+    holding the old meta; older ones are deleted. Files never shrink, so
+    existing memory maps stay valid.
+    """
+
+    def __init__(self, root, symbol):
+        self.symbol = symbol
+        self.path = os.path.join(root, symbol)
+
+    def _column_path(self, name, generation):
+        return os.path.join(self.path, f'{name}.bin' if not generation else f'{name}.{generation}.bin')
+
+    def meta(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, meta):
+        target = os.path.join(self.path, 'meta.json')
+        tmp = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, target)
+
+    def columns(self, meta):
+        """
+        Memory-maps the first meta['rows'] rows of every column. A column
+        missing from a file written before it existed reads as zeros.
+        """
+        rows = meta['rows']
+        if rows == 0:
+            return BarSlice()
+        columns = {}
+        for name, dtype in COLUMNS:
+            path = self._column_path(name, meta['generation'])
+            if os.path.exists(path):
+                columns[name] = np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+            else:
+                columns[name] = np.zeros(rows, dtype=dtype)
+        return BarSlice(**columns)
+
+    def lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        return _FileLock(os.path.join(self.path, '.lock'))
+
+    def write(self, bars, meta_updates):
+        """
+        Merges `bars` (a BarSlice sorted by date) into the file and applies
+        `meta_updates`. Must be called while holding lock(). Bars dated before the
+        first stored row trigger a rewrite; all others are written from the first
+        stored row with a date >= bars.date[0], replacing the stale tail.
+        """
+        meta = self.meta() or {'rows': 0, 'generation': 0}
+        existing = self.columns(meta)
+        if len(bars) and len(existing) and bars.date[0] < existing.date[0]:
+            keep = existing[np.searchsorted(existing.date, bars.date[-1], side='right'):]
+            merged = BarSlice(**{
+                name: np.concatenate((getattr(bars, name), getattr(keep, name))).astype(dtype)
+                for name, dtype in COLUMNS
+            })
+            generation = meta['generation'] + 1
+            for name, dtype in COLUMNS:
+                getattr(merged, name).astype(dtype).tofile(self._column_path(name, generation))
+            meta.update(meta_updates, rows=len(merged), generation=generation)
+            self._write_meta(meta)
+            self._remove_generation(generation - 2)
+            return meta
+        if len(bars):
+            offset = int(np.searchsorted(existing.date, bars.date[0], side='left'))
+            for name, dtype in COLUMNS:
+                path = self._column_path(name, meta['generation'])
+                mode = 'r+b' if os.path.exists(path) else 'wb'
+                with open(path, mode) as f:
+                    f.seek(offset * dtype.itemsize)
+                    f.write(np.ascontiguousarray(getattr(bars, name), dtype=dtype).tobytes())
+            meta['rows'] = offset + len(bars)
+        meta.update(meta_updates)
+        self._write_meta(meta)
+        return meta
+
+    def _remove_generation(self, generation):
+        if generation < 0:
+            return
+        for name, _ in COLUMNS:
+            try:
+                os.remove(self._column_path(name, generation))
+            except OSError:
+                # Missing, or still mapped on a platform that forbids deleting it.
+                pass
+
+
+class _FileLock:
+    """
+    Exclusive writer lock: a per-path thread lock plus an advisory flock where supported.
+    """
+
+    _thread_locks = {}
+    _guard = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        with self._guard:
+            self.thread_lock = self._thread_locks.setdefault(path, threading.Lock())
+        self.handle = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            self.handle = open(self.path, 'a')
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+        self.thread_lock.release()
+
+
+class MappedColumns:
+    """
+    Small LRU of open memory maps keyed by (symbol, generation, rows), so
+    repeated reads of a symbol reuse the same mapping.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bar_file, meta):
+        key = (bar_file.symbol, meta['generation'], meta['rows'])
+        with self._lock:
+            columns = self._maps.get(key)
+            if columns is not None:
+                self._maps.move_to_end(key)
+                return columns
+        columns = bar_file.columns(meta)
+        with self._lock:
+            self._maps[key] = columns
+            while len(self._maps) > self.max_entries:
+                self._maps.popitem(last=False)
+        return columns
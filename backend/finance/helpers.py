@@ -1,17 +1,23 @@
-import yfinance as yf
+import asyncio
+from datetime import timedelta
+
+import numpy as np
+
+from finance.columnar import day_number
+from finance.providers import get_provider
+from finance.cache import quote_cache, info_cache
+from finance.barstore import read_bars, read_bars_many, aread_bars
+
+# A close up to a week before the requested day stands in for weekends and holidays.
+CLOSE_LOOKBACK_DAYS = 7
 
 def get_stock_price(symbol):
     """
     Returns the current closing price for the given stock symbol.
     If data is not available, returns None.
+    Quotes are served from the in-process quote cache.
     """
-    ticker = yf.Ticker(symbol)
-    history = ticker.history(period="1d")
-    if history.empty:
-        return None
-    return history['Close'].iloc[-1]
-
-import yfinance as yf
+    return quote_cache.get_or_load(symbol.upper(), lambda: get_provider().get_price(symbol))
 
 def get_stock_info(symbol):
     """
@@ -21,71 +27,171 @@ def get_stock_info(symbol):
     - currency
     - regularMarketPrice
     - quoteType (type of investment: e.g., EQUITY, ETF, MUTUALFUND)
+    Results are served from the in-process metadata cache.
+    """
+    return dict(info_cache.get_or_load(symbol.upper(), lambda: _stock_info(symbol, get_provider().get_info(symbol))))
+
+def get_stock_close(symbol, day):
+    """
+    Returns the closing price of the given stock symbol on `day`, or on the
+    last trading day before it (within a week), from the local bar store.
+    If no bar is available, returns None.
+    """
+    return get_stock_closes([(symbol, day)])[(symbol, day)]
+
+def get_stock_closes(pairs):
+    """
+    Batch get_stock_close returning {(symbol, day): close or None}. Bars
+    missing from the store are fetched with a single multi-symbol request,
+    then each symbol's range is read once and all of its days are looked up
+    with one binary search.
     """
-    ticker = yf.Ticker(symbol)
-    info = ticker.info
+    pairs = list(dict.fromkeys(pairs))
+    by_symbol = {}
+    for symbol, day in pairs:
+        by_symbol.setdefault(symbol.upper(), []).append((symbol, day))
+    if not by_symbol:
+        return {}
+    first = min(day for _, day in pairs) - timedelta(days=CLOSE_LOOKBACK_DAYS)
+    last = max(day for _, day in pairs)
+    bars = read_bars_many(list(by_symbol), first, last + timedelta(days=1))
+
+    closes = {}
+    for symbol, keys in by_symbol.items():
+        dates, close = bars[symbol].date, bars[symbol].close
+        days = np.array([day_number(day) for _, day in keys], dtype=np.int64)
+        index = np.searchsorted(dates, days, side='right') - 1
+        found = (index >= 0) & (days - dates[np.maximum(index, 0)] <= CLOSE_LOOKBACK_DAYS) if len(dates) else np.zeros(len(days), dtype=bool)
+        for key, i, ok in zip(keys, index, found):
+            closes[key] = float(close[i]) if ok else None
+    return closes
+
+def get_stock_prices(symbols):
+    """
+    Returns {symbol: current price or None} for several symbols. Cached quotes
+    are reused and the rest are fetched with one multi-symbol request, which
+    also warms the cache for later get_stock_price calls. Keys are upper-cased.
+    """
+    symbols = [symbol.upper() for symbol in symbols]
+    return quote_cache.get_many_or_load(symbols, lambda missing: get_provider().get_prices(missing))
+
+def get_stock_infos(symbols):
+    """
+    Batch get_stock_info returning {symbol: info}; see get_stock_prices.
+    """
+    symbols = [symbol.upper() for symbol in symbols]
+
+    def load(missing):
+        return {symbol: _stock_info(symbol, info) for symbol, info in get_provider().get_infos(missing).items()}
+
+    return {symbol: dict(info) for symbol, info in info_cache.get_many_or_load(symbols, load).items()}
+
+def _stock_info(symbol, info):
     return {
         "symbol": symbol,
         "shortName": info.get("shortName"),
         "longName": info.get("longName"),
         "currency": info.get("currency"),
         "regularMarketPrice": info.get("regularMarketPrice"),
-        "type": info.get("quoteType") 
+        "type": info.get("quoteType")
     }
 
 
 def get_stock_history(symbol, start_date, end_date):
     """
     Returns historical stock data for the given symbol between start_date and end_date.
-    The data is returned as a list of dictionaries (one per day) using the history() method.
+    The data is returned as a list of dictionaries (one per day) read from the local bar store.
     If no data is available, returns None.
     """
-    ticker = yf.Ticker(symbol)
-    history = ticker.history(start=start_date, end=end_date)
-    if history.empty:
+    bars = read_bars(symbol, start_date, end_date)
+    if not len(bars):
         return None
-    return history.reset_index().to_dict(orient='records')
+    return bars.records()
+
+def get_stock_histories(symbols, start_date, end_date):
+    """
+    Batch get_stock_history returning {symbol: list of bars or None}. Gaps in the
+    bar store are filled with a single multi-symbol download.
+    """
+    symbols = [symbol.upper() for symbol in symbols]
+    return {
+        symbol: bars.records() if len(bars) else None
+        for symbol, bars in read_bars_many(symbols, start_date, end_date).items()
+    }
 
 def fetch_stock_data(ticker_symbol, start=None, end=None):
     try:
-        ticker = yf.Ticker(ticker_symbol)
-        info = ticker.info
-        
-        data = {
-            "asset_name": info.get("longName", "N/A"),
-            "symbol": info.get("symbol", ticker_symbol),
-            "type": info.get("quoteType", "N/A"),
-            "sector": info.get("sector", "N/A"),
-            "industry": info.get("industry", "N/A"),
-            "current_price": info.get("currentPrice", "N/A"),
-            "market_cap": info.get("marketCap", "N/A"),
-            "dividend_yield": info.get("dividendYield", 0.0),
-            "dividend_rate": info.get("dividendRate", 0.0),
-            "trailing_pe": info.get("trailingPE", "N/A"),
-            "forward_pe": info.get("forwardPE", "N/A"),
-            "beta": info.get("beta", "N/A"),
-            "52_week_high": info.get("fiftyTwoWeekHigh", "N/A"),
-            "52_week_low": info.get("fiftyTwoWeekLow", "N/A"),
-        }
-
-        hist = ticker.history(start=start, end=end)
-        historical_data = hist.reset_index().to_dict(orient="records")
-
-        data["historical_data"] = historical_data
+        data = _stock_data(ticker_symbol, get_provider().get_info(ticker_symbol))
+        data["historical_data"] = read_bars(ticker_symbol, start, end).records()
 
         return data
 
     except Exception as e:
         return {"error": str(e)}
 
+def _stock_data(ticker_symbol, info):
+    return {
+        "asset_name": info.get("longName", "N/A"),
+        "symbol": info.get("symbol", ticker_symbol),
+        "type": info.get("quoteType", "N/A"),
+        "sector": info.get("sector", "N/A"),
+        "industry": info.get("industry", "N/A"),
+        "current_price": info.get("currentPrice", "N/A"),
+        "market_cap": info.get("marketCap", "N/A"),
+        "dividend_yield": info.get("dividendYield", 0.0),
+        "dividend_rate": info.get("dividendRate", 0.0),
+        "trailing_pe": info.get("trailingPE", "N/A"),
+        "forward_pe": info.get("forwardPE", "N/A"),
+        "beta": info.get("beta", "N/A"),
+        "52_week_high": info.get("fiftyTwoWeekHigh", "N/A"),
+        "52_week_low": info.get("fiftyTwoWeekLow", "N/A"),
+    }
+
 def get_stock_news(symbol):
     """
-    Returns a list of news articles for the given stock symbol using yfinance.
+    Returns a list of news articles for the given stock symbol.
     Each news article is represented as a dictionary.
     If no news is available, returns an empty list.
     """
-    ticker = yf.Ticker(symbol)
-    news = ticker.news
+    news = get_provider().get_news(symbol)
     if not news:
         return []
-    return news
\ No newline at end of file
+    return news
+
+async def aget_stock_price(symbol):
+    """
+    Async get_stock_price: cache hits are answered on the event loop, misses
+    await the provider's async interface.
+    """
+    return await quote_cache.aget_or_load(symbol.upper(), lambda: get_provider().aget_price(symbol))
+
+async def aget_stock_info(symbol):
+    async def load():
+        return _stock_info(symbol, await get_provider().aget_info(symbol))
+
+    return dict(await info_cache.aget_or_load(symbol.upper(), load))
+
+async def aget_stock_history(symbol, start_date, end_date):
+    bars = await aread_bars(symbol, start_date, end_date)
+    if not len(bars):
+        return None
+    return bars.records()
+
+async def afetch_stock_data(ticker_symbol, start=None, end=None):
+    """
+    Async fetch_stock_data: the metadata and history requests run concurrently.
+    """
+    try:
+        info, bars = await asyncio.gather(
+            get_provider().aget_info(ticker_symbol),
+            aread_bars(ticker_symbol, start, end),
+        )
+        data = _stock_data(ticker_symbol, info)
+        data["historical_data"] = bars.records()
+        return data
+
+    except Exception as e:
+        return {"error": str(e)}
+
+async def aget_stock_news(symbol):
+    return await get_provider().aget_news(symbol) or []
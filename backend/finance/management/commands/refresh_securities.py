@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from finance.models import Security
+from finance.securities import get_securities, refresh_securities
+
+
+class Command(BaseCommand):
+    help = "Re-fetch security master metadata that is older than the refresh interval (run it on a daily schedule)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbol', action='append', help="Refresh (or register) only these symbols, regardless of age.")
+        parser.add_argument('--older-than', type=float, default=getattr(settings, 'SECURITY_REFRESH_AFTER_HOURS', 24),
+                            help="Refresh rows last refreshed more than this many hours ago.")
+
+    def handle(self, *args, **options):
+        if options['symbol']:
+            symbols = [symbol.upper() for symbol in options['symbol']]
+            get_securities(symbols)
+            securities = Security.objects.filter(symbol__in=symbols)
+        else:
+            cutoff = timezone.now() - timedelta(hours=options['older_than'])
+            securities = Security.objects.filter(refreshed_at__lt=cutoff)
+
+        refreshed = refresh_securities(securities.order_by('symbol'))
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} securit{'y' if refreshed == 1 else 'ies'}."))
@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils import timezone
+
+class Security(models.Model):
+    """
+    Local security master: descriptive metadata of a symbol. Rows are created
+    lazily by finance.securities the first time a symbol is seen and kept up to
+    date by the refresh_securities management command.
+    """
+    symbol = models.CharField(max_length=50, unique=True, help_text="Upper-case ticker symbol.")
+    short_name = models.CharField(max_length=255, blank=True)
+    long_name = models.CharField(max_length=255, blank=True)
+    quote_type = models.CharField(max_length=20, blank=True, help_text="Type of investment (e.g., 'EQUITY', 'ETF', 'MUTUALFUND').")
+    currency = models.CharField(max_length=10, blank=True)
+    sector = models.CharField(max_length=100, blank=True)
+    industry = models.CharField(max_length=100, blank=True)
+    exchange = models.CharField(max_length=20, blank=True)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'securities'
+
+    def __str__(self):
+        return f"{self.symbol} ({self.short_name or self.long_name})"
+
+    @property
+    def name(self):
+        return self.short_name or self.symbol
+
+    @property
+    def investment_type(self):
+        return self.quote_type or 'Unknown'
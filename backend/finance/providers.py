@@ -0,0 +1,335 @@
+import zlib
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+MARKET_TIMEZONE = 'America/New_York'
+
+
+def to_date(value):
+    """
+    Normalizes a date, datetime, ISO string or pandas Timestamp to a date.
+    Returns None when no value is given.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def empty_history():
+    """
+    Returns an empty history frame with the same shape yfinance produces.
+    """
+    index = pd.DatetimeIndex([], tz=MARKET_TIMEZONE, name='Date')
+    return pd.DataFrame(columns=HISTORY_COLUMNS, index=index, dtype=float)
+
+
+class MarketDataProvider:
+    """
+    Interface every market data source implements. finance.helpers dispatches
+    through the provider configured in settings.MARKET_DATA_PROVIDER, so the
+    rest of the app never talks to a data vendor directly.
+
+    - get_price returns the latest price as a float, or None.
+    - get_info returns the raw metadata dictionary (yfinance `info` keys).
+    - get_history returns a daily OHLCV DataFrame indexed by 'Date'; `end` is exclusive.
+    - get_news returns a list of article dictionaries.
+    - get_prices, get_infos and get_histories are the multi-symbol forms of the
+      above and return {symbol: result}. The defaults loop over the single-symbol
+      methods; providers with a bulk API override them.
+
+    The a-prefixed coroutines are the async counterparts used by the ASGI views.
+    By default they run the blocking method in a worker thread (not the shared
+    sync thread), so concurrent awaits overlap; providers with a native async
+    client can override them.
+    """
+
+    def get_price(self, symbol):
+        raise NotImplementedError
+
+    def get_info(self, symbol):
+        raise NotImplementedError
+
+    def get_history(self, symbol, start=None, end=None):
+        raise NotImplementedError
+
+    def get_news(self, symbol):
+        raise NotImplementedError
+
+    def get_prices(self, symbols):
+        return {symbol: self.get_price(symbol) for symbol in symbols}
+
+    def get_infos(self, symbols):
+        return {symbol: self.get_info(symbol) for symbol in symbols}
+
+    def get_histories(self, symbols, start=None, end=None):
+        return {symbol: self.get_history(symbol, start=start, end=end) for symbol in symbols}
+
+    async def aget_price(self, symbol):
+        return await sync_to_async(self.get_price, thread_sensitive=False)(symbol)
+
+    async def aget_info(self, symbol):
+        return await sync_to_async(self.get_info, thread_sensitive=False)(symbol)
+
+    async def aget_history(self, symbol, start=None, end=None):
+        return await sync_to_async(self.get_history, thread_sensitive=False)(symbol, start=start, end=end)
+
+    async def aget_news(self, symbol):
+        return await sync_to_async(self.get_news, thread_sensitive=False)(symbol)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Live data from Yahoo Finance through yfinance.
+    """
+
+    def _ticker(self, symbol):
+        import yfinance as yf
+        return yf.Ticker(symbol)
+
+    def get_price(self, symbol):
+        history = self._ticker(symbol).history(period="1d")
+        if history.empty:
+            return None
+        return history['Close'].iloc[-1]
+
+    def get_info(self, symbol):
+        return self._ticker(symbol).info
+
+    def get_history(self, symbol, start=None, end=None):
+        return self._ticker(symbol).history(start=start, end=end)
+
+    def get_news(self, symbol):
+        return self._ticker(symbol).news or []
+
+    def _download(self, symbols, **kwargs):
+        """
+        One multi-ticker request through yf.download, split into a frame per symbol.
+        Rows where a symbol has no bar (all NaN) are dropped from its frame.
+        """
+        import yfinance as yf
+        data = yf.download(symbols, group_by='ticker', auto_adjust=True, progress=False, **kwargs)
+        frames = {}
+        for symbol in symbols:
+            if data is None or data.empty:
+                frames[symbol] = empty_history()
+            elif isinstance(data.columns, pd.MultiIndex):
+                if symbol in data.columns.get_level_values(0):
+                    frames[symbol] = data[symbol].dropna(how='all')
+                else:
+                    frames[symbol] = empty_history()
+            else:
+                frames[symbol] = data.dropna(how='all')
+        return frames
+
+    def get_prices(self, symbols):
+        """
+        Latest close of every symbol from a single download. A few days are
+        requested so a symbol that did not trade today still gets a price.
+        """
+        prices = {}
+        for symbol, history in self._download(list(symbols), period='5d').items():
+            closes = history['Close'].dropna() if 'Close' in history else history
+            prices[symbol] = closes.iloc[-1] if len(closes) else None
+        return prices
+
+    def get_infos(self, symbols):
+        """
+        Yahoo has no multi-symbol metadata call; yf.Tickers at least shares one
+        session (connection pool and cookie/crumb) across the requests.
+        """
+        import yfinance as yf
+        tickers = yf.Tickers(' '.join(symbols))
+        return {symbol: tickers.tickers[symbol.upper()].info for symbol in symbols}
+
+    def get_histories(self, symbols, start=None, end=None):
+        return self._download(list(symbols), start=start, end=end, actions=True)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic offline data for load tests and benchmarks.
+
+    Every symbol gets a seeded geometric random walk of business-day bars
+    starting at `origin`. The walk only depends on (seed, symbol), so any date
+    range of the same symbol always returns the same bars, and two processes
+    configured with the same seed agree with each other.
+    """
+
+    QUOTE_TYPES = ['EQUITY', 'EQUITY', 'EQUITY', 'ETF', 'MUTUALFUND']
+    SECTORS = [
+        ('Technology', 'Software - Infrastructure'),
+        ('Healthcare', 'Drug Manufacturers - General'),
+        ('Financial Services', 'Banks - Diversified'),
+        ('Energy', 'Oil & Gas Integrated'),
+        ('Consumer Cyclical', 'Specialty Retail'),
+        ('Industrials', 'Aerospace & Defense'),
+        ('Utilities', 'Utilities - Regulated Electric'),
+    ]
+    HEADLINES = [
+        "{name} beats quarterly earnings expectations",
+        "{name} announces new product line",
+        "Analysts issue downgrade on {name}",
+        "{name} expands into new markets",
+        "{name} faces regulatory risk in Europe",
+        "{name} raises full-year guidance",
+        "Profit warning from {name} rattles investors",
+        "{name} shares steady ahead of investor day",
+    ]
+
+    def __init__(self, seed=0, origin='2000-01-03', anchor='2020-01-02', news_per_day=3):
+        self.seed = int(seed)
+        self.origin = to_date(origin)
+        self.anchor = pd.Timestamp(to_date(anchor), tz=MARKET_TIMEZONE)
+        self.news_per_day = news_per_day
+
+    def _rng(self, symbol, *stream):
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.upper().encode()), *stream])
+
+    def _profile(self, symbol):
+        rng = self._rng(symbol, 0)
+        base, drift, volatility, volume = rng.uniform([10, -0.03, 0.12, 2e5], [400, 0.12, 0.55, 5e7])
+        return base, drift, volatility, volume
+
+    @lru_cache(maxsize=512)
+    def _series(self, symbol, through):
+        """
+        Full bar series for `symbol` from the origin through the date `through`.
+        Each column draws from its own stream so a longer series always starts
+        with exactly the bars of a shorter one. The walk is pinned to the
+        symbol's base price on the anchor date to keep prices plausible.
+        """
+        dates = pd.bdate_range(self.origin, through, tz=MARKET_TIMEZONE, name='Date')
+        n = len(dates)
+        base, drift, volatility, volume = self._profile(symbol)
+        daily_vol = volatility / np.sqrt(252)
+
+        returns = self._rng(symbol, 1).normal(drift / 252 - daily_vol ** 2 / 2, daily_vol, n)
+        walk = np.cumsum(returns)
+        pin = min(dates.searchsorted(self.anchor), n - 1) if n else 0
+        close = base * np.exp(walk - walk[pin]) if n else walk
+        gaps = self._rng(symbol, 2).normal(0, daily_vol / 4, n)
+        open_ = np.concatenate((close[:1], close[:-1])) * np.exp(gaps)
+        wicks = np.abs(self._rng(symbol, 3).normal(0, daily_vol / 2, (2, n)))
+        high = np.maximum(open_, close) * (1 + wicks[0])
+        low = np.minimum(open_, close) * (1 - wicks[1])
+        volumes = np.round(volume * self._rng(symbol, 4).lognormal(0, 0.35, n))
+
+        frame = pd.DataFrame({
+            'Open': open_.round(4),
+            'High': high.round(4),
+            'Low': low.round(4),
+            'Close': close.round(4),
+            'Volume': volumes.astype(np.int64),
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=dates)
+        return frame
+
+    def _today(self):
+        return datetime.now().date()
+
+    def get_history(self, symbol, start=None, end=None):
+        today = self._today()
+        end = to_date(end)
+        start = to_date(start)
+        last = min(end - timedelta(days=1), today) if end else today
+        first = start or last - timedelta(days=30)
+        if last < max(first, self.origin):
+            return empty_history()
+        frame = self._series(symbol.upper(), today)
+        window = frame.loc[pd.Timestamp(first, tz=MARKET_TIMEZONE):pd.Timestamp(last, tz=MARKET_TIMEZONE)]
+        return window.copy()
+
+    def get_price(self, symbol):
+        frame = self._series(symbol.upper(), self._today())
+        if frame.empty:
+            return None
+        return float(frame['Close'].iloc[-1])
+
+    def get_info(self, symbol):
+        symbol = symbol.upper()
+        rng = self._rng(symbol, 5)
+        frame = self._series(symbol, self._today())
+        year = frame['Close'].iloc[-252:]
+        price = float(frame['Close'].iloc[-1]) if len(frame) else None
+        if symbol.startswith('^'):
+            quote_type, sector, industry = 'INDEX', None, None
+        else:
+            quote_type = self.QUOTE_TYPES[rng.integers(len(self.QUOTE_TYPES))]
+            sector, industry = self.SECTORS[rng.integers(len(self.SECTORS))]
+        name = f"{symbol.lstrip('^')} Synthetic"
+        shares = float(rng.uniform(5e7, 5e9))
+        dividend_yield = float(rng.choice([0.0, rng.uniform(0.005, 0.05)]))
+        return {
+            "symbol": symbol,
+            "shortName": name,
+            "longName": f"{name} Holdings Inc.",
+            "quoteType": quote_type,
+            "currency": "USD",
+            "exchange": "SYN",
+            "sector": sector,
+            "industry": industry,
+            "currentPrice": price,
+            "regularMarketPrice": price,
+            "marketCap": int(shares * price) if price else None,
+            "dividendYield": dividend_yield,
+            "dividendRate": round(dividend_yield * price, 4) if price else 0.0,
+            "trailingPE": round(float(rng.uniform(8, 45)), 2),
+            "forwardPE": round(float(rng.uniform(8, 40)), 2),
+            "beta": round(float(rng.uniform(0.4, 1.8)), 3),
+            "fiftyTwoWeekHigh": float(year.max()) if len(year) else None,
+            "fiftyTwoWeekLow": float(year.min()) if len(year) else None,
+        }
+
+    def get_news(self, symbol):
+        symbol = symbol.upper()
+        today = self._today()
+        rng = self._rng(symbol, 6, today.toordinal())
+        name = f"{symbol.lstrip('^')} Synthetic"
+        published = int(datetime.combine(today, datetime.min.time()).timestamp())
+        picks = rng.choice(len(self.HEADLINES), size=self.news_per_day, replace=False)
+        return [
+            {
+                "uuid": f"synthetic-{symbol}-{today.isoformat()}-{i}",
+                "title": self.HEADLINES[pick].format(name=name),
+                "publisher": "Synthetic Wire",
+                "link": f"https://example.com/news/{symbol.lower()}/{today.isoformat()}/{i}",
+                "providerPublishTime": published - i * 3600,
+                "type": "STORY",
+            }
+            for i, pick in enumerate(picks)
+        ]
+
+
+_provider = None
+
+
+def get_provider():
+    """
+    Returns the process-wide provider described by settings.MARKET_DATA_PROVIDER.
+    """
+    global _provider
+    if _provider is None:
+        config = getattr(settings, 'MARKET_DATA_PROVIDER', {})
+        backend = import_string(config.get('BACKEND', 'finance.providers.YFinanceProvider'))
+        _provider = backend(**config.get('OPTIONS', {}))
+    return _provider
+
+
+def reset_provider():
+    """
+    Drops the configured provider so the next call rebuilds it from settings.
+    """
+    global _provider
+    _provider = None
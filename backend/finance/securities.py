@@ -0,0 +1,81 @@
+from django.utils import timezone
+
+from finance.cache import security_cache
+from finance.models import Security
+from finance.providers import get_provider
+
+# Security field -> key of the provider's raw info dictionary.
+INFO_FIELDS = {
+    'short_name': 'shortName',
+    'long_name': 'longName',
+    'quote_type': 'quoteType',
+    'currency': 'currency',
+    'sector': 'sector',
+    'industry': 'industry',
+    'exchange': 'exchange',
+}
+
+
+def security_fields(info):
+    """
+    Maps a provider info dictionary onto Security field values.
+    """
+    fields = {}
+    for field, key in INFO_FIELDS.items():
+        max_length = Security._meta.get_field(field).max_length
+        fields[field] = str(info.get(key) or '')[:max_length]
+    return fields
+
+
+def _load(symbols):
+    """
+    Reads `symbols` (upper case) from the table and creates the missing rows
+    from a single batch metadata request.
+    """
+    found = {security.symbol: security for security in Security.objects.filter(symbol__in=symbols)}
+    missing = [symbol for symbol in symbols if symbol not in found]
+    if missing:
+        infos = get_provider().get_infos(missing)
+        Security.objects.bulk_create(
+            [Security(symbol=symbol, **security_fields(infos.get(symbol) or {})) for symbol in missing],
+            ignore_conflicts=True,
+        )
+        found.update((security.symbol, security) for security in Security.objects.filter(symbol__in=missing))
+    return found
+
+
+def get_securities(symbols):
+    """
+    Returns {symbol: Security} for the given symbols, keyed as passed in.
+
+    Lookups go through the in-process security cache, then the Security table;
+    only symbols never seen before cost a metadata request upstream.
+    """
+    symbols = list(symbols)
+    securities = security_cache.get_many_or_load([symbol.upper() for symbol in symbols], _load)
+    return {symbol: securities.get(symbol.upper()) for symbol in symbols}
+
+
+def get_security(symbol):
+    return get_securities([symbol])[symbol]
+
+
+def refresh_securities(securities, batch_size=100):
+    """
+    Re-fetches the metadata of the given Security rows in batches and saves
+    them. Returns the number of rows refreshed.
+    """
+    securities = list(securities)
+    provider = get_provider()
+    for i in range(0, len(securities), batch_size):
+        batch = securities[i:i + batch_size]
+        infos = provider.get_infos([security.symbol for security in batch])
+        now = timezone.now()
+        for security in batch:
+            for field, value in security_fields(infos.get(security.symbol) or {}).items():
+                setattr(security, field, value)
+            security.refreshed_at = now
+        Security.objects.bulk_update(batch, [*INFO_FIELDS, 'refreshed_at'])
+        for security in batch:
+            security_cache.delete(security.symbol)
+    return len(securities)
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from finance.cache import quote_cache
+from finance.providers import get_provider
+
+STREAM_DEFAULTS = {
+    'INTERVAL': 5,
+    'MAX_SYMBOLS': 50,
+    'HEARTBEAT': 15,
+    'TICKET_TTL': 60,
+}
+TICKET_SALT = 'finance.stream.ticket'
+
+
+def stream_settings():
+    return {**STREAM_DEFAULTS, **getattr(settings, 'QUOTE_STREAM', {})}
+
+
+def stream_ticket(user):
+    """
+    A signed, short-lived (TICKET_TTL seconds) credential for opening the quote
+    stream, for browsers whose EventSource cannot send the Authorization header.
+    """
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user.pk))
+
+
+class StreamTicketAuthentication(BaseAuthentication):
+    """
+    Authenticates a request by the stream_ticket in its `ticket` query parameter.
+    """
+
+    def authenticate(self, request):
+        ticket = request.GET.get('ticket')
+        if not ticket:
+            return None
+        try:
+            user_id = signing.TimestampSigner(salt=TICKET_SALT).unsign(ticket, max_age=stream_settings()['TICKET_TTL'])
+        except signing.SignatureExpired:
+            raise AuthenticationFailed("Stream ticket expired.")
+        except signing.BadSignature:
+            raise AuthenticationFailed("Invalid stream ticket.")
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed("User inactive or deleted.")
+        return user, None
+
+
+class Subscription:
+    """
+    One client's symbols and the quotes not yet sent to it. Quotes published
+    while the client is busy are merged (latest price per symbol), so a slow
+    client gets fewer, fresher events instead of an unbounded backlog.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = frozenset(symbols)
+        self.pending = {}
+        self.since = None
+        self.ready = asyncio.Event()
+
+    def push(self, quotes, polled_at):
+        self.pending.update(quotes)
+        if self.since is None:
+            self.since = polled_at
+        self.ready.set()
+
+    async def next(self, timeout):
+        """
+        The pending quotes and the poll time of the oldest of them, or None
+        when nothing arrived within `timeout` seconds.
+        """
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        quotes, since = self.pending, self.since
+        self.pending, self.since = {}, None
+        self.ready.clear()
+        return quotes, since
+
+
+class QuoteHub:
+    """
+    Fans quotes out to every subscription of one event loop.
+
+    A single poller task fetches the union of the subscribed symbols with one
+    upstream batch request per interval, so the upstream load follows the
+    number of distinct symbols, not of connected clients. Each symbol's
+    subscribers are indexed, and only changed prices are pushed to them. The
+    fetched quotes also refresh the quote cache (and so its subscribers, such
+    as the live portfolio valuations). The poller starts with the first
+    subscription and stops with the last.
+    """
+
+    def __init__(self):
+        self.by_symbol = {}
+        self.subscriptions = set()
+        self.last = {}
+        self.task = None
+        self.wakeup = asyncio.Event()
+        self.polls = 0
+        self.polled_symbols = 0
+        self.errors = 0
+        self.last_error = None
+        self.deliveries = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def subscribe(self, symbols):
+        subscription = Subscription(symbol.upper() for symbol in symbols)
+        self.subscriptions.add(subscription)
+        new = False
+        for symbol in subscription.symbols:
+            holders = self.by_symbol.setdefault(symbol, set())
+            new |= not holders
+            holders.add(subscription)
+        known = {symbol: self.last[symbol] for symbol in subscription.symbols if symbol in self.last}
+        if known:
+            subscription.push(known, time.monotonic())
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
+        elif new:
+            # Fetch the new symbols now rather than at the next interval.
+            self.wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+        for symbol in subscription.symbols:
+            holders = self.by_symbol.get(symbol)
+            if holders is None:
+                continue
+            holders.discard(subscription)
+            if not holders:
+                del self.by_symbol[symbol]
+                self.last.pop(symbol, None)
+        if not self.subscriptions and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        while self.by_symbol:
+            # Cleared before polling, so a subscription added during the poll
+            # still cuts the following wait short.
+            self.wakeup.clear()
+            await self.poll()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), stream_settings()['INTERVAL'])
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll(self):
+        symbols = sorted(self.by_symbol)
+        self.polls += 1
+        self.polled_symbols += len(symbols)
+        try:
+            prices = await sync_to_async(get_provider().get_prices, thread_sensitive=False)(symbols)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            return
+        prices = {symbol.upper(): price for symbol, price in prices.items() if price is not None}
+        quote_cache.set_many(prices)
+        self.publish(prices)
+
+    def publish(self, prices):
+        polled_at = time.monotonic()
+        changed = {symbol: price for symbol, price in prices.items() if symbol in self.by_symbol and self.last.get(symbol) != price}
+        self.last.update(changed)
+        batches = {}
+        for symbol, price in changed.items():
+            for subscription in self.by_symbol[symbol]:
+                batches.setdefault(subscription, {})[symbol] = price
+        for subscription, quotes in batches.items():
+            subscription.push(quotes, polled_at)
+
+    def delivered(self, since):
+        latency = time.monotonic() - since
+        self.deliveries += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def stats(self):
+        return {
+            "subscribers": len(self.subscriptions),
+            "symbols": len(self.by_symbol),
+            "subscriptions_by_symbol": {symbol: len(holders) for symbol, holders in sorted(self.by_symbol.items())},
+            "polls": self.polls,
+            "polled_symbols": self.polled_symbols,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "deliveries": self.deliveries,
+            "fanout_latency_ms": {
+                "mean": self.latency_total / self.deliveries * 1000 if self.deliveries else None,
+                "max": self.latency_max * 1000,
+            },
+        }
+
+
+# One hub per event loop: asyncio primitives cannot be shared across loops.
+_hubs = weakref.WeakKeyDictionary()
+
+
+def quote_hub():
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = QuoteHub()
+    return hub
+
+
+def stream_stats():
+    """
+    Counters of every live hub of the process (normally one per ASGI worker).
+    """
+    return [hub.stats() for hub in list(_hubs.values())]
+
+
+async def quote_events(symbols):
+    """
+    Server-sent events for `symbols`: a `quotes` event with {symbol: price}
+    whenever prices change (starting with the last known ones), and a comment
+    line every HEARTBEAT seconds of silence to keep the connection open. The
+    subscription ends when the client disconnects.
+    """
+    hub = quote_hub()
+    subscription = hub.subscribe(symbols)
+    heartbeat = stream_settings()['HEARTBEAT']
+    try:
+        while True:
+            batch = await subscription.next(heartbeat)
+            if batch is None:
+                yield ": keep-alive\n\n"
+                continue
+            quotes, since = batch
+            hub.delivered(since)
+            yield f"event: quotes\ndata: {json.dumps(quotes)}\n\n"
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,145 @@
+import asyncio
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+
+from django.test import SimpleTestCase, override_settings
+
+from finance.barstore import bar_file, ensure_range
+from finance.cache import TTLCache
+from finance.columnar import COLUMNS, BarSlice, day_number
+from finance.stream import QuoteHub
+
+
+class FakeDownload:
+    """
+    Records the requested ranges and returns one bar per calendar day whose
+    close is the day number plus the fetch count, so a replaced bar shows.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, symbol, first, last):
+        self.calls.append((first, last))
+        days = np.arange(day_number(first), day_number(last) + 1, dtype='<i4')
+        bars = {name: np.zeros(len(days), dtype=dtype) for name, dtype in COLUMNS}
+        bars.update(date=days, close=days + len(self.calls) / 10)
+        return BarSlice(**bars)
+
+
+class EnsureRangeTests(SimpleTestCase):
+    today = date(2024, 3, 15)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(BAR_STORE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.download = FakeDownload()
+
+    def ensure(self, first, last, today=None):
+        with mock.patch('finance.barstore.market_today', return_value=today or self.today):
+            return ensure_range('TEST', first, last, download=self.download)
+
+    def stored(self, meta):
+        bars = bar_file('TEST').columns(meta)
+        return bars.dates().tolist(), bars.close.tolist()
+
+    def test_first_write_settles_up_to_yesterday(self):
+        meta = self.ensure(date(2024, 3, 1), date(2024, 3, 10))
+        self.assertEqual(self.download.calls, [(date(2024, 3, 1), self.today)])
+        self.assertEqual((meta['start'], meta['end'], meta['refreshed_on']), ('2024-03-01', '2024-03-14', '2024-03-15'))
+        dates, _ = self.stored(meta)
+        self.assertEqual((dates[0], dates[-1], len(dates)), (date(2024, 3, 1), self.today, 15))
+
+        self.ensure(date(2024, 3, 5), date(2024, 3, 14))
+        self.assertEqual(len(self.download.calls), 1)
+
+    def test_left_extension_downloads_only_the_gap(self):
+        self.ensure(date(2024, 3, 1), date(2024, 3, 10))
+        meta = self.ensure(date(2024, 2, 20), date(2024, 3, 10))
+        self.assertEqual(self.download.calls[1], (date(2024, 2, 20), date(2024, 2, 29)))
+        self.assertEqual((meta['start'], meta['end']), ('2024-02-20', '2024-03-14'))
+        dates, _ = self.stored(meta)
+        self.assertEqual(dates, [date(2024, 2, 20) + timedelta(days=i) for i in range(25)])
+
+    def test_right_edge_is_refreshed_once_per_day(self):
+        self.ensure(date(2024, 3, 1), self.today)
+        self.ensure(date(2024, 3, 1), self.today)
+        self.assertEqual(len(self.download.calls), 1)
+
+        tomorrow = self.today + timedelta(days=1)
+        meta = self.ensure(date(2024, 3, 1), tomorrow, today=tomorrow)
+        self.ensure(date(2024, 3, 1), tomorrow, today=tomorrow)
+        self.assertEqual(self.download.calls[1:], [(self.today, tomorrow)])
+        self.assertEqual((meta['end'], meta['refreshed_on']), ('2024-03-15', '2024-03-16'))
+        dates, closes = self.stored(meta)
+        # The partial bar of the 15th was replaced by the next day's download.
+        self.assertEqual(dates[-2:], [self.today, tomorrow])
+        self.assertEqual(closes[-2], day_number(self.today) + 0.2)
+
+    def test_today_only_range_is_not_settled(self):
+        meta = self.ensure(self.today, self.today)
+        self.assertEqual((meta['start'], meta['end']), ('2024-03-15', '2024-03-14'))
+        self.ensure(self.today, self.today)
+        self.assertEqual(len(self.download.calls), 1)
+
+        tomorrow = self.today + timedelta(days=1)
+        meta = self.ensure(self.today, tomorrow, today=tomorrow)
+        self.assertEqual(self.download.calls[1:], [(self.today, tomorrow)])
+        self.assertEqual((meta['start'], meta['end']), ('2024-03-15', '2024-03-15'))
+        dates, closes = self.stored(meta)
+        self.assertEqual(dates, [self.today, tomorrow])
+        self.assertEqual(closes[0], day_number(self.today) + 0.2)
+
+
+class TTLCacheListenerTests(SimpleTestCase):
+    def test_failing_listener_is_counted_not_raised(self):
+        cache = TTLCache('test', max_entries=10, ttl=60)
+        received = []
+
+        def failing(values):
+            raise ValueError('listener bug')
+
+        cache.subscribe(failing)
+        cache.subscribe(received.append)
+        with self.assertLogs('finance.cache', 'ERROR'):
+            cache.set_many({'AAPL': 190.0, 'MSFT': 410.0})
+            cache.set('AAPL', 191.0)
+
+        self.assertEqual(cache.get('AAPL'), 191.0)
+        self.assertEqual(received, [{'AAPL': 190.0, 'MSFT': 410.0}, {'AAPL': 191.0}])
+        self.assertEqual(cache.listener_errors, 2)
+        self.assertEqual(cache.stats()['listener_errors'], 2)
+
+        cache.unsubscribe(failing)
+        cache.set('MSFT', 411.0)
+        self.assertEqual(cache.listener_errors, 2)
+        self.assertEqual(received[-1], {'MSFT': 411.0})
+
+
+class QuoteHubTests(SimpleTestCase):
+    async def test_unsubscribe_drops_the_subscriber(self):
+        hub = QuoteHub()
+        with mock.patch.object(QuoteHub, 'poll', mock.AsyncMock()):
+            first = hub.subscribe(['aapl', 'MSFT'])
+            second = hub.subscribe(['MSFT'])
+            await asyncio.sleep(0)
+            hub.publish({'AAPL': 190.0, 'MSFT': 410.0})
+            task = hub.task
+
+            hub.unsubscribe(first)
+            self.assertEqual(hub.by_symbol, {'MSFT': {second}})
+            self.assertNotIn('AAPL', hub.last)
+            hub.publish({'AAPL': 191.0, 'MSFT': 411.0})
+            self.assertEqual(first.pending, {'AAPL': 190.0, 'MSFT': 410.0})
+            self.assertEqual(second.pending, {'MSFT': 411.0})
+
+            hub.unsubscribe(second)
+            self.assertEqual((hub.subscriptions, hub.by_symbol, hub.task), (set(), {}, None))
+            with self.assertRaises(asyncio.CancelledError):
+                await task
@@ -1,7 +1,14 @@
 from django.contrib import admin
-from .models import Portfolio
+from .models import Portfolio, Position
 
 @admin.register(Portfolio)
 class PortfolioAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'account', 'strategy', 'currency', 'created_at', 'updated_at')
-    ordering = ('name',)
\ No newline at end of file
+    ordering = ('name',)
+
+@admin.register(Position)
+class PositionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'portfolio', 'symbol', 'quantity', 'realized', 'updated_at')
+    list_filter = ('portfolio',)
+    search_fields = ('symbol',)
+    ordering = ('portfolio', 'symbol')
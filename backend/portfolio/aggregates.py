@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+import numpy as np
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+from portfolio.engine import raw_columns
+from transaction.models import Transaction
+
+ZERO = Decimal(0)
+BUY = Q(transaction_type='buy')
+SELL = Q(transaction_type='sell')
+
+
+def _transactions(portfolios):
+    return Transaction.objects.filter(portfolio__in=portfolios).order_by()
+
+
+def monthly_activity(portfolios):
+    """
+    {'YYYY-MM': {bought_quantity, bought_cost, sold_quantity, sold_proceeds}},
+    grouped by the month of the transaction in the current time zone. Only
+    buys and sells count, as in Ledger.apply: a month with dividends alone has
+    no entry.
+    """
+    rows = (
+        _transactions(portfolios)
+        .filter(transaction_type__in=['buy', 'sell'])
+        .annotate(month=TruncMonth('transaction_date'))
+        .values('month')
+        .annotate(
+            bought_quantity=Sum('quantity', filter=BUY, default=ZERO),
+            bought_cost=Sum('total_cost', filter=BUY, default=ZERO),
+            sold_quantity=Sum('quantity', filter=SELL, default=ZERO),
+            sold_proceeds=Sum('total_cost', filter=SELL, default=ZERO),
+        )
+        .order_by('month')
+        .values_list('month', 'bought_quantity', 'bought_cost', 'sold_quantity', 'sold_proceeds')
+    )
+    return {
+        month.strftime('%Y-%m'): {
+            "bought_quantity": bought_quantity,
+            "bought_cost": bought_cost,
+            "sold_quantity": sold_quantity,
+            "sold_proceeds": sold_proceeds,
+        }
+        for month, bought_quantity, bought_cost, sold_quantity, sold_proceeds in rows
+    }
+
+
+def transaction_counts(portfolios):
+    """
+    {transaction_type: number of transactions}.
+    """
+    rows = _transactions(portfolios).values('transaction_type').annotate(count=Count('id')).values_list('transaction_type', 'count')
+    return dict(rows)
+
+
+def daily_flows(portfolio_ids):
+    """
+    {portfolio id: (dates, contributed, withdrawn)} as NumPy arrays, one entry
+    per day with transactions, the date taken in the current time zone. Buys
+    contribute capital; sell proceeds and dividends are withdrawn from the
+    portfolio. Read raw (see engine.raw_columns) since it feeds float math.
+    """
+    columns = raw_columns(
+        _transactions(portfolio_ids)
+        .annotate(day=TruncDate('transaction_date'))
+        .values('portfolio_id', 'day')
+        .annotate(
+            contributed=Sum('total_cost', filter=BUY, default=ZERO),
+            withdrawn=Sum('total_cost', filter=~BUY, default=ZERO),
+        )
+        .values_list('portfolio_id', 'day', 'contributed', 'withdrawn')
+    )
+    if columns is None:
+        return {}
+    ids, days, contributed, withdrawn = (np.array(column) for column in columns)
+    days = days.astype('datetime64[D]')
+    contributed = contributed.astype(np.float64)
+    withdrawn = withdrawn.astype(np.float64)
+    return {
+        portfolio_id: (days[ids == portfolio_id], contributed[ids == portfolio_id], withdrawn[ids == portfolio_id])
+        for portfolio_id in np.unique(ids).tolist()
+    }
@@ -5,7 +5,16 @@ from .views import (portfolio_create,
                     portfolio_update, 
                     portfolio_delete,
                     portfolio_performance,
-                    portfolio_recommend)
+                    portfolio_recommend,
+                    portfolio_as_of,
+                    portfolio_valuation,
+                    account_valuation,
+                    account_returns,
+                    portfolio_returns_view,
+                    portfolio_risk_view,
+                    portfolio_projection,
+                    portfolio_live_valuation,
+                    account_live_valuation)
 
 urlpatterns = [
     path('create/', portfolio_create, name='portfolios-create'),
@@ -15,4 +24,13 @@ urlpatterns = [
     path('<int:pk>/delete', portfolio_delete, name='portfolios-delete'),
     path('performance/', portfolio_performance, name='portfolios-performance'),
     path('<int:pk>/recommend', portfolio_recommend, name='portfolios-recommend'),
+    path('<int:pk>/as-of', portfolio_as_of, name='portfolios-as-of'),
+    path('<int:pk>/valuation', portfolio_valuation, name='portfolios-valuation'),
+    path('valuation/', account_valuation, name='portfolios-account-valuation'),
+    path('<int:pk>/returns', portfolio_returns_view, name='portfolios-returns'),
+    path('returns/', account_returns, name='portfolios-account-returns'),
+    path('<int:pk>/risk', portfolio_risk_view, name='portfolios-risk'),
+    path('<int:pk>/projection', portfolio_projection, name='portfolios-projection'),
+    path('<int:pk>/live', portfolio_live_valuation, name='portfolios-live'),
+    path('live/', account_live_valuation, name='portfolios-account-live'),
 ]
\ No newline at end of file
@@ -4,12 +4,21 @@ from rest_framework import status, permissions
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.authentication import TokenAuthentication
 from django.shortcuts import get_object_or_404
+from django.utils.timezone import make_aware
+from datetime import datetime, time, timedelta
 from account.models import Account
 from strategy.models import Strategy
-from .serializers import PortfolioSerializer, PortfolioCreateSerializer, PortfolioUpdateSerializer, PortfolioPerformanceSerializer
+from .serializers import PortfolioSerializer, PortfolioCreateSerializer, PortfolioUpdateSerializer, PortfolioPerformanceSerializer, PortfolioAsOfQuerySerializer, ValuationQuerySerializer, ProjectionQuerySerializer
 from portfolio.models import Portfolio
-from transaction.models import Transaction
 from portfolio.recommendations import generate_recommendation
+from portfolio.snapshots import account_ledger, portfolio_ledger
+from portfolio.checkpoints import ledger_as_of
+from portfolio.valuations import valuation_series
+from portfolio.returns import portfolio_returns
+from portfolio.risk import portfolio_risk
+from portfolio.projection import project_portfolio
+from portfolio.live import live_valuation, live_valuations
+from finance.helpers import get_stock_closes
 
 @api_view(['POST'])
 @authentication_classes([TokenAuthentication])
@@ -64,11 +73,9 @@ def portfolio_delete(request, pk):
 @permission_classes([IsAuthenticated])
 def portfolio_performance(request):
     account = get_object_or_404(Account, pk=request.user.pk)
-    portfolios = Portfolio.objects.filter(account=account)
-    transactions = Transaction.objects.filter(portfolio__in=portfolios)
 
-    # Pass the queryset as a single instance to the serializer
-    serializer = PortfolioPerformanceSerializer(transactions)
+    # Ledger-derived data is cached per account until its next transaction; prices are applied fresh
+    serializer = PortfolioPerformanceSerializer(account_ledger(account))
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
@@ -85,4 +92,170 @@ def portfolio_recommend(request, pk):
         return Response({"detail": "Not authorized."}, status=status.HTTP_403_FORBIDDEN)
     
     recommendation_data = generate_recommendation(portfolio)
-    return Response(recommendation_data, status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response(recommendation_data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def portfolio_as_of(request, pk):
+    """
+    Holdings and performance of a portfolio at the end of a given day, valued at
+    that day's closing prices.
+    URL: /portfolio/<id>/as-of?date=YYYY-MM-DD
+    """
+    portfolio = get_object_or_404(Portfolio, pk=pk)
+
+    if portfolio.account.pk != request.user.pk:
+        return Response({"detail": "Not authorized."}, status=status.HTTP_403_FORBIDDEN)
+
+    query = PortfolioAsOfQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    day = query.validated_data['date']
+    ledger = ledger_as_of(portfolio.pk, make_aware(datetime.combine(day + timedelta(days=1), time.min)))
+    closes = get_stock_closes([(symbol, day) for symbol, lots in ledger.open_lots.items() if lots])
+    data = PortfolioPerformanceSerializer.summarize(ledger, price_for=lambda symbol: closes.get((symbol, day)))
+    return Response({"as_of": day, **data}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def account_valuation(request):
+    """
+    Daily market value, cost basis and total return of all the user's portfolios combined.
+    URL: /portfolio/valuation/?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD (both optional)
+    """
+    query = ValuationQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    portfolio_ids = Portfolio.objects.filter(account_id=request.user.pk).values_list('pk', flat=True)
+    series = valuation_series(portfolio_ids, query.validated_data.get('start_date'), query.validated_data.get('end_date'))
+    return Response(series, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def portfolio_valuation(request, pk):
+    """
+    Daily market value, cost basis and total return of a portfolio.
+    URL: /portfolio/<id>/valuation?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD (both optional)
+    """
+    portfolio = get_object_or_404(Portfolio, pk=pk)
+
+    if portfolio.account.pk != request.user.pk:
+        return Response({"detail": "Not authorized."}, status=status.HTTP_403_FORBIDDEN)
+
+    query = ValuationQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    series = valuation_series([portfolio.pk], query.validated_data.get('start_date'), query.validated_data.get('end_date'))
+    return Response(series, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def account_returns(request):
+    """
+    Time-weighted and money-weighted returns of each of the user's portfolios, keyed by portfolio id.
+    URL: /portfolio/returns/?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD (both optional)
+    """
+    query = ValuationQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    portfolio_ids = list(Portfolio.objects.filter(account_id=request.user.pk).values_list('pk', flat=True))
+    returns = portfolio_returns(portfolio_ids, query.validated_data.get('start_date'), query.validated_data.get('end_date'))
+    return Response(returns, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def portfolio_returns_view(request, pk):
+    """
+    Time-weighted (cumulative and annualized) and money-weighted (XIRR) returns of a portfolio, in percent.
+    URL: /portfolio/<id>/returns?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD (both optional)
+    """
+    portfolio = get_object_or_404(Portfolio, pk=pk)
+
+    if portfolio.account.pk != request.user.pk:
+        return Response({"detail": "Not authorized."}, status=status.HTTP_403_FORBIDDEN)
+
+    query = ValuationQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    returns = portfolio_returns([portfolio.pk], query.validated_data.get('start_date'), query.validated_data.get('end_date'))[portfolio.pk]
+    if returns is None:
+        return Response({"detail": "No valuation in the requested period."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(returns, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def portfolio_risk_view(request, pk):
+    """
+    Volatility, beta, maximum drawdown and Value at Risk of a portfolio's current holdings
+    over the last year of daily closes.
+    URL: /portfolio/<id>/risk
+    """
+    portfolio = get_object_or_404(Portfolio, pk=pk)
+
+    if portfolio.account.pk != request.user.pk:
+        return Response({"detail": "Not authorized."}, status=status.HTTP_403_FORBIDDEN)
+
+    risk = portfolio_risk(portfolio_ledger(portfolio))
+    if risk is None:
+        return Response({"detail": "Not enough holdings or price history to measure risk."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(risk, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def portfolio_projection(request, pk):
+    """
+    Monte Carlo projection of a portfolio's current holdings over its strategy's investment horizon:
+    probability of meeting the target return, final value percentiles and monthly percentile bands.
+    URL: /portfolio/<id>/projection?paths=10000&seed=42 (both optional)
+    """
+    portfolio = get_object_or_404(Portfolio, pk=pk)
+
+    if portfolio.account.pk != request.user.pk:
+        return Response({"detail": "Not authorized."}, status=status.HTTP_403_FORBIDDEN)
+
+    query = ProjectionQuerySerializer(data=request.query_params)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    projection = project_portfolio(portfolio, query.validated_data.get('paths'), query.validated_data.get('seed'))
+    if projection is None:
+        return Response({"detail": "Not enough holdings, price history or investment horizon to project."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(projection, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def portfolio_live_valuation(request, pk):
+    """
+    Market value, cost basis and unrealized gain/loss of a portfolio's open lots at the latest quotes.
+    URL: /portfolio/<id>/live
+    """
+    portfolio = get_object_or_404(Portfolio, pk=pk)
+
+    if portfolio.account.pk != request.user.pk:
+        return Response({"detail": "Not authorized."}, status=status.HTTP_403_FORBIDDEN)
+
+    return Response(live_valuation(portfolio), status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def account_live_valuation(request):
+    """
+    Live valuation of each of the user's portfolios, keyed by portfolio id.
+    URL: /portfolio/live/
+    """
+    portfolio_ids = Portfolio.objects.filter(account_id=request.user.pk).values_list('pk', flat=True)
+    return Response(live_valuations(portfolio_ids), status=status.HTTP_200_OK)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class PortfolioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'portfolio'
+
+    def ready(self):
+        from finance.cache import quote_cache
+        from portfolio import signals  # noqa: F401
+        from portfolio.live import apply_quotes
+
+        quote_cache.subscribe(apply_quotes)
@@ -0,0 +1,172 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from finance.barstore import market_today
+from finance.helpers import get_stock_prices
+from finance.securities import get_securities
+from portfolio.models import Portfolio, Position
+from portfolio.signals import sync_bulk_created
+from strategy.backtest import load_market_data, strategy_rules, strategy_universe, target_weights
+from transaction.models import Transaction
+
+AUTOMATION_DEFAULTS = {
+    'DRIFT_THRESHOLD': 0.02,
+    'INTERVAL': 60 * 60 * 24,
+}
+QUANTITY_PLACES = Decimal('0.00000001')
+
+
+def automation_settings():
+    return {**AUTOMATION_DEFAULTS, **getattr(settings, 'AUTOMATED_TRADING', {})}
+
+
+class Evaluation:
+    """
+    Outcome of one evaluation run: the proposed (unsaved, or saved when
+    executed) transactions and counters for reporting. `elapsed` is the time
+    spent evaluating, `saved_in` the time spent writing the transactions.
+    """
+
+    def __init__(self):
+        self.transactions = []
+        self.strategies = 0
+        self.portfolios = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+        self.saved_in = 0.0
+
+    @property
+    def portfolios_per_second(self):
+        return self.portfolios / self.elapsed if self.elapsed else 0.0
+
+
+def _strategy_targets(strategies, symbols):
+    """
+    {strategy id: target weights over `symbols`} from the backtest rules at
+    the last settled close, one market data load for every universe.
+    """
+    universes = {strategy.pk: [symbol.upper() for symbol in strategy_universe(strategy)] for strategy in strategies}
+    union = list(dict.fromkeys(symbol for universe in universes.values() for symbol in universe))
+    targets = {}
+    if not union:
+        return targets
+    last = market_today() - timedelta(days=1)
+    data = load_market_data(union, last, last)
+    column = {symbol: i for i, symbol in enumerate(data.symbols)}
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    for strategy in strategies:
+        universe = universes[strategy.pk]
+        target = np.zeros(len(symbols))
+        if universe and len(data.days):
+            weights = target_weights(data.closes[:, [column[s] for s in universe]], strategy_rules(strategy), [len(data.days) - 1])[0]
+            for symbol, weight in zip(universe, weights):
+                target[index[symbol]] = weight
+        targets[strategy.pk] = target
+    return targets
+
+
+def evaluate_automated_portfolios(execute=True, now=None):
+    """
+    Rebalances every portfolio whose strategy has automated_trading enabled.
+
+    The current holdings of all portfolios come from the materialized
+    positions in one query, the prices of the union of held and target
+    symbols from one batch quote call, and each strategy's target allocation
+    from the backtest rules (strategy.backtest.target_weights) at the last
+    settled close. The rebalance is then one vectorized pass over a
+    (portfolios x symbols) matrix: a trade is proposed wherever a holding's
+    value differs from its target by more than DRIFT_THRESHOLD of the
+    portfolio's value. Portfolios are self-funded (there is no cash), so
+    empty portfolios are skipped.
+
+    With execute=True the trades are saved with a single bulk_create, sells
+    first, and the positions, checkpoints, valuations and ledger versions are
+    brought up to date (see sync_bulk_created).
+    """
+    started = time.perf_counter()
+    evaluation = Evaluation()
+    portfolios = list(Portfolio.objects.filter(strategy__automated_trading=True).select_related('strategy').order_by('pk'))
+    strategies = list({portfolio.strategy_id: portfolio.strategy for portfolio in portfolios}.values())
+    evaluation.strategies = len(strategies)
+    evaluation.portfolios = len(portfolios)
+    if not portfolios:
+        evaluation.elapsed = time.perf_counter() - started
+        return evaluation
+
+    # Transaction symbols are stored as entered: positions spelled differently
+    # ('aapl', 'AAPL') are one holding of the upper-case symbol the universe uses.
+    held = {}
+    for portfolio_id, symbol, quantity in Position.objects.filter(
+        portfolio__in=portfolios, quantity__gt=0,
+    ).values_list('portfolio_id', 'symbol', 'quantity'):
+        held.setdefault((portfolio_id, symbol.upper()), {})[symbol] = quantity
+    universe_symbols = [symbol.upper() for strategy in strategies for symbol in strategy_universe(strategy)]
+    symbols = list(dict.fromkeys([symbol for _, symbol in held] + universe_symbols))
+    row = {portfolio.pk: i for i, portfolio in enumerate(portfolios)}
+    column = {symbol: i for i, symbol in enumerate(symbols)}
+
+    quantities = np.zeros((len(portfolios), len(symbols)))
+    for (portfolio_id, symbol), spellings in held.items():
+        quantities[row[portfolio_id], column[symbol]] = float(sum(spellings.values()))
+    quotes = get_stock_prices(symbols)
+    prices = np.array([quotes.get(symbol.upper()) or np.nan for symbol in symbols], dtype=np.float64)
+    targets = _strategy_targets(strategies, symbols)
+    weights = np.array([targets[portfolio.strategy_id] for portfolio in portfolios])
+
+    # Symbols without a price can be neither valued nor traded.
+    priced = np.isfinite(prices) & (prices > 0)
+    values = np.where(priced, quantities * np.where(priced, prices, 0), 0)
+    totals = values.sum(axis=1)
+    weights = np.where(priced, weights, 0)
+    deltas = weights * totals[:, None] - values
+    trade = priced & (np.abs(deltas) > automation_settings()['DRIFT_THRESHOLD'] * totals[:, None]) & (totals[:, None] > 0)
+    evaluation.skipped = int((totals <= 0).sum())
+
+    amounts = np.where(trade, np.abs(deltas) / np.where(priced, prices, 1), 0)
+    amounts = np.where(deltas < 0, np.minimum(amounts, quantities), amounts)
+    names = {}
+    traded_symbols = [symbols[j] for j in np.flatnonzero(trade.any(axis=0))]
+    if traded_symbols:
+        names = {symbol: security.name for symbol, security in get_securities(traded_symbols).items()}
+
+    now = now or timezone.now()
+    for sells in (True, False):
+        for i, j in zip(*np.nonzero(trade & ((deltas < 0) == sells))):
+            quantity = Decimal(str(amounts[i, j])).quantize(QUANTITY_PLACES)
+            if quantity <= 0:
+                continue
+            price = Decimal(str(prices[j]))
+            spellings = held.get((portfolios[i].pk, symbols[j]), {})
+            if sells:
+                # Sold from each stored spelling in turn, so the existing lots are reduced.
+                legs = []
+                for symbol, available in spellings.items():
+                    legs.append((symbol, min(quantity, available)))
+                    quantity -= legs[-1][1]
+                    if quantity <= 0:
+                        break
+            else:
+                legs = [(next(iter(spellings), symbols[j]), quantity)]
+            evaluation.transactions.extend(
+                Transaction(
+                    portfolio=portfolios[i], transaction_type='sell' if sells else 'buy', name=names.get(symbols[j], symbols[j]),
+                    symbol=symbol, quantity=leg, price_per_unit=price, total_cost=leg * price, transaction_date=now,
+                )
+                for symbol, leg in legs if leg > 0
+            )
+
+    evaluation.elapsed = time.perf_counter() - started
+
+    if execute and evaluation.transactions:
+        started = time.perf_counter()
+        with db_transaction.atomic():
+            Transaction.objects.bulk_create(evaluation.transactions)
+            sync_bulk_created(evaluation.transactions)
+        evaluation.saved_in = time.perf_counter() - started
+    return evaluation
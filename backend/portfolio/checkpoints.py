@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils.timezone import localtime
+
+from portfolio.lots import LATEST_TRANSACTIONS, Ledger
+from portfolio.models import LedgerCheckpoint
+from portfolio.snapshots import get_version, locked_version
+from transaction.models import Transaction
+
+
+def checkpoint_interval():
+    return getattr(settings, 'LEDGER_CHECKPOINT_INTERVAL', 500)
+
+
+def _not_covered_by(checkpoint):
+    return Q(transaction_date__gt=checkpoint.as_of) | Q(transaction_date=checkpoint.as_of, pk__gt=checkpoint.last_transaction_id)
+
+
+def _month(tx):
+    return localtime(tx.transaction_date).strftime('%Y-%m')
+
+
+def nearest_checkpoint(portfolio_id, before):
+    """
+    Latest checkpoint containing only transactions dated before `before`.
+    """
+    return (
+        LedgerCheckpoint.objects.filter(portfolio_id=portfolio_id, as_of__lt=before)
+        .order_by('-as_of', '-last_transaction_id')
+        .first()
+    )
+
+
+def ledger_as_of(portfolio_id, before, latest=LATEST_TRANSACTIONS):
+    """
+    Returns the Ledger of every transaction of the portfolio dated before
+    `before` (an aware datetime): the nearest checkpoint plus a replay of the
+    transactions after it.
+
+    While replaying, new checkpoints are saved every LEDGER_CHECKPOINT_INTERVAL
+    transactions and at each month end (when the next transaction falls in a
+    later month), so the next query over the same history replays less. They
+    are discarded if the ledger version changed during the replay, since a
+    concurrent backdated write may not be reflected in them. The version is
+    compared and the checkpoints inserted with the version row locked, and a
+    write bumps the version before dropping checkpoints (see
+    portfolio.signals), so a write committed during the replay either changes
+    the version first or deletes the inserted checkpoints afterwards.
+    """
+    version = get_version('portfolio', portfolio_id)
+    checkpoint = nearest_checkpoint(portfolio_id, before)
+    if checkpoint is None:
+        ledger, count = Ledger(latest=latest), 0
+    else:
+        ledger, count = Ledger.from_state(checkpoint.state, latest=latest), checkpoint.transaction_count
+
+    tail = Transaction.objects.filter(portfolio_id=portfolio_id, transaction_date__lt=before)
+    if checkpoint is not None:
+        tail = tail.filter(_not_covered_by(checkpoint))
+
+    interval = checkpoint_interval()
+    since_checkpoint = 0
+    previous = None
+    new_checkpoints = []
+    for tx in tail.order_by('transaction_date', 'pk').iterator():
+        if previous is not None and (since_checkpoint >= interval or _month(tx) != _month(previous)):
+            new_checkpoints.append(_checkpoint(portfolio_id, ledger, previous, count))
+            since_checkpoint = 0
+        ledger.apply(tx)
+        count += 1
+        since_checkpoint += 1
+        previous = tx
+    if new_checkpoints:
+        with db_transaction.atomic():
+            if locked_version('portfolio', portfolio_id) == version:
+                LedgerCheckpoint.objects.bulk_create(new_checkpoints, ignore_conflicts=True)
+
+    recent = Transaction.objects.filter(portfolio_id=portfolio_id, transaction_date__lt=before).order_by('-transaction_date', '-pk')
+    ledger.latest.clear()
+    ledger.latest.extend(reversed(list(recent[:ledger.latest.maxlen])))
+    return ledger
+
+
+def _checkpoint(portfolio_id, ledger, last, count):
+    return LedgerCheckpoint(
+        portfolio_id=portfolio_id, as_of=last.transaction_date, last_transaction_id=last.pk,
+        transaction_count=count, state=ledger.to_state(),
+    )
+
+
+def invalidate_checkpoints(portfolio_id, since):
+    """
+    Drops the checkpoints that may include a transaction dated `since` or later;
+    called when such a transaction is inserted out of order, edited or deleted.
+    """
+    LedgerCheckpoint.objects.filter(portfolio_id=portfolio_id, as_of__gte=since).delete()
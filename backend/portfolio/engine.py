@@ -0,0 +1,269 @@
+from collections import deque
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from portfolio.lots import LATEST_TRANSACTIONS, Ledger, build_ledger
+
+DIGITS = 8
+SCALE = 10 ** DIGITS
+ENGINES = ('python', 'numpy')
+
+
+def performance_engine():
+    engine = getattr(settings, 'PERFORMANCE_ENGINE', 'python')
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown PERFORMANCE_ENGINE {engine!r}; expected one of {ENGINES}.")
+    return engine
+
+
+def replay_ledger(transactions, latest=LATEST_TRANSACTIONS):
+    """
+    Replays transactions into a Ledger with the engine selected by
+    settings.PERFORMANCE_ENGINE. The NumPy engine needs a QuerySet to load
+    columns from; any other iterable is replayed in Python.
+    """
+    if performance_engine() == 'numpy' and isinstance(transactions, QuerySet):
+        return numpy_ledger(transactions, latest)
+    return build_ledger(transactions, latest)
+
+
+class Fixed:
+    """
+    Exact fixed-point array: value = units + frac / 1e8 + sub / 1e16, each part
+    an int64 array. After normalization frac and sub are in [0, 1e8) and the
+    sign lives in units, so sums of millions of terms cannot overflow and a
+    product of two 8-decimal numbers is represented without rounding.
+    """
+
+    __slots__ = ('units', 'frac', 'sub')
+
+    def __init__(self, units, frac, sub=None):
+        sub = np.zeros_like(units) if sub is None else sub
+        carry, self.sub = np.divmod(sub, SCALE)
+        carry, self.frac = np.divmod(frac + carry, SCALE)
+        self.units = units + carry
+
+    @classmethod
+    def from_column(cls, values):
+        """
+        From a raw database column of decimals; see _split_floats for the
+        floats SQLite returns. Decimals (PostgreSQL, MySQL) are split exactly.
+        """
+        column = np.asarray(values)
+        if column.dtype.kind in 'fiu':
+            return cls(*_split_floats(column.astype(np.float64)))
+        pairs = np.array([divmod(int(value.scaleb(DIGITS)), SCALE) for value in values], dtype=np.int64).reshape(-1, 2)
+        return cls(pairs[:, 0], pairs[:, 1])
+
+    def __len__(self):
+        return len(self.units)
+
+    def __getitem__(self, key):
+        return Fixed(self.units[key], self.frac[key], self.sub[key])
+
+    def __add__(self, other):
+        return Fixed(self.units + other.units, self.frac + other.frac, self.sub + other.sub)
+
+    def __sub__(self, other):
+        return Fixed(self.units - other.units, self.frac - other.frac, self.sub - other.sub)
+
+    def times_scaled(self, scaled):
+        """
+        Exact product with integers scaled by 1e8; self must have sub == 0.
+        """
+        units, frac = np.divmod(scaled, SCALE)
+        return Fixed(units * self.units, units * self.frac + frac * self.units, frac * self.frac)
+
+    def cumsum(self):
+        return Fixed(np.cumsum(self.units), np.cumsum(self.frac), np.cumsum(self.sub))
+
+    def group_sum(self, groups, size):
+        totals = [np.zeros(size, dtype=np.int64) for _ in range(3)]
+        for total, part in zip(totals, (self.units, self.frac, self.sub)):
+            np.add.at(total, groups, part)
+        return Fixed(*totals)
+
+    def decimal(self, i):
+        return (Decimal(int(self.units[i])) + Decimal(int(self.frac[i])).scaleb(-DIGITS)
+                + Decimal(int(self.sub[i])).scaleb(-2 * DIGITS))
+
+
+def _split_floats(column):
+    """
+    Splits floats into (units, frac / 1e8) integer arrays, rounding them the way
+    Django's SQLite converter does: to 15 significant digits, then to 8 decimals.
+    """
+    magnitude = np.floor(np.log10(np.maximum(np.abs(column), 1)))
+    decimals = np.minimum(14 - magnitude, DIGITS).astype(np.int64)
+    units = np.floor(column)
+    frac = np.rint((column - units) * 10.0 ** decimals).astype(np.int64) * 10 ** (DIGITS - decimals)
+    return units.astype(np.int64), frac
+
+
+def _scaled(values):
+    column = np.asarray(values)
+    if column.dtype.kind in 'fiu':
+        units, frac = _split_floats(column.astype(np.float64))
+        return units * SCALE + frac
+    return np.array([int(value.scaleb(DIGITS)) for value in values], dtype=np.int64)
+
+
+def _unscaled(value):
+    return Decimal(int(value)).scaleb(-DIGITS)
+
+
+def _month_label(code):
+    """
+    'YYYY-MM' of a month code (year * 12 + month - 1).
+    """
+    return f"{code // 12:04d}-{code % 12 + 1:02d}"
+
+
+def raw_columns(queryset):
+    """
+    Runs a values_list() queryset and returns one tuple per selected field
+    with the raw database values (None when there are no rows), skipping
+    Django's per-row converters, which would otherwise dominate the load time.
+    Dates and decimals come back as the backend returns them (strings and
+    floats on SQLite).
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return list(zip(*rows)) if rows else None
+
+
+def _fetch_columns(transactions, *fields):
+    return raw_columns(transactions.order_by().values_list(*fields))
+
+
+def _group_cumsum(values, starts, group):
+    total = np.cumsum(values)
+    return total - (total - values)[starts][group]
+
+
+def numpy_ledger(transactions, latest=LATEST_TRANSACTIONS):
+    """
+    Vectorized replacement for build_ledger on a Transaction QuerySet.
+
+    Transactions are loaded as raw columns with values_list and processed as
+    NumPy arrays grouped by symbol in (transaction_date, pk) order. FIFO
+    matching is done on cumulative quantities: within a symbol, the buys
+    cover consecutive intervals of a "bought so far" axis and every sell
+    consumes the next interval of that axis. Quantity sold beyond the open
+    lots is dropped, as in Ledger._match_sell, so consumption is
+    sold - max(0, running max(sold - bought)). The cost of the consumed
+    interval comes from the cumulative cost of the buy lots. All money is
+    exact fixed-point (see Fixed), so the result equals the Decimal replay.
+
+    Returns a Ledger with the same holdings, open lots, realized and monthly
+    figures as build_ledger.
+    """
+    ledger = Ledger(latest=latest)
+    columns = _fetch_columns(
+        transactions, 'pk', 'symbol', 'transaction_type', 'quantity', 'price_per_unit', 'total_cost', 'transaction_date',
+    )
+    if columns is None:
+        return ledger
+    pks, symbols, kinds, quantities, prices, totals, dates = columns
+
+    kinds = np.array(kinds, dtype=object)
+    for kind, count in zip(*np.unique(kinds, return_counts=True)):
+        ledger.transaction_counts[kind] = int(count)
+    recent = transactions.order_by('-transaction_date', '-pk')[:ledger.latest.maxlen]
+    ledger.latest.extend(reversed(list(recent)))
+
+    traded = np.flatnonzero((kinds == 'buy') | (kinds == 'sell'))
+    if not len(traded):
+        return ledger
+
+    stamps = pd.to_datetime([dates[i] for i in traded], utc=True, format='ISO8601')
+    local = stamps.tz_convert(timezone.get_current_timezone())
+    month_codes = np.asarray(local.year * 12 + local.month - 1, dtype=np.int64)
+    names, symbol_codes = np.unique(np.array([symbols[i] for i in traded], dtype=object), return_inverse=True)
+    order = np.lexsort((np.array([pks[i] for i in traded]), stamps.asi8, symbol_codes))
+    index = traded[order]
+    symbol_codes = symbol_codes[order]
+    month_codes = month_codes[order]
+    is_buy = kinds[index] == 'buy'
+    quantity = _scaled([quantities[i] for i in index])
+    price = Fixed.from_column([prices[i] for i in index])
+    total = Fixed.from_column([totals[i] for i in index])
+
+    # Holdings and monthly activity.
+    signed = np.where(is_buy, quantity, -quantity)
+    net = np.zeros(len(names), dtype=np.int64)
+    np.add.at(net, symbol_codes, signed)
+    for code, name in enumerate(names):
+        ledger.holdings[name] = _unscaled(net[code])
+        ledger.open_lots[name] = deque()
+
+    months, month_index = np.unique(month_codes, return_inverse=True)
+    activity = {}
+    for key, mask in (('bought', is_buy), ('sold', ~is_buy)):
+        moved = np.zeros(len(months), dtype=np.int64)
+        np.add.at(moved, month_index[mask], quantity[mask])
+        activity[key] = (moved, total[mask].group_sum(month_index[mask], len(months)))
+    for m, code in enumerate(months):
+        ledger.monthly_activity[_month_label(code)] = {
+            "bought_quantity": _unscaled(activity['bought'][0][m]),
+            "bought_cost": activity['bought'][1].decimal(m),
+            "sold_quantity": _unscaled(activity['sold'][0][m]),
+            "sold_proceeds": activity['sold'][1].decimal(m),
+        }
+
+    # FIFO on cumulative quantities, per symbol group.
+    starts = np.flatnonzero(np.r_[True, symbol_codes[1:] != symbol_codes[:-1]])
+    ends = np.r_[starts[1:], len(index)] - 1
+    group = np.cumsum(np.isin(np.arange(len(index)), starts)) - 1
+    bought = _group_cumsum(np.where(is_buy, quantity, 0), starts, group)
+    sold = _group_cumsum(np.where(is_buy, 0, quantity), starts, group)
+    dropped = pd.Series(np.maximum(sold - bought, 0)).groupby(group).cummax().to_numpy()
+    consumed = sold - dropped
+    previous = np.r_[0, consumed[:-1]]
+    previous[starts] = 0
+
+    buys = np.flatnonzero(is_buy)
+    if not len(buys):
+        return ledger
+    base = np.r_[0, np.cumsum(np.where(is_buy, quantity, 0))][starts][group]
+    lot_end = bought[buys] + base[buys]
+    lot_start = lot_end - quantity[buys]
+    lot_price = price[buys]
+    lot_cost = lot_price.times_scaled(quantity[buys])
+    cost_before = lot_cost.cumsum() - lot_cost
+
+    def cost_to(position):
+        lot = np.minimum(np.searchsorted(lot_end, position, side='left'), len(buys) - 1)
+        return cost_before[lot] + lot_price[lot].times_scaled(position - lot_start[lot])
+
+    matched = np.flatnonzero(~is_buy & (consumed > previous))
+    if len(matched):
+        moved = consumed[matched] - previous[matched]
+        cost = cost_to(consumed[matched] + base[matched]) - cost_to(previous[matched] + base[matched])
+        realized = price[matched].times_scaled(moved) - cost
+        by_symbol = realized.group_sum(symbol_codes[matched], len(names))
+        for code in np.unique(symbol_codes[matched]):
+            ledger.realized[names[code]] = by_symbol.decimal(code)
+        by_month = realized.group_sum(month_index[matched], len(months))
+        for m in np.unique(month_index[matched]):
+            ledger.monthly_realized[_month_label(months[m])] = by_month.decimal(m)
+
+    # Remaining open lots: the part of each buy interval beyond the final consumption.
+    final = (consumed + base)[ends][group[buys]]
+    remaining = lot_end - np.clip(final, lot_start, lot_end)
+    still_open = np.flatnonzero(remaining > 0)
+    opened = stamps[order[buys[still_open]]].to_pydatetime()
+    for b, opened_at in zip(still_open, opened):
+        event = buys[b]
+        ledger.open_lots[names[symbol_codes[event]]].append([
+            _unscaled(remaining[b]), lot_price.decimal(b), pks[index[event]], opened_at,
+        ])
+    return ledger
@@ -0,0 +1,222 @@
+import threading
+
+import numpy as np
+from django.db.models import DecimalField, F, Sum
+from django.utils import timezone
+
+from finance.helpers import get_stock_prices
+from portfolio.models import Lot
+from portfolio.snapshots import get_versions
+
+
+class LiveIndex:
+    """
+    In-process valuation of portfolios' open lots at the latest quotes.
+
+    A reverse index maps each symbol to the tracked portfolios holding it and
+    their open quantity, so a new quote for a symbol only touches those
+    portfolios: each one's market value moves by quantity x (new price - last
+    price), a constant-time delta per position, instead of being recomputed
+    from its ledger. Per-portfolio totals live in NumPy arrays (one row per
+    portfolio), and the holders of a symbol are kept as arrays of rows and
+    quantities, so a quote is one vectorized update whatever the number of
+    holders.
+
+    Each portfolio is loaded at a ledger version; a portfolio whose version
+    moved (a transaction write, from any process: the versions are kept in the
+    database, see LedgerVersion) is reloaded on its next read, which also
+    resets any floating-point drift of the deltas.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.versions = {}
+        self.positions = {}
+        self.holders = {}
+        self.prices = {}
+        self.updated_at = {}
+        self._arrays = {}
+        self._free = []
+        self.market_value = np.zeros(0)
+        self.cost_basis = np.zeros(0)
+        self.unpriced = np.zeros(0, dtype=np.int64)
+
+    def _row(self, portfolio_id):
+        row = self.rows.get(portfolio_id)
+        if row is not None:
+            return row
+        if self._free:
+            row = self._free.pop()
+        else:
+            row = len(self.rows)
+            if row >= len(self.market_value):
+                size = max(64, 2 * len(self.market_value))
+                self.market_value = np.r_[self.market_value, np.zeros(size - len(self.market_value))]
+                self.cost_basis = np.r_[self.cost_basis, np.zeros(size - len(self.cost_basis))]
+                self.unpriced = np.r_[self.unpriced, np.zeros(size - len(self.unpriced), dtype=np.int64)]
+        self.rows[portfolio_id] = row
+        return row
+
+    def _holder_arrays(self, symbol):
+        arrays = self._arrays.get(symbol)
+        if arrays is None:
+            holders = self.holders.get(symbol, {})
+            arrays = self._arrays[symbol] = (
+                np.array([self.rows[portfolio_id] for portfolio_id in holders], dtype=np.int64),
+                np.fromiter(holders.values(), dtype=np.float64, count=len(holders)),
+            )
+        return arrays
+
+    def _unlink(self, portfolio_id):
+        for symbol in self.positions.pop(portfolio_id, {}):
+            holders = self.holders[symbol]
+            del holders[portfolio_id]
+            if not holders:
+                del self.holders[symbol]
+            self._arrays.pop(symbol, None)
+
+    def load(self, portfolio_id, version, positions):
+        """
+        (Re)places a portfolio's holdings, {symbol: (quantity, cost basis)},
+        loaded at ledger `version`.
+        """
+        with self.lock:
+            self._unlink(portfolio_id)
+            row = self._row(portfolio_id)
+            self.positions[portfolio_id] = positions
+            self.versions[portfolio_id] = version
+            market_value = cost_basis = 0.0
+            unpriced = 0
+            for symbol, (quantity, cost) in positions.items():
+                self.holders.setdefault(symbol, {})[portfolio_id] = quantity
+                self._arrays.pop(symbol, None)
+                cost_basis += cost
+                price = self.prices.get(symbol)
+                if price is None:
+                    unpriced += 1
+                else:
+                    market_value += quantity * price
+            self.market_value[row] = market_value
+            self.cost_basis[row] = cost_basis
+            self.unpriced[row] = unpriced
+            self.updated_at[portfolio_id] = timezone.now()
+
+    def forget(self, portfolio_id):
+        with self.lock:
+            if portfolio_id not in self.rows:
+                return
+            self._unlink(portfolio_id)
+            self._free.append(self.rows.pop(portfolio_id))
+            self.versions.pop(portfolio_id, None)
+            self.updated_at.pop(portfolio_id, None)
+
+    def apply_quotes(self, quotes):
+        """
+        Moves the market value of every portfolio holding a quoted symbol by
+        the price change since the last quote. Quotes of untracked symbols are
+        ignored; missing or non-positive prices leave the last price in place.
+        """
+        now = timezone.now()
+        with self.lock:
+            for symbol, price in quotes.items():
+                symbol = symbol.upper()
+                if symbol not in self.holders or price is None or not price > 0:
+                    continue
+                price = float(price)
+                previous = self.prices.get(symbol)
+                if previous == price:
+                    continue
+                rows, quantities = self._holder_arrays(symbol)
+                if previous is None:
+                    self.market_value[rows] += quantities * price
+                    self.unpriced[rows] -= 1
+                else:
+                    self.market_value[rows] += quantities * (price - previous)
+                self.prices[symbol] = price
+                for portfolio_id in self.holders[symbol]:
+                    self.updated_at[portfolio_id] = now
+
+    def symbols(self, portfolio_ids):
+        with self.lock:
+            return {symbol for portfolio_id in portfolio_ids for symbol in self.positions.get(portfolio_id, {})}
+
+    def valuation(self, portfolio_id):
+        with self.lock:
+            row = self.rows.get(portfolio_id)
+            if row is None:
+                return None
+            market_value = float(self.market_value[row])
+            cost_basis = float(self.cost_basis[row])
+            return {
+                "market_value": market_value,
+                "cost_basis": cost_basis,
+                "unrealized": market_value - cost_basis,
+                "unrealized_percent": (market_value / cost_basis - 1) * 100 if cost_basis > 0 else None,
+                "unpriced_symbols": sorted(
+                    symbol for symbol in self.positions[portfolio_id] if symbol not in self.prices
+                ) if self.unpriced[row] else [],
+                "updated_at": self.updated_at[portfolio_id],
+            }
+
+
+_index = LiveIndex()
+
+
+def live_index():
+    return _index
+
+
+def apply_quotes(quotes):
+    """
+    Feeds {symbol: price} into the live index; subscribed to the quote cache
+    (see PortfolioConfig.ready), so every quote fetched anywhere in the
+    process revalues the tracked portfolios holding it.
+    """
+    _index.apply_quotes(quotes)
+
+
+def _open_positions(portfolio_ids):
+    """
+    {portfolio id: {symbol: (open quantity, cost basis)}} from the
+    materialized lots, in one query.
+    """
+    rows = Lot.objects.filter(position__portfolio_id__in=portfolio_ids, quantity__gt=0).values_list(
+        'position__portfolio_id', 'position__symbol',
+    ).annotate(
+        open_quantity=Sum('quantity'),
+        cost=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=40, decimal_places=16)),
+    ).order_by()
+    positions = {portfolio_id: {} for portfolio_id in portfolio_ids}
+    for portfolio_id, symbol, quantity, cost in rows:
+        held = positions[portfolio_id].get(symbol.upper(), (0.0, 0.0))
+        positions[portfolio_id][symbol.upper()] = (held[0] + float(quantity), held[1] + float(cost))
+    return positions
+
+
+def live_valuations(portfolio_ids):
+    """
+    {portfolio id: live valuation} of the portfolios' open lots at the latest
+    quotes: market value, cost basis and unrealized gain/loss.
+
+    Portfolios not tracked yet or whose ledger changed are (re)loaded with one
+    query for all of them; the quotes of the held symbols are then refreshed
+    with one batch call, which is answered from the quote cache while it is
+    fresh and otherwise revalues the holders through apply_quotes.
+    """
+    portfolio_ids = list(portfolio_ids)
+    versions = get_versions('portfolio', portfolio_ids)
+    stale = [portfolio_id for portfolio_id in portfolio_ids if _index.versions.get(portfolio_id) != versions[portfolio_id]]
+    if stale:
+        for portfolio_id, positions in _open_positions(stale).items():
+            _index.load(portfolio_id, versions[portfolio_id], positions)
+
+    symbols = _index.symbols(portfolio_ids)
+    if symbols:
+        # Prices already in the cache are not re-announced; seed the index with them.
+        _index.apply_quotes(get_stock_prices(sorted(symbols)))
+    return {portfolio_id: _index.valuation(portfolio_id) for portfolio_id in portfolio_ids}
+
+
+def live_valuation(portfolio):
+    return live_valuations([portfolio.pk])[portfolio.pk]
@@ -0,0 +1,167 @@
+from collections import defaultdict, deque
+from datetime import datetime
+from decimal import Decimal
+
+from django.utils.timezone import localtime
+
+LATEST_TRANSACTIONS = 5
+
+
+class Ledger:
+    """
+    FIFO lot book built from a single chronological pass over transactions.
+
+    While replaying, it accumulates everything the performance endpoints need:
+    - holdings: net quantity per symbol (buys minus sells)
+    - open_lots: remaining buy lots per symbol as a deque of
+      [quantity, price, transaction id, opened at]
+    - realized: realized gain per symbol
+    - monthly_realized: realized gain per 'YYYY-MM' of the sell
+    - latest: the most recent transactions
+    - monthly_activity: bought/sold quantity and amount per 'YYYY-MM'
+    - transaction_counts: number of transactions per type
+    Sells are matched against the oldest open lots first; quantity sold beyond
+    the open lots is ignored, as before.
+    """
+
+    def __init__(self, latest=LATEST_TRANSACTIONS):
+        self.holdings = defaultdict(Decimal)
+        self.open_lots = defaultdict(deque)
+        self.realized = defaultdict(Decimal)
+        self.monthly_realized = defaultdict(Decimal)
+        self.latest = deque(maxlen=latest)
+        self.monthly_activity = {}
+        self.transaction_counts = defaultdict(int)
+        self.prices = {}
+        self.unrealized = {}
+
+    def apply(self, tx):
+        if tx.transaction_type == 'buy':
+            self.holdings[tx.symbol] += tx.quantity
+            self.open_lots[tx.symbol].append([tx.quantity, tx.price_per_unit, tx.pk, tx.transaction_date])
+            self._record_activity(tx, 'bought_quantity', 'bought_cost')
+        elif tx.transaction_type == 'sell':
+            self.holdings[tx.symbol] -= tx.quantity
+            self._match_sell(tx)
+            self._record_activity(tx, 'sold_quantity', 'sold_proceeds')
+        self.transaction_counts[tx.transaction_type] += 1
+        self.latest.append(tx)
+
+    def _record_activity(self, tx, quantity_key, amount_key):
+        month = localtime(tx.transaction_date).strftime('%Y-%m')
+        activity = self.monthly_activity.setdefault(month, {
+            "bought_quantity": Decimal(0),
+            "bought_cost": Decimal(0),
+            "sold_quantity": Decimal(0),
+            "sold_proceeds": Decimal(0),
+        })
+        activity[quantity_key] += tx.quantity
+        activity[amount_key] += tx.total_cost
+
+    def _match_sell(self, tx):
+        lots = self.open_lots[tx.symbol]
+        quantity_to_sell = tx.quantity
+        month = None
+        while quantity_to_sell > 0 and lots:
+            lot = lots[0]
+            matched_qty = min(lot[0], quantity_to_sell)
+            realized_gain = matched_qty * (tx.price_per_unit - lot[1])
+            month = month or localtime(tx.transaction_date).strftime('%Y-%m')
+            self.realized[tx.symbol] += realized_gain
+            self.monthly_realized[month] += realized_gain
+
+            lot[0] -= matched_qty
+            quantity_to_sell -= matched_qty
+            if lot[0] == 0:
+                lots.popleft()
+
+    def to_state(self):
+        """
+        JSON-serializable copy of the price-independent state (everything but
+        `latest`), as stored in LedgerCheckpoint.state. Decimals are kept as strings.
+        """
+        return {
+            "holdings": {symbol: str(quantity) for symbol, quantity in self.holdings.items()},
+            "open_lots": {
+                symbol: [[str(quantity), str(price), tx_pk, opened_at.isoformat()] for quantity, price, tx_pk, opened_at in lots]
+                for symbol, lots in self.open_lots.items()
+            },
+            "realized": {symbol: str(value) for symbol, value in self.realized.items()},
+            "monthly_realized": {month: str(value) for month, value in self.monthly_realized.items()},
+            "monthly_activity": {
+                month: {key: str(value) for key, value in activity.items()}
+                for month, activity in self.monthly_activity.items()
+            },
+            "transaction_counts": dict(self.transaction_counts),
+        }
+
+    @classmethod
+    def from_state(cls, state, latest=LATEST_TRANSACTIONS):
+        ledger = cls(latest=latest)
+        ledger.holdings.update((symbol, Decimal(quantity)) for symbol, quantity in state["holdings"].items())
+        for symbol, lots in state["open_lots"].items():
+            ledger.open_lots[symbol] = deque(
+                [Decimal(quantity), Decimal(price), tx_pk, datetime.fromisoformat(opened_at)]
+                for quantity, price, tx_pk, opened_at in lots
+            )
+        ledger.realized.update((symbol, Decimal(value)) for symbol, value in state["realized"].items())
+        ledger.monthly_realized.update((month, Decimal(value)) for month, value in state["monthly_realized"].items())
+        ledger.monthly_activity = {
+            month: {key: Decimal(value) for key, value in activity.items()}
+            for month, activity in state["monthly_activity"].items()
+        }
+        ledger.transaction_counts.update(state["transaction_counts"])
+        return ledger
+
+    def mark_to_market(self, price_for):
+        """
+        Prices every symbol with open lots exactly once and computes unrealized
+        gain per symbol. Symbols without a price are left out.
+        """
+        for symbol, lots in self.open_lots.items():
+            if not lots:
+                continue
+            if symbol not in self.prices:
+                self.prices[symbol] = price_for(symbol)
+            current_price = self.prices[symbol]
+            if current_price is None:
+                continue
+            current_price = Decimal(current_price)
+            self.unrealized[symbol] = sum(
+                (lot[0] * (current_price - lot[1]) for lot in lots), Decimal(0)
+            )
+        return self.unrealized
+
+    def owned_symbols(self):
+        return [symbol for symbol, quantity in self.holdings.items() if quantity > 0]
+
+    def investment_types(self, type_for):
+        investment_types = {}
+        for symbol in self.owned_symbols():
+            investment_type = type_for(symbol)
+            investment_types[investment_type] = investment_types.get(investment_type, 0) + 1
+        return investment_types
+
+    def latest_transactions(self):
+        return [
+            {
+                "transaction_type": t.transaction_type,
+                "name": t.name,
+                "symbol": t.symbol,
+                "quantity": t.quantity,
+                "price_per_unit": t.price_per_unit,
+                "total_cost": t.total_cost,
+                "transaction_date": t.transaction_date,
+            }
+            for t in reversed(self.latest)
+        ]
+
+
+def build_ledger(transactions, latest=LATEST_TRANSACTIONS):
+    """
+    Replays `transactions` (any iterable of Transaction) in date order into a Ledger.
+    """
+    ledger = Ledger(latest=latest)
+    for tx in sorted(transactions, key=lambda t: (t.transaction_date, t.pk or 0)):
+        ledger.apply(tx)
+    return ledger
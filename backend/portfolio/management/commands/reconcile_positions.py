@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.models import Portfolio, Position
+from portfolio.positions import rebuild_portfolio, verify_position
+from transaction.models import Transaction
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the materialized Position/Lot tables against the transaction ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--portfolio', type=int, action='append', help="Limit to these portfolio ids.")
+        parser.add_argument('--verify', action='store_true', help="Only report differences, do not rewrite anything.")
+
+    def handle(self, *args, **options):
+        portfolios = Portfolio.objects.all()
+        if options['portfolio']:
+            portfolios = portfolios.filter(pk__in=options['portfolio'])
+
+        mismatches = 0
+        for portfolio_id in portfolios.values_list('pk', flat=True):
+            if not options['verify']:
+                rebuild_portfolio(portfolio_id)
+                continue
+            symbols = set(Transaction.objects.filter(portfolio_id=portfolio_id).values_list('symbol', flat=True))
+            symbols |= set(Position.objects.filter(portfolio_id=portfolio_id).values_list('symbol', flat=True))
+            for symbol in sorted(symbols):
+                for problem in verify_position(portfolio_id, symbol):
+                    mismatches += 1
+                    self.stdout.write(f"portfolio {portfolio_id} {symbol}: {problem}")
+
+        if options['verify']:
+            if mismatches:
+                raise CommandError(f"{mismatches} position mismatch(es) found; run without --verify to rebuild.")
+            self.stdout.write(self.style.SUCCESS("Positions match the ledger."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt positions for {portfolios.count()} portfolio(s)."))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio.automation import automation_settings, evaluate_automated_portfolios
+
+
+class Command(BaseCommand):
+    help = ("Rebalance the portfolios of strategies with automated trading enabled towards their target allocation. "
+            "Run it on a schedule, or keep it running with --loop.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the proposed transactions, do not save them.")
+        parser.add_argument('--loop', action='store_true', help="Keep running, evaluating every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=automation_settings()['INTERVAL'],
+                            help="Seconds between evaluations with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            self.evaluate(options['dry_run'])
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def evaluate(self, dry_run):
+        evaluation = evaluate_automated_portfolios(execute=not dry_run)
+        if dry_run:
+            for tx in evaluation.transactions:
+                self.stdout.write(
+                    f"portfolio {tx.portfolio_id}: {tx.transaction_type} {tx.quantity} {tx.symbol} at {tx.price_per_unit}"
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f"Evaluated {evaluation.portfolios} portfolio(s) of {evaluation.strategies} automated strategy(ies) "
+            f"in {evaluation.elapsed:.2f}s ({evaluation.portfolios_per_second:.0f} portfolios/s); "
+            f"{len(evaluation.transactions)} transaction(s) {'proposed' if dry_run else f'created in {evaluation.saved_in:.2f}s'}, "
+            f"{evaluation.skipped} empty portfolio(s) skipped."
+        ))
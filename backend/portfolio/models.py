@@ -22,4 +22,132 @@ class Portfolio(models.Model):
 
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class Position(models.Model):
+    """
+    Materialized holding of one symbol in a portfolio, kept in sync with the
+    transaction ledger by portfolio.positions on every Transaction write.
+    """
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name='positions')
+    symbol = models.CharField(max_length=50)
+    quantity = models.DecimalField(max_digits=20, decimal_places=8, default=0, help_text="Net quantity (buys minus sells).")
+    realized = models.DecimalField(max_digits=20, decimal_places=8, default=0, help_text="Realized gain/loss to date.")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['portfolio', 'symbol'], name='unique_position'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} x {self.quantity} ({self.portfolio})"
+
+
+class Lot(models.Model):
+    """
+    Open (not yet fully sold) part of a buy transaction, matched FIFO by sells.
+    """
+    position = models.ForeignKey(Position, on_delete=models.CASCADE, related_name='lots')
+    transaction = models.OneToOneField('transaction.Transaction', on_delete=models.CASCADE, related_name='lot')
+    quantity = models.DecimalField(max_digits=20, decimal_places=8, help_text="Remaining quantity.")
+    price = models.DecimalField(max_digits=20, decimal_places=8)
+    opened_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['opened_at', 'transaction_id']
+
+    def __str__(self):
+        return f"{self.quantity} {self.position.symbol} at {self.price}"
+
+
+class RealizedMonth(models.Model):
+    """
+    Realized gain/loss of a position bucketed by the month of the sell ('YYYY-MM').
+    """
+    position = models.ForeignKey(Position, on_delete=models.CASCADE, related_name='realized_months')
+    month = models.CharField(max_length=7)
+    realized = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['position', 'month'], name='unique_realized_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.position.symbol} {self.month}: {self.realized}"
+
+
+class LedgerCheckpoint(models.Model):
+    """
+    Saved Ledger state of a portfolio covering every transaction up to and
+    including (as_of, last_transaction_id) in (transaction_date, id) order.
+    Written by portfolio.checkpoints every N transactions and at month ends;
+    point-in-time queries replay only the transactions after the nearest one.
+    """
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name='checkpoints')
+    as_of = models.DateTimeField(help_text="Date of the last transaction included.")
+    last_transaction_id = models.BigIntegerField(help_text="Id of the last transaction included (tie-break for equal dates).")
+    transaction_count = models.PositiveIntegerField(help_text="Number of transactions included.")
+    state = models.JSONField(help_text="Ledger.to_state() of the included transactions.")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['portfolio', 'as_of', 'last_transaction_id']
+        constraints = [
+            models.UniqueConstraint(fields=['portfolio', 'last_transaction_id'], name='unique_ledger_checkpoint'),
+        ]
+        indexes = [
+            models.Index(fields=['portfolio', 'as_of'], name='checkpoint_portfolio_as_of'),
+        ]
+
+    def __str__(self):
+        return f"{self.portfolio} as of {self.as_of} ({self.transaction_count} transactions)"
+
+
+class PortfolioValuation(models.Model):
+    """
+    End-of-day valuation of a portfolio: holdings valued at the day's closes.
+    Rows are appended by portfolio.valuations up to the last settled day and
+    dropped from the date of any backdated transaction change.
+    """
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name='valuations')
+    date = models.DateField()
+    market_value = models.DecimalField(max_digits=20, decimal_places=8, help_text="Open positions at the day's close.")
+    cost_basis = models.DecimalField(max_digits=20, decimal_places=8, help_text="Purchase cost of the open lots.")
+    realized = models.DecimalField(max_digits=20, decimal_places=8, help_text="Cumulative realized gain/loss.")
+    invested = models.DecimalField(max_digits=20, decimal_places=8, help_text="Cumulative cost of all buys.")
+
+    class Meta:
+        ordering = ['portfolio', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['portfolio', 'date'], name='unique_portfolio_valuation'),
+        ]
+
+    def __str__(self):
+        return f"{self.portfolio} {self.date}: {self.market_value}"
+
+
+class LedgerVersion(models.Model):
+    """
+    Version counter of an account's or portfolio's ledger, bumped by
+    portfolio.snapshots after every committed transaction write. Kept in the
+    database so that every worker process sees the same version; rows are not
+    tied to the portfolio or account and outlive them, so a reused id never
+    starts again at an old version.
+    """
+    KIND_CHOICES = [
+        ('account', 'Account'),
+        ('portfolio', 'Portfolio'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    version = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_ledger_version'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.version}"
@@ -0,0 +1,272 @@
+from collections import deque
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from portfolio.aggregates import monthly_activity, transaction_counts
+from portfolio.engine import replay_ledger
+from portfolio.lots import Ledger
+from portfolio.models import Position, Lot, RealizedMonth
+from transaction.models import Transaction
+
+
+def _load_position(portfolio_id, symbol):
+    position, _ = Position.objects.select_for_update().get_or_create(portfolio_id=portfolio_id, symbol=symbol)
+    return position
+
+
+def _lot_state(lot):
+    return [lot.quantity, lot.price, lot.transaction_id, lot.opened_at]
+
+
+def _is_latest(tx):
+    """
+    True when no other transaction of the same position is dated after `tx`,
+    i.e. appending it to the FIFO state gives the same result as a replay.
+    """
+    later = Transaction.objects.filter(
+        portfolio_id=tx.portfolio_id, symbol=tx.symbol, transaction_date__gt=tx.transaction_date,
+    ).exclude(pk=tx.pk)
+    return not later.exists()
+
+
+def apply_transaction(tx):
+    """
+    Applies a newly created transaction to its materialized position. Appending
+    in date order is done incrementally (FIFO match against the stored lots);
+    a backdated insert falls back to rebuilding the position.
+    """
+    if tx.transaction_type not in ('buy', 'sell'):
+        return
+    if not _is_latest(tx):
+        rebuild_position(tx.portfolio_id, tx.symbol)
+        return
+
+    with db_transaction.atomic():
+        position = _load_position(tx.portfolio_id, tx.symbol)
+        stored = list(position.lots.all())
+        ledger = Ledger()
+        ledger.holdings[tx.symbol] = position.quantity
+        ledger.open_lots[tx.symbol] = deque(_lot_state(lot) for lot in stored)
+        ledger.apply(tx)
+
+        position.quantity = ledger.holdings[tx.symbol]
+        position.realized = F('realized') + ledger.realized.get(tx.symbol, Decimal(0))
+        position.save(update_fields=['quantity', 'realized', 'updated_at'])
+        for month, realized in ledger.monthly_realized.items():
+            updated = RealizedMonth.objects.filter(position=position, month=month).update(realized=F('realized') + realized)
+            if not updated:
+                RealizedMonth.objects.create(position=position, month=month, realized=realized)
+        _sync_lots(position, stored, ledger.open_lots[tx.symbol])
+
+
+def apply_transactions(transactions):
+    """
+    apply_transaction for a batch of newly created transactions (saved with
+    bulk_create), with a fixed number of queries instead of several per
+    transaction. Positions whose new transactions all come after the stored
+    history are updated incrementally in memory and written back in bulk; a
+    position with a backdated insert is rebuilt.
+    """
+    by_position = {}
+    for tx in sorted(transactions, key=lambda t: (t.transaction_date, t.pk)):
+        if tx.transaction_type in ('buy', 'sell'):
+            by_position.setdefault((tx.portfolio_id, tx.symbol), []).append(tx)
+    if not by_position:
+        return
+
+    portfolio_ids = {portfolio_id for portfolio_id, _ in by_position}
+    symbols = {symbol for _, symbol in by_position}
+    new_pks = {tx.pk for added in by_position.values() for tx in added}
+    since = min(added[0].transaction_date for added in by_position.values())
+    backdated = set()
+    later = Transaction.objects.filter(
+        portfolio_id__in=portfolio_ids, symbol__in=symbols, transaction_type__in=['buy', 'sell'], transaction_date__gt=since,
+    ).values_list('pk', 'portfolio_id', 'symbol', 'transaction_date')
+    for pk, portfolio_id, symbol, transaction_date in later:
+        added = by_position.get((portfolio_id, symbol))
+        if added and pk not in new_pks and transaction_date > added[0].transaction_date:
+            backdated.add((portfolio_id, symbol))
+    for key in backdated:
+        rebuild_position(*key)
+        del by_position[key]
+    if not by_position:
+        return
+
+    with db_transaction.atomic():
+        positions = {
+            (position.portfolio_id, position.symbol): position
+            for position in Position.objects.select_for_update().filter(portfolio_id__in=portfolio_ids, symbol__in=symbols)
+            if (position.portfolio_id, position.symbol) in by_position
+        }
+        missing = [Position(portfolio_id=portfolio_id, symbol=symbol) for portfolio_id, symbol in by_position if (portfolio_id, symbol) not in positions]
+        for position in Position.objects.bulk_create(missing):
+            positions[(position.portfolio_id, position.symbol)] = position
+        stored_lots = {}
+        for lot in Lot.objects.filter(position__in=positions.values()):
+            stored_lots.setdefault(lot.position_id, []).append(lot)
+        months = {
+            (bucket.position_id, bucket.month): bucket
+            for bucket in RealizedMonth.objects.filter(position__in=positions.values())
+        }
+
+        now = timezone.now()
+        closed, changed, opened, new_months = [], [], [], []
+        for key, added in by_position.items():
+            position = positions[key]
+            stored = stored_lots.get(position.pk, [])
+            ledger = Ledger()
+            ledger.holdings[key[1]] = position.quantity
+            ledger.open_lots[key[1]] = deque(_lot_state(lot) for lot in stored)
+            for tx in added:
+                ledger.apply(tx)
+            position.quantity = ledger.holdings[key[1]]
+            position.realized += ledger.realized.get(key[1], Decimal(0))
+            position.updated_at = now
+            for month, realized in ledger.monthly_realized.items():
+                bucket = months.get((position.pk, month))
+                if bucket is None:
+                    new_months.append(RealizedMonth(position=position, month=month, realized=realized))
+                else:
+                    bucket.realized += realized
+
+            remaining = {lot[2]: lot for lot in ledger.open_lots[key[1]]}
+            for lot in stored:
+                state = remaining.pop(lot.transaction_id, None)
+                if state is None:
+                    closed.append(lot.pk)
+                elif state[0] != lot.quantity:
+                    lot.quantity = state[0]
+                    changed.append(lot)
+            opened.extend(
+                Lot(position=position, transaction_id=tx_id, quantity=quantity, price=price, opened_at=opened_at)
+                for quantity, price, tx_id, opened_at in remaining.values()
+            )
+
+        Position.objects.bulk_update(positions.values(), ['quantity', 'realized', 'updated_at'])
+        RealizedMonth.objects.bulk_update(months.values(), ['realized'])
+        RealizedMonth.objects.bulk_create(new_months)
+        Lot.objects.filter(pk__in=closed).delete()
+        Lot.objects.bulk_update(changed, ['quantity'])
+        Lot.objects.bulk_create(opened)
+
+
+def _sync_lots(position, stored, remaining):
+    """
+    Writes the difference between the stored lots and the remaining FIFO state.
+    """
+    remaining_by_tx = {lot[2]: lot for lot in remaining}
+    closed = [lot.pk for lot in stored if lot.transaction_id not in remaining_by_tx]
+    if closed:
+        Lot.objects.filter(pk__in=closed).delete()
+    for lot in stored:
+        state = remaining_by_tx.pop(lot.transaction_id, None)
+        if state is not None and state[0] != lot.quantity:
+            Lot.objects.filter(pk=lot.pk).update(quantity=state[0])
+    Lot.objects.bulk_create([
+        Lot(position=position, transaction_id=tx_id, quantity=quantity, price=price, opened_at=opened_at)
+        for quantity, price, tx_id, opened_at in remaining_by_tx.values()
+    ])
+
+
+def rebuild_position(portfolio_id, symbol):
+    """
+    Replays every transaction of (portfolio, symbol) and replaces the stored
+    position, lots and monthly realized buckets. Deletes the position when no
+    buy or sell is left.
+    """
+    with db_transaction.atomic():
+        transactions = Transaction.objects.filter(
+            portfolio_id=portfolio_id, symbol=symbol, transaction_type__in=['buy', 'sell'],
+        )
+        ledger = replay_ledger(transactions)
+        if symbol not in ledger.holdings:
+            Position.objects.filter(portfolio_id=portfolio_id, symbol=symbol).delete()
+            return None
+
+        position = _load_position(portfolio_id, symbol)
+        position.quantity = ledger.holdings[symbol]
+        position.realized = ledger.realized.get(symbol, Decimal(0))
+        position.save(update_fields=['quantity', 'realized', 'updated_at'])
+        position.realized_months.all().delete()
+        RealizedMonth.objects.bulk_create([
+            RealizedMonth(position=position, month=month, realized=realized)
+            for month, realized in ledger.monthly_realized.items()
+        ])
+        position.lots.all().delete()
+        _sync_lots(position, [], ledger.open_lots[symbol])
+        return position
+
+
+def rebuild_portfolio(portfolio_id, symbols=None):
+    """
+    Rebuilds the given symbols of a portfolio (all traded symbols by default)
+    and drops positions whose symbol no longer appears in the ledger.
+    """
+    traded = set(Transaction.objects.filter(portfolio_id=portfolio_id).values_list('symbol', flat=True))
+    if symbols is None:
+        symbols = traded | set(Position.objects.filter(portfolio_id=portfolio_id).values_list('symbol', flat=True))
+    for symbol in symbols:
+        rebuild_position(portfolio_id, symbol)
+
+
+def verify_position(portfolio_id, symbol):
+    """
+    Compares the stored position with a fresh replay of the ledger and returns
+    a list of human-readable differences (empty when they agree).
+    """
+    transactions = Transaction.objects.filter(
+        portfolio_id=portfolio_id, symbol=symbol, transaction_type__in=['buy', 'sell'],
+    )
+    ledger = replay_ledger(transactions)
+    position = Position.objects.filter(portfolio_id=portfolio_id, symbol=symbol).first()
+    if symbol not in ledger.holdings:
+        return ["stale position"] if position else []
+    if position is None:
+        return ["missing position"]
+
+    problems = []
+    quantize = Decimal('0.00000001')
+    if position.quantity != ledger.holdings[symbol].quantize(quantize):
+        problems.append(f"quantity {position.quantity} != {ledger.holdings[symbol]}")
+    expected_realized = ledger.realized.get(symbol, Decimal(0))
+    if abs(position.realized - expected_realized) > quantize * max(1, len(ledger.monthly_realized)):
+        problems.append(f"realized {position.realized} != {expected_realized}")
+    stored_lots = [(lot.transaction_id, lot.quantity) for lot in position.lots.all()]
+    expected_lots = [(lot[2], lot[0].quantize(quantize)) for lot in ledger.open_lots[symbol]]
+    if stored_lots != expected_lots:
+        problems.append(f"open lots {stored_lots} != {expected_lots}")
+    return problems
+
+
+def load_ledger(portfolios, latest=None):
+    """
+    Builds a Ledger for one or more portfolios from the materialized tables:
+    O(positions + open lots) rows instead of the whole transaction history.
+    Positions of the same symbol in different portfolios are combined.
+    Monthly activity and per-type counts are aggregated by the database.
+    """
+    ledger = Ledger() if latest is None else Ledger(latest=latest)
+    positions = Position.objects.filter(portfolio__in=portfolios).order_by('id')
+    for symbol, quantity, realized in positions.values_list('symbol', 'quantity', 'realized'):
+        ledger.holdings[symbol] += quantity
+        ledger.open_lots[symbol]
+        if realized:
+            ledger.realized[symbol] += realized
+
+    lots = Lot.objects.filter(position__portfolio__in=portfolios).order_by('opened_at', 'transaction_id')
+    for symbol, quantity, price, tx_id, opened_at in lots.values_list('position__symbol', 'quantity', 'price', 'transaction_id', 'opened_at'):
+        ledger.open_lots[symbol].append([quantity, price, tx_id, opened_at])
+
+    months = RealizedMonth.objects.filter(position__portfolio__in=portfolios).values('month').annotate(total=Sum('realized')).order_by('month')
+    for row in months:
+        ledger.monthly_realized[row['month']] = row['total']
+
+    ledger.monthly_activity = monthly_activity(portfolios)
+    ledger.transaction_counts.update(transaction_counts(portfolios))
+
+    recent = Transaction.objects.filter(portfolio__in=portfolios).order_by('-transaction_date', '-id')[:ledger.latest.maxlen]
+    ledger.latest.extend(reversed(list(recent)))
+    return ledger
@@ -0,0 +1,128 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from portfolio.risk import holding_values, open_quantities, return_window
+from portfolio.snapshots import get_version, portfolio_ledger
+
+PROJECTION_DEFAULTS = {
+    'PATHS': 10_000,
+    'MAX_PATHS': 100_000,
+    'LOOKBACK_DAYS': 5 * 365,
+    'CHUNK_VALUES': 4_000_000,
+    'CACHE_TIMEOUT': 60 * 60 * 24,
+}
+TRADING_DAYS_PER_MONTH = 21
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def projection_settings():
+    return {**PROJECTION_DEFAULTS, **getattr(settings, 'PORTFOLIO_PROJECTION', {})}
+
+
+def simulate_growth(daily_returns, months, paths, seed=None, chunk_values=None):
+    """
+    Monte Carlo growth of 1.0 over `months` month ends. Returns (bands, final):
+    the PERCENTILES of the growth at each month end, a (len(PERCENTILES) x
+    months) array, and the growth of every path at the horizon.
+
+    Each path draws its trading days independently (with replacement) from
+    `daily_returns`, the historical daily returns, so the simulated months
+    keep their fat tails and skew. All paths advance one month at a time, in
+    chunks of at most `chunk_values` draws, and only each path's current
+    value is kept: memory grows with the number of paths, not with the
+    horizon. The same seed gives the same paths.
+    """
+    chunk_values = chunk_values or projection_settings()['CHUNK_VALUES']
+    rng = np.random.default_rng(seed)
+    log_returns = np.log1p(np.asarray(daily_returns, dtype=np.float64))
+    growth = np.ones(paths)
+    bands = np.empty((len(PERCENTILES), months))
+    chunk = max(1, chunk_values // TRADING_DAYS_PER_MONTH)
+    for month in range(months):
+        for first in range(0, paths, chunk):
+            size = min(chunk, paths - first)
+            draws = log_returns[rng.integers(0, len(log_returns), size=(size, TRADING_DAYS_PER_MONTH))]
+            growth[first:first + size] *= np.exp(draws.sum(axis=1))
+        bands[:, month] = np.percentile(growth, PERCENTILES)
+    return bands, growth
+
+
+def _percentiles(values):
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def project_portfolio(portfolio, paths=None, seed=None):
+    """
+    Projects the value of the portfolio's current holdings over its strategy's
+    investment horizon and estimates the probability of compounding at the
+    strategy's target return.
+
+    Daily portfolio returns are taken from the last PORTFOLIO_PROJECTION
+    LOOKBACK_DAYS of closes at today's weights (the mix is assumed to be kept,
+    i.e. rebalanced), and resampled by simulate_growth. Returns None without
+    holdings or history.
+
+    Results are cached under the portfolio's ledger version, the strategy's
+    last update, the simulation arguments and the last settled market day, so
+    they are recomputed when the holdings, the strategy or the history change.
+    """
+    options = projection_settings()
+    paths = paths or options['PATHS']
+    strategy = portfolio.strategy
+    horizon = strategy.investment_horizon
+    if not horizon:
+        return None
+
+    ledger = portfolio_ledger(portfolio)
+    quantities = open_quantities(ledger)
+    if not quantities:
+        return None
+    window = return_window(quantities, options['LOOKBACK_DAYS'])
+    if len(window.days) < 2:
+        return None
+
+    key = (
+        f"projection:{portfolio.pk}:{get_version('portfolio', portfolio.pk)}:{strategy.pk}:"
+        f"{strategy.updated_at.timestamp()}:{paths}:{seed}:{window.days[-1]}"
+    )
+    projection = cache.get(key)
+    if projection is not None:
+        return projection
+
+    values = holding_values(window, quantities)
+    initial_value = float(values.sum())
+    if initial_value <= 0:
+        return None
+    weights = np.r_[values / initial_value, 0.0]
+    daily = window.returns @ weights
+
+    months = horizon * 12
+    bands, final = simulate_growth(daily, months, paths, seed)
+    target_growth = (1 + float(strategy.target_return) / 100) ** horizon
+    bands *= initial_value
+
+    projection = {
+        "paths": paths,
+        "seed": seed,
+        "horizon_years": horizon,
+        "target_return": strategy.target_return,
+        "initial_value": initial_value,
+        "target_value": initial_value * target_growth,
+        "probability_of_meeting_target": float((final >= target_growth).mean()),
+        "history": {
+            "start_date": window.days[0].astype('datetime64[D]').item(),
+            "end_date": window.days[-1].astype('datetime64[D]').item(),
+            "observations": len(daily),
+            "mean_daily_return": float(daily.mean()) * 100,
+            "daily_volatility": float(daily.std(ddof=1)) * 100,
+        },
+        "final_value": _percentiles(final * initial_value),
+        "annualized_return": _percentiles((final ** (1 / horizon) - 1) * 100),
+        "bands": [
+            {"month": month + 1, **{f"p{p}": float(band[month]) for p, band in zip(PERCENTILES, bands)}}
+            for month in range(months)
+        ],
+    }
+    cache.set(key, projection, options['CACHE_TIMEOUT'])
+    return projection
@@ -1,23 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
-from transaction.models import Transaction
+from django.conf import settings
 from portfolio.api.serializers import IndividualPortfolioPerformanceSerializer
-from finance.helpers import get_stock_news, get_stock_price, get_stock_history
+from portfolio.snapshots import portfolio_ledger
+from portfolio.returns import portfolio_returns
+from finance.helpers import get_stock_news, get_stock_price
+from finance.barstore import read_bars
+
+FANOUT_DEFAULTS = {
+    'WORKERS': 8,
+    'CALL_TIMEOUT': 5,
+    'DEADLINE': 15,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def fanout_settings():
+    return {**FANOUT_DEFAULTS, **getattr(settings, 'RECOMMENDATION_FANOUT', {})}
+
+def _submit(fn, *args):
+    """
+    Runs a blocking market data call on the shared, bounded recommendation pool.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=fanout_settings()['WORKERS'], thread_name_prefix='recommendation',
+                )
+    return _executor.submit(fn, *args)
 
 def generate_recommendation(portfolio):
     """
     Generate recommendations by comparing the portfolio's performance with its strategy.
+    The strategy's target return (an annual percentage) is compared with the portfolio's
+    annualized time-weighted return since its first transaction.
     For each owned stock (derived from assets_by_asset), this version analyzes quantitative data by comparing 
     the current price to the average price over the last week and performs rudimentary qualitative analysis from recent news.
+    The per-symbol price, history and news calls run concurrently on a bounded pool; symbols whose calls time out
+    or fail are reported as "Data unavailable." instead of failing the response.
     """
-    transactions = Transaction.objects.filter(portfolio=portfolio)
-    serializer = IndividualPortfolioPerformanceSerializer()
-    performance_data = serializer.to_representation(transactions)
+    ledger = portfolio_ledger(portfolio)
+    fanout = fanout_settings()
+    deadline = time.monotonic() + fanout['DEADLINE']
+
+    def result(future):
+        return future.result(timeout=max(0, min(fanout['CALL_TIMEOUT'], deadline - time.monotonic())))
+
+    # Every call is submitted up front, so the valuation below waits on the
+    # quotes under the same timeouts as the per-symbol analysis.
+    end_date = datetime.today().date()
+    start_date = end_date - timedelta(days=7)
+    pending = {
+        symbol: (_submit(get_stock_price, symbol), _submit(read_bars, symbol, start_date, end_date), _submit(get_stock_news, symbol))
+        for symbol in ledger.holdings
+    }
+    prices = {symbol: futures[0] for symbol, futures in pending.items()}
+
+    def price_for(symbol):
+        try:
+            return result(prices[symbol])
+        except Exception:
+            return None
+
+    performance_data = IndividualPortfolioPerformanceSerializer.summarize(ledger, price_for)
 
     realized = performance_data.get("total_gain_loss", {}).get("realized", Decimal(0))
     target = portfolio.strategy.target_return
+    returns = portfolio_returns([portfolio.pk])[portfolio.pk] or {}
+    annualized = returns.get("annualized_return")
 
-    if realized < target:
+    if annualized is None:
+        overall_recommendation = "Not enough history yet to compare your portfolio's return with your strategy."
+    elif annualized < target:
         if portfolio.strategy.risk_tolerance == 'high':
             overall_recommendation = (
                 "Your portfolio is underperforming. "
@@ -39,54 +99,69 @@ def generate_recommendation(portfolio):
     performance_data["recommendation"] = overall_recommendation
     performance_data["realized_gain"] = str(realized)
     performance_data["target_return"] = str(target)
+    performance_data["returns"] = returns or None
 
     stocks_analysis = []
-    assets = performance_data.get("assets_by_asset", {})
-    for symbol in assets.keys():
-        current_price = get_stock_price(symbol)
-        end_date = datetime.today().date()
-        start_date = end_date - timedelta(days=7)
-        history_data = get_stock_history(symbol, start_date.isoformat(), end_date.isoformat())
-        average_price = None
-        if history_data:
-            prices = [record.get("Close") for record in history_data if record.get("Close") is not None]
-            if prices:
-                average_price = sum(prices) / len(prices)
-        
-        if current_price is not None and average_price is not None:
-            if current_price > average_price:
-                quant_recommendation = "Bullish trend observed."
-            else:
-                quant_recommendation = "Bearish trend observed."
+    for symbol, futures in pending.items():
+        try:
+            current_price, bars, all_news = [result(future) for future in futures]
+        except Exception:
+            # Timed out or failed upstream: report the symbol instead of failing the response
+            for future in futures:
+                future.cancel()
+            stocks_analysis.append(unavailable_analysis(symbol))
+            continue
+        stocks_analysis.append(analyze_stock(symbol, current_price, bars.close, all_news))
+
+    performance_data["stocks_analysis"] = stocks_analysis
+
+    return performance_data
+
+def analyze_stock(symbol, current_price, closes, all_news):
+    """
+    Quantitative (price vs. last week's average close) and qualitative (news
+    headline keywords) assessment of one holding.
+    """
+    average_price = float(closes.mean()) if len(closes) else None
+
+    if current_price is not None and average_price is not None:
+        if current_price > average_price:
+            quant_recommendation = "Bullish trend observed."
         else:
-            quant_recommendation = "Insufficient data to determine trend."
-
-        all_news = get_stock_news(symbol)
-        negative_keywords = ["downgrade", "warning", "risk", "loss"]
-        qualitative_flag = any(
-            any(neg in article.get("title", "").lower() for neg in negative_keywords)
-            for article in all_news
-        )
-        if qualitative_flag:
-            qualitative_recommendation = "Recent news signals potential concerns."
+            quant_recommendation = "Bearish trend observed."
+    else:
+        quant_recommendation = "Insufficient data to determine trend."
+
+    negative_keywords = ["downgrade", "warning", "risk", "loss"]
+    qualitative_flag = any(
+        any(neg in article.get("title", "").lower() for neg in negative_keywords)
+        for article in all_news
+    )
+    if qualitative_flag:
+        qualitative_recommendation = "Recent news signals potential concerns."
+    else:
+        if all_news:
+            qualitative_recommendation = "Recent news appears positive."
         else:
-            if all_news:
-                qualitative_recommendation = "Recent news appears positive."
-            else:
-                qualitative_recommendation = "No recent news to analyze."
-
-        display_news = all_news[:2]
-
-        stock_rec = {
-            "symbol": symbol,
-            "current_price": current_price,
-            "average_price_last_week": average_price,
-            "quantitative_assessment": quant_recommendation,
-            "news": display_news,
-            "qualitative_assessment": qualitative_recommendation
-        }
-        stocks_analysis.append(stock_rec)
+            qualitative_recommendation = "No recent news to analyze."
 
-    performance_data["stocks_analysis"] = stocks_analysis
+    display_news = all_news[:2]
+
+    return {
+        "symbol": symbol,
+        "current_price": current_price,
+        "average_price_last_week": average_price,
+        "quantitative_assessment": quant_recommendation,
+        "news": display_news,
+        "qualitative_assessment": qualitative_recommendation
+    }
 
-    return performance_data
\ No newline at end of file
+def unavailable_analysis(symbol):
+    return {
+        "symbol": symbol,
+        "current_price": None,
+        "average_price_last_week": None,
+        "quantitative_assessment": "Data unavailable.",
+        "news": [],
+        "qualitative_assessment": "Data unavailable."
+    }
@@ -0,0 +1,137 @@
+import numpy as np
+
+from portfolio.aggregates import daily_flows
+from portfolio.engine import raw_columns
+from portfolio.models import PortfolioValuation
+from portfolio.valuations import extend_valuations
+
+DAYS_PER_YEAR = 365.0
+XIRR_GUESS = 0.1
+XIRR_TOLERANCE = 1e-10
+XIRR_MAX_ITERATIONS = 100
+# A rate at or below -100% has no meaning (and (1 + rate) ** -t is undefined).
+XIRR_FLOOR = -0.999999
+
+
+def xirr(amounts, days):
+    """
+    Annual internal rate of return of one or more cash flow schedules, solved
+    with Newton's method on all schedules at once.
+
+    `amounts` and `days` are 2-D arrays with one schedule per row (pad shorter
+    rows with zero amounts); days are counted from any common origin. Money put
+    in is negative, money taken out (and the final value) positive. Returns an
+    array of rates, NaN where the schedule has no sign change or the solver did
+    not converge.
+    """
+    amounts = np.atleast_2d(np.asarray(amounts, dtype=np.float64))
+    years = np.atleast_2d(np.asarray(days, dtype=np.float64))
+    years = (years - years[:, :1]) / DAYS_PER_YEAR
+    rate = np.full(len(amounts), XIRR_GUESS)
+    with np.errstate(all='ignore'):
+        for _ in range(XIRR_MAX_ITERATIONS):
+            base = 1 + rate[:, None]
+            discounted = amounts * base ** -years
+            npv = discounted.sum(axis=1)
+            slope = (-years * discounted / base).sum(axis=1)
+            step = np.where(slope != 0, npv / slope, 0)
+            updated = np.maximum(rate - step, XIRR_FLOOR)
+            converged = np.abs(updated - rate) < XIRR_TOLERANCE
+            rate = updated
+            if converged.all():
+                break
+        residual = np.abs((amounts * (1 + rate[:, None]) ** -years).sum(axis=1))
+    scale = np.abs(amounts).sum(axis=1)
+    valid = (amounts > 0).any(axis=1) & (amounts < 0).any(axis=1) & np.isfinite(rate) & (residual <= 1e-6 * scale)
+    return np.where(valid, rate, np.nan)
+
+
+def _percent(value):
+    return None if value is None or not np.isfinite(value) else float(value) * 100
+
+
+def _window_returns(dates, values, flows, start, end):
+    """
+    Returns of one portfolio over [start, end] from its daily values and flows.
+
+    Each day is a sub-period: contributions are assumed at the start of the day
+    and withdrawals at its end, so r = (value + withdrawn) / (previous value +
+    contributed) - 1. Chain-linking the sub-periods gives the time-weighted
+    return; the same flows, plus the opening and closing values, give the
+    money-weighted return (XIRR).
+    """
+    first = np.searchsorted(dates, np.datetime64(start, 'D'), side='left') if start else 0
+    last = np.searchsorted(dates, np.datetime64(end, 'D'), side='right') if end else len(dates)
+    if first >= last:
+        return None
+
+    # Flows dated on a weekend or holiday belong to the next valued day.
+    contributed = np.zeros(len(dates))
+    withdrawn = np.zeros(len(dates))
+    if flows is not None:
+        flow_dates, flow_in, flow_out = flows
+        index = np.searchsorted(dates, flow_dates, side='left')
+        inside = index < len(dates)
+        np.add.at(contributed, index[inside], flow_in[inside])
+        np.add.at(withdrawn, index[inside], flow_out[inside])
+
+    opening = values[first - 1] if first > 0 else 0.0
+    window = slice(first, last)
+    value = values[window]
+    previous = np.r_[opening, value[:-1]]
+    invested = previous + contributed[window]
+    growth = np.where(invested > 0, (value + withdrawn[window]) / np.where(invested > 0, invested, 1), 1)
+    time_weighted = float(np.prod(growth)) - 1
+
+    origin = dates[first - 1] if first > 0 else dates[first]
+    days = int((dates[last - 1] - origin) / np.timedelta64(1, 'D'))
+    annualized = (1 + time_weighted) ** (DAYS_PER_YEAR / days) - 1 if days > 0 and time_weighted > -1 else None
+
+    day_numbers = (dates[window] - origin) / np.timedelta64(1, 'D')
+    amounts = withdrawn[window] - contributed[window]
+    amounts[-1] += value[-1]
+    money_weighted = xirr(np.r_[-opening, amounts], np.r_[0, day_numbers])[0] if days > 0 else None
+
+    return {
+        "start_date": origin.item(),
+        "end_date": dates[last - 1].item(),
+        "time_weighted_return": _percent(time_weighted),
+        "annualized_return": _percent(annualized),
+        "money_weighted_return": _percent(money_weighted),
+    }
+
+
+def _values(portfolio_id, end):
+    """
+    Dates and market values of the portfolio's series up to `end`, extending
+    the stored series first.
+    """
+    today_row = extend_valuations(portfolio_id)
+    rows = PortfolioValuation.objects.filter(portfolio_id=portfolio_id)
+    if end:
+        rows = rows.filter(date__lte=end)
+    columns = raw_columns(rows.order_by('date').values_list('date', 'market_value')) or ((), ())
+    dates = np.array(columns[0], dtype='datetime64[D]')
+    values = np.array(columns[1], dtype=np.float64)
+    if today_row is not None and (not end or today_row.date <= end):
+        dates = np.r_[dates, np.datetime64(today_row.date, 'D')]
+        values = np.r_[values, float(today_row.market_value)]
+    return dates, values
+
+
+def portfolio_returns(portfolio_ids, start=None, end=None):
+    """
+    {portfolio id: returns} over [start, end] (both optional) for each
+    portfolio, from its daily valuation series and its daily cash flows.
+    Returns are percentages; the money-weighted return is annual. A portfolio
+    without valued days in the window maps to None.
+    """
+    flows = daily_flows(portfolio_ids)
+    returns = {}
+    for portfolio_id in portfolio_ids:
+        dates, values = _values(portfolio_id, end)
+        if not len(dates):
+            returns[portfolio_id] = None
+            continue
+        returns[portfolio_id] = _window_returns(dates, values, flows.get(portfolio_id), start, end)
+    return returns
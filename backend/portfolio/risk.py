@@ -0,0 +1,211 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+from statistics import NormalDist
+
+import numpy as np
+from django.conf import settings
+
+from finance.barstore import aligned_closes, market_today, read_bars_many
+from finance.columnar import day_number
+
+RISK_DEFAULTS = {
+    'BENCHMARK': '^GSPC',
+    'LOOKBACK_DAYS': 365,
+    'CONFIDENCE': 0.95,
+    'CACHE_ENTRIES': 256,
+}
+TRADING_DAYS_PER_YEAR = 252
+# Days read before a new window so that its first day has a previous close.
+SEED_DAYS = 10
+
+
+def risk_settings():
+    return {**RISK_DEFAULTS, **getattr(settings, 'RISK_ANALYTICS', {})}
+
+
+class ReturnWindow:
+    """
+    Daily close-to-close returns of a fixed set of symbols over a rolling
+    lookback window, with the running sums needed for their covariance.
+
+    Rows follow the benchmark's trading days (the last column); a symbol
+    without a bar on such a day carries its previous close forward, so moves
+    on other days (crypto weekends) land on the next trading day. The window
+    holds settled days only and is extended with the bars that arrived since
+    its last day, while the days that fell out of the lookback are trimmed;
+    both adjust the sums instead of recomputing them.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.lock = threading.Lock()
+        self.days = np.empty(0, dtype=np.int64)
+        self.returns = np.empty((0, len(symbols)))
+        self.last_closes = np.full(len(symbols), np.nan)
+        self.last_day = None
+        self.sums = np.zeros(len(symbols))
+        self.cross = np.zeros((len(symbols), len(symbols)))
+
+    def update(self, first, last):
+        """
+        Brings the window to cover the trading days in [first, last].
+        """
+        if self.last_day is None or self.last_day < first - timedelta(days=1):
+            self._reset(first)
+        if self.last_day < last:
+            self._append(self.last_day + timedelta(days=1), last)
+        self._trim(day_number(first))
+
+    def _reset(self, first):
+        self.__init__(self.symbols)
+        self.last_day = first - timedelta(days=SEED_DAYS + 1)
+
+    def _append(self, first, last):
+        bars = read_bars_many(self.symbols, first, last + timedelta(days=1))
+        calendar = bars[self.symbols[-1]].date.astype(np.int64)
+        self.last_day = last
+        if not len(calendar):
+            return
+
+        closes = aligned_closes(bars, self.symbols, calendar)
+        # Days before a symbol's first bar in this read keep the window's last close.
+        closes = np.where(np.isnan(closes), self.last_closes, closes)
+
+        previous = np.vstack([self.last_closes, closes[:-1]])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.where((previous > 0) & ~np.isnan(closes), closes / previous - 1, 0.0)
+        if np.isnan(self.last_closes).all():
+            # The first row of a new window has no previous close; it is one of the seed days.
+            returns, calendar = returns[1:], calendar[1:]
+        self.last_closes = closes[-1]
+        if not len(calendar):
+            return
+        self.days = np.r_[self.days, calendar]
+        self.returns = np.vstack([self.returns, returns])
+        self.sums += returns.sum(axis=0)
+        self.cross += returns.T @ returns
+
+    def _trim(self, first_day):
+        drop = np.searchsorted(self.days, first_day, side='left')
+        if not drop:
+            return
+        dropped = self.returns[:drop]
+        self.sums -= dropped.sum(axis=0)
+        self.cross -= dropped.T @ dropped
+        self.days = self.days[drop:]
+        self.returns = self.returns[drop:]
+
+    def covariance(self):
+        count = len(self.days)
+        if count < 2:
+            return None
+        return (self.cross - np.outer(self.sums, self.sums) / count) / (count - 1)
+
+    def mean(self):
+        return self.sums / len(self.days) if len(self.days) else None
+
+
+_windows = OrderedDict()
+_windows_lock = threading.Lock()
+
+
+def return_window(symbols, lookback_days=None):
+    """
+    The up-to-date ReturnWindow of `symbols` plus the benchmark over the last
+    `lookback_days` (RISK_ANALYTICS['LOOKBACK_DAYS'] by default), shared by
+    every portfolio holding the same symbols (an in-process LRU cache).
+    """
+    options = risk_settings()
+    lookback_days = lookback_days or options['LOOKBACK_DAYS']
+    symbols = tuple(sorted(set(symbols) - {options['BENCHMARK']})) + (options['BENCHMARK'],)
+    key = (symbols, lookback_days)
+    with _windows_lock:
+        window = _windows.get(key)
+        if window is None:
+            window = _windows[key] = ReturnWindow(symbols)
+        _windows.move_to_end(key)
+        while len(_windows) > options['CACHE_ENTRIES']:
+            _windows.popitem(last=False)
+
+    last = market_today() - timedelta(days=1)
+    with window.lock:
+        window.update(last - timedelta(days=lookback_days), last)
+    return window
+
+
+def open_quantities(ledger):
+    """
+    {symbol: quantity} of the ledger's open lots, as floats.
+    """
+    return {
+        symbol: float(sum((lot[0] for lot in lots), Decimal(0)))
+        for symbol, lots in ledger.open_lots.items() if lots
+    }
+
+
+def holding_values(window, quantities):
+    """
+    Value of each of the window's symbols (benchmark excluded) at its last settled close.
+    """
+    return np.array([quantities.get(symbol, 0.0) for symbol in window.symbols[:-1]]) * np.nan_to_num(window.last_closes[:-1])
+
+
+def _percent(value):
+    return None if value is None or not np.isfinite(value) else float(value) * 100
+
+
+def portfolio_risk(ledger):
+    """
+    Risk of the portfolio's current holdings over the lookback window, as if
+    they had been held throughout: annualized volatility, beta against the
+    benchmark, maximum drawdown and one-day historical and parametric Value
+    at Risk. Weights are the holdings' values at the last settled close.
+    Percentages are of the portfolio's value. Returns None without holdings.
+    """
+    options = risk_settings()
+    quantities = open_quantities(ledger)
+    if not quantities:
+        return None
+
+    window = return_window(quantities)
+    symbols = window.symbols[:-1]
+    values = holding_values(window, quantities)
+    market_value = values.sum()
+    covariance = window.covariance()
+    if covariance is None or market_value <= 0:
+        return None
+
+    weights = np.r_[values / market_value, 0.0]
+    benchmark = len(symbols)
+    daily = window.returns @ weights
+    variance = weights @ covariance @ weights
+    volatility = np.sqrt(max(variance, 0.0))
+    benchmark_variance = covariance[benchmark, benchmark]
+    beta = (covariance[benchmark] @ weights) / benchmark_variance if benchmark_variance > 0 else None
+
+    wealth = np.cumprod(np.r_[1.0, 1 + daily])
+    drawdown = wealth / np.maximum.accumulate(wealth) - 1
+
+    confidence = options['CONFIDENCE']
+    historical_var = -np.quantile(daily, 1 - confidence)
+    parametric_var = -(window.mean() @ weights - NormalDist().inv_cdf(confidence) * volatility)
+
+    return {
+        "benchmark": options['BENCHMARK'],
+        "start_date": window.days[0].astype('datetime64[D]').item(),
+        "end_date": window.days[-1].astype('datetime64[D]').item(),
+        "observations": len(window.days),
+        "market_value": float(market_value),
+        "volatility": _percent(volatility * np.sqrt(TRADING_DAYS_PER_YEAR)),
+        "beta": None if beta is None else float(beta),
+        "max_drawdown": _percent(-drawdown.min()),
+        "value_at_risk": {
+            "confidence": confidence,
+            "historical": _percent(historical_var),
+            "parametric": _percent(parametric_var),
+            "historical_amount": float(historical_var * market_value),
+            "parametric_amount": float(parametric_var * market_value),
+        },
+    }
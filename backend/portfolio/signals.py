@@ -0,0 +1,142 @@
+from django.db import transaction as db_transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from portfolio.models import Portfolio
+from portfolio.checkpoints import invalidate_checkpoints
+from portfolio.live import live_index
+from portfolio.positions import apply_transaction, apply_transactions, rebuild_position
+from portfolio.snapshots import bump_version
+from portfolio.valuations import invalidate_valuations
+from transaction.models import Transaction
+
+
+def _cascaded(origin):
+    """
+    True when a transaction is deleted along with its portfolio (or account):
+    `origin` is the instance or queryset delete() was called on. Nothing is
+    left to maintain for a portfolio that is going away.
+    """
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not Transaction
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_position(sender, instance, raw=False, **kwargs):
+    instance._previous_position = None
+    instance._previous_date = None
+    if instance.pk and not raw:
+        previous = Transaction.objects.filter(pk=instance.pk).values_list('portfolio_id', 'symbol', 'transaction_date').first()
+        if previous:
+            instance._previous_position, instance._previous_date = previous[:2], previous[2]
+
+
+@receiver(post_save, sender=Transaction)
+def sync_position_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_transaction(instance)
+        return
+    previous = getattr(instance, '_previous_position', None)
+    if previous and previous != (instance.portfolio_id, instance.symbol):
+        # Release the old position's lot for this transaction before rebuilding the new one
+        rebuild_position(*previous)
+    rebuild_position(instance.portfolio_id, instance.symbol)
+
+
+@receiver(post_delete, sender=Transaction)
+def sync_position_on_delete(sender, instance, origin=None, **kwargs):
+    if _cascaded(origin):
+        return
+    rebuild_position(instance.portfolio_id, instance.symbol)
+
+
+@receiver(post_delete, sender=Portfolio)
+def forget_deleted_portfolio(sender, instance, **kwargs):
+    live_index().forget(instance.pk)
+
+
+def invalidate_snapshots(portfolio_id, account_id):
+    """
+    Bumps the ledger versions once the write is committed, so a reader can
+    never cache pre-commit data under the new version. These callbacks are
+    registered before the ones of invalidate_history_on_change: the version
+    must change before the checkpoints are dropped (see ledger_as_of).
+    """
+    def bump():
+        bump_version('portfolio', portfolio_id)
+        bump_version('account', account_id)
+    db_transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_on_transaction_change(sender, instance, created=False, origin=None, **kwargs):
+    if _cascaded(origin):
+        # The portfolio's own post_delete bumps the versions.
+        return
+    portfolio_ids = {instance.portfolio_id}
+    previous = None if created else getattr(instance, '_previous_position', None)
+    if previous:
+        portfolio_ids.add(previous[0])
+    for portfolio_id, account_id in Portfolio.objects.filter(pk__in=portfolio_ids).values_list('pk', 'account_id'):
+        invalidate_snapshots(portfolio_id, account_id)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_history_on_change(sender, instance, created=False, raw=False, origin=None, **kwargs):
+    """
+    Drops the ledger checkpoints and daily valuations dated at or after the
+    change. For an edit this is the earlier of the old and new date (the old
+    portfolio too, if it moved). Appends dated after the stored history leave
+    it untouched.
+    """
+    if raw or _cascaded(origin):
+        return
+    changes = [(instance.portfolio_id, instance.transaction_date)]
+    previous_date = None if created else getattr(instance, '_previous_date', None)
+    if previous_date is not None:
+        changes.append((instance._previous_position[0], previous_date))
+
+    def invalidate():
+        for portfolio_id, since in changes:
+            invalidate_checkpoints(portfolio_id, since)
+            invalidate_valuations(portfolio_id, since)
+    db_transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Portfolio)
+@receiver(post_delete, sender=Portfolio)
+def invalidate_on_portfolio_change(sender, instance, **kwargs):
+    invalidate_snapshots(instance.pk, instance.account_id)
+
+
+def sync_bulk_created(transactions):
+    """
+    Does for transactions saved with bulk_create (which sends no signals)
+    what the handlers above do for a save: updates the materialized positions
+    (see apply_transactions), drops the checkpoints and valuations from the
+    earliest new date of each portfolio, and bumps the ledger versions on
+    commit.
+    """
+    earliest = {}
+    for tx in transactions:
+        if tx.portfolio_id not in earliest or tx.transaction_date < earliest[tx.portfolio_id]:
+            earliest[tx.portfolio_id] = tx.transaction_date
+    apply_transactions(transactions)
+
+    accounts = dict(Portfolio.objects.filter(pk__in=earliest).values_list('pk', 'account_id'))
+
+    def invalidate():
+        for portfolio_id, since in earliest.items():
+            bump_version('portfolio', portfolio_id)
+            invalidate_checkpoints(portfolio_id, since)
+            invalidate_valuations(portfolio_id, since)
+        for account_id in set(accounts.values()):
+            bump_version('account', account_id)
+    db_transaction.on_commit(invalidate)
@@ -0,0 +1,69 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from portfolio.models import LedgerVersion, Portfolio
+from portfolio.positions import load_ledger
+
+
+def get_version(kind, pk):
+    """
+    Current ledger version of an 'account' or 'portfolio'. Versions live in the
+    database (see LedgerVersion), so a write in one process is seen by all of
+    them; they start at a time-based value so a new counter never reuses the
+    version of an older snapshot.
+    """
+    version, _ = LedgerVersion.objects.get_or_create(kind=kind, object_id=pk, defaults={'version': time.time_ns()})
+    return version.version
+
+
+def get_versions(kind, pks):
+    """
+    {pk: current ledger version} for several accounts or portfolios, with one
+    query when all the versions exist.
+    """
+    found = dict(LedgerVersion.objects.filter(kind=kind, object_id__in=pks).values_list('object_id', 'version'))
+    return {pk: found[pk] if pk in found else get_version(kind, pk) for pk in pks}
+
+
+def locked_version(kind, pk):
+    """
+    get_version with the LedgerVersion row locked (select_for_update) until the
+    end of the enclosing transaction, so a concurrent bump_version waits for it.
+    """
+    get_version(kind, pk)
+    return LedgerVersion.objects.select_for_update().filter(kind=kind, object_id=pk).values_list('version', flat=True).get()
+
+
+def bump_version(kind, pk):
+    if LedgerVersion.objects.filter(kind=kind, object_id=pk).update(version=F('version') + 1):
+        return
+    _, created = LedgerVersion.objects.get_or_create(kind=kind, object_id=pk, defaults={'version': time.time_ns()})
+    if not created:
+        # Created concurrently (by a reader, possibly before this write committed).
+        LedgerVersion.objects.filter(kind=kind, object_id=pk).update(version=F('version') + 1)
+
+
+def _snapshot(kind, pk, load):
+    """
+    Returns the price-independent Ledger for (kind, pk), cached under its
+    current version. Live prices are layered on by the caller (see
+    PortfolioPerformanceSerializer.summarize), so a cached snapshot never goes stale
+    on price moves, only on ledger writes.
+    """
+    key = f'ledger-snapshot:{kind}:{pk}:{get_version(kind, pk)}'
+    ledger = cache.get(key)
+    if ledger is None:
+        ledger = load()
+        cache.set(key, ledger, getattr(settings, 'PERFORMANCE_SNAPSHOT_TIMEOUT', 60 * 60))
+    return ledger
+
+
+def account_ledger(account):
+    return _snapshot('account', account.pk, lambda: load_ledger(Portfolio.objects.filter(account=account)))
+
+
+def portfolio_ledger(portfolio):
+    return _snapshot('portfolio', portfolio.pk, lambda: load_ledger([portfolio]))
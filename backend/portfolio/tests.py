@@ -1,3 +1,395 @@
-from django.test import TestCase
+import random
+import tracemalloc
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from account.models import Account
+from portfolio.api.serializers import PortfolioPerformanceSerializer
+from portfolio.checkpoints import _checkpoint, ledger_as_of
+from portfolio.engine import numpy_ledger
+from portfolio.live import LiveIndex
+from portfolio.lots import build_ledger
+from portfolio.positions import load_ledger, rebuild_position
+from portfolio.projection import PERCENTILES, simulate_growth
+from portfolio.models import LedgerCheckpoint, Lot, Portfolio, Position, RealizedMonth
+from portfolio.signals import sync_bulk_created
+from portfolio.snapshots import bump_version
+from strategy.models import Strategy
+from transaction.models import Transaction
+
+SYMBOLS = ['AAPL', 'MSFT', 'BTC-USD', 'SPY', 'VTI']
+PRICES = {'AAPL': 187.4321, 'MSFT': 402.17, 'BTC-USD': 64123.55, 'SPY': 512.0, 'VTI': 251.38}
+
+
+class NumpyEngineParityTests(TestCase):
+    """
+    The NumPy engine must reproduce the Decimal replay exactly on randomized ledgers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user('parity@example.com', 'password')
+        cls.strategy = Strategy.objects.create(
+            account=cls.account, name='Parity', target_return=Decimal('5'),
+            investment_horizon=5, diversification_level=5,
+        )
+
+    def make_portfolio(self, seed, size):
+        """
+        Bulk-inserts a random ledger (bypassing the position signals): fractional
+        quantities, oversells, dividends, shared timestamps and month-end dates.
+        """
+        rng = random.Random(seed)
+        portfolio = Portfolio.objects.create(
+            name=f'p{seed}', description='', account=self.account, strategy=self.strategy,
+        )
+        start = datetime(2022, 1, 1, tzinfo=dt_timezone.utc)
+        transactions = []
+        for _ in range(size):
+            symbol = rng.choice(SYMBOLS)
+            kind = rng.choices(['buy', 'sell', 'dividend'], weights=[5, 4, 1])[0]
+            quantity = Decimal(rng.randint(1, 5_000_000_000)).scaleb(-8)
+            price = Decimal(rng.randint(100_000_000, 70_000_000_000_000)).scaleb(-8)
+            when = start + timedelta(days=rng.randint(0, 900), hours=rng.choice([0, 3, 23]), minutes=rng.choice([0, 0, 59]))
+            transactions.append(Transaction(
+                portfolio=portfolio, transaction_type=kind, name=symbol, symbol=symbol,
+                quantity=quantity, price_per_unit=price, total_cost=quantity * price, transaction_date=when,
+            ))
+        Transaction.objects.bulk_create(transactions)
+        return portfolio
+
+    def assert_same_ledger(self, portfolio):
+        transactions = Transaction.objects.filter(portfolio=portfolio)
+        expected = build_ledger(transactions)
+        actual = numpy_ledger(transactions)
+
+        self.assertEqual(dict(actual.holdings), dict(expected.holdings))
+        self.assertEqual(dict(actual.realized), dict(expected.realized))
+        self.assertEqual(dict(actual.monthly_realized), dict(expected.monthly_realized))
+        self.assertEqual(actual.monthly_activity, expected.monthly_activity)
+        self.assertEqual(dict(actual.transaction_counts), dict(expected.transaction_counts))
+        self.assertEqual(
+            {symbol: list(lots) for symbol, lots in actual.open_lots.items() if lots},
+            {symbol: list(lots) for symbol, lots in expected.open_lots.items() if lots},
+        )
+        self.assertEqual([tx.pk for tx in actual.latest], [tx.pk for tx in expected.latest])
+
+        expected_unrealized = expected.mark_to_market(PRICES.get)
+        actual_unrealized = actual.mark_to_market(PRICES.get)
+        self.assertEqual(actual_unrealized.keys(), expected_unrealized.keys())
+        for symbol, value in expected_unrealized.items():
+            self.assertEqual(round(actual_unrealized[symbol], 2), round(value, 2))
+
+    def test_random_ledgers(self):
+        for seed in range(8):
+            with self.subTest(seed=seed):
+                self.assert_same_ledger(self.make_portfolio(seed, size=400))
+
+    def test_large_ledger(self):
+        self.assert_same_ledger(self.make_portfolio(100, size=20_000))
+
+    def test_months_follow_current_time_zone(self):
+        portfolio = self.make_portfolio(7, size=300)
+        with timezone.override('America/New_York'):
+            self.assert_same_ledger(portfolio)
+
+    def test_oversell_then_rebuy(self):
+        portfolio = Portfolio.objects.create(name='o', description='', account=self.account, strategy=self.strategy)
+        when = datetime(2024, 1, 31, 23, 0, tzinfo=dt_timezone.utc)
+        for i, (kind, quantity, price) in enumerate([
+            ('sell', '3', '10'), ('buy', '2', '10'), ('sell', '5', '12'),
+            ('buy', '4', '11'), ('buy', '1.5', '9.25'), ('sell', '4.75', '13.5'),
+        ]):
+            Transaction.objects.bulk_create([Transaction(
+                portfolio=portfolio, transaction_type=kind, name='X', symbol='X', quantity=Decimal(quantity),
+                price_per_unit=Decimal(price), total_cost=Decimal(quantity) * Decimal(price),
+                transaction_date=when + timedelta(hours=i // 2),
+            )])
+        self.assert_same_ledger(portfolio)
+
+    def test_empty_ledger(self):
+        portfolio = Portfolio.objects.create(name='e', description='', account=self.account, strategy=self.strategy)
+        self.assert_same_ledger(portfolio)
+
+    def test_serializer_output_matches(self):
+        portfolio = self.make_portfolio(42, size=600)
+        transactions = Transaction.objects.filter(portfolio=portfolio)
+        securities = {symbol: mock.Mock(investment_type='EQUITY') for symbol in SYMBOLS}
+        with mock.patch('portfolio.api.serializers.get_stock_price', PRICES.get), \
+                mock.patch('portfolio.api.serializers.get_securities', lambda symbols: securities):
+            with override_settings(PERFORMANCE_ENGINE='python'):
+                expected = PortfolioPerformanceSerializer(transactions).data
+            with override_settings(PERFORMANCE_ENGINE='numpy'):
+                actual = PortfolioPerformanceSerializer(transactions).data
+        unrealized = actual['total_gain_loss'].pop('unrealized')
+        self.assertEqual(round(unrealized, 2), round(expected['total_gain_loss'].pop('unrealized'), 2))
+        self.assertEqual(actual, expected)
+
+
+class MaterializedLedgerParityTests(TestCase):
+    """
+    load_ledger (materialized tables and database aggregates) must agree with
+    a replay of the transactions.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user('materialized@example.com', 'password')
+        cls.strategy = Strategy.objects.create(
+            account=cls.account, name='Materialized', target_return=Decimal('5'),
+            investment_horizon=5, diversification_level=5,
+        )
+
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(name='m', description='', account=self.account, strategy=self.strategy)
+
+    def make_transaction(self, kind, symbol, quantity, price, day, save=True):
+        tx = Transaction(
+            portfolio=self.portfolio, transaction_type=kind, name=symbol, symbol=symbol, quantity=Decimal(quantity),
+            price_per_unit=Decimal(price), total_cost=Decimal(quantity) * Decimal(price),
+            transaction_date=datetime(2024, 1, 1, tzinfo=dt_timezone.utc) + timedelta(days=day),
+        )
+        if save:
+            tx.save()
+        return tx
+
+    def assert_matches_replay(self, portfolio):
+        expected = build_ledger(Transaction.objects.filter(portfolio=portfolio))
+        actual = load_ledger([portfolio])
+
+        self.assertEqual(dict(actual.holdings), dict(expected.holdings))
+        self.assertEqual(
+            {symbol: value for symbol, value in actual.realized.items() if value},
+            {symbol: value for symbol, value in expected.realized.items() if value},
+        )
+        self.assertEqual(dict(actual.monthly_realized), dict(expected.monthly_realized))
+        self.assertEqual(
+            {symbol: [lot[:3] for lot in lots] for symbol, lots in actual.open_lots.items() if lots},
+            {symbol: [lot[:3] for lot in lots] for symbol, lots in expected.open_lots.items() if lots},
+        )
+        self.assertEqual(actual.monthly_activity, expected.monthly_activity)
+        self.assertEqual(dict(actual.transaction_counts), dict(expected.transaction_counts))
+
+    def test_incremental_append(self):
+        with mock.patch('portfolio.positions.rebuild_position', wraps=rebuild_position) as rebuild:
+            for kind, symbol, quantity, price, day in [
+                ('buy', 'AAPL', '10', '100', 0),
+                ('buy', 'AAPL', '5.5', '110.25', 10),
+                ('buy', 'MSFT', '3', '400', 12),
+                ('sell', 'AAPL', '12', '120', 40),
+                ('sell', 'MSFT', '1', '390', 70),
+            ]:
+                self.make_transaction(kind, symbol, quantity, price, day)
+        rebuild.assert_not_called()
+        self.assert_matches_replay(self.portfolio)
+
+    def test_backdated_insert_and_edit_rebuild(self):
+        self.make_transaction('buy', 'AAPL', '10', '100', 0)
+        self.make_transaction('sell', 'AAPL', '4', '130', 50)
+        self.make_transaction('buy', 'AAPL', '6', '90', 60)
+        with mock.patch('portfolio.positions.rebuild_position', wraps=rebuild_position) as rebuild:
+            backdated = self.make_transaction('buy', 'AAPL', '2', '80', -5)
+        rebuild.assert_called_once_with(self.portfolio.pk, 'AAPL')
+        self.assert_matches_replay(self.portfolio)
+
+        backdated.transaction_date += timedelta(days=100)
+        backdated.quantity = Decimal('3')
+        backdated.save()
+        self.assert_matches_replay(self.portfolio)
+
+        backdated.symbol = 'MSFT'
+        backdated.save()
+        self.assert_matches_replay(self.portfolio)
+
+    def test_bulk_created(self):
+        self.make_transaction('buy', 'AAPL', '10', '100', 10)
+        self.make_transaction('buy', 'MSFT', '4', '400', 10)
+        created = Transaction.objects.bulk_create([
+            # Appended after the stored AAPL history.
+            self.make_transaction('sell', 'AAPL', '3', '120', 20, save=False),
+            self.make_transaction('buy', 'AAPL', '1', '125', 21, save=False),
+            # Backdated before the stored MSFT buy.
+            self.make_transaction('buy', 'MSFT', '2', '380', 5, save=False),
+            self.make_transaction('sell', 'MSFT', '5', '410', 30, save=False),
+            # A new position.
+            self.make_transaction('buy', 'SPY', '7', '500', 15, save=False),
+        ])
+        sync_bulk_created(created)
+        self.assert_matches_replay(self.portfolio)
+
+    def test_cascaded_portfolio_delete_leaves_no_rows(self):
+        self.make_transaction('buy', 'AAPL', '10', '100', 0)
+        self.make_transaction('sell', 'AAPL', '4', '130', 40)
+        self.make_transaction('buy', 'MSFT', '3', '400', 45)
+        position_ids = list(Position.objects.filter(portfolio=self.portfolio).values_list('pk', flat=True))
+        self.assertTrue(Lot.objects.filter(position_id__in=position_ids).exists())
+        self.assertTrue(RealizedMonth.objects.filter(position_id__in=position_ids).exists())
+
+        portfolio_id = self.portfolio.pk
+        self.portfolio.delete()
+        self.assertFalse(Transaction.objects.filter(portfolio_id=portfolio_id).exists())
+        self.assertFalse(Position.objects.filter(pk__in=position_ids).exists())
+        self.assertFalse(Lot.objects.filter(position_id__in=position_ids).exists())
+        self.assertFalse(RealizedMonth.objects.filter(position_id__in=position_ids).exists())
+
+    def test_dividend_only_month(self):
+        for kind, quantity, price, day in [
+            ('buy', '10', '100', 14),
+            ('dividend', '10', '0.5', 45),
+            ('sell', '4', '120', 74),
+        ]:
+            self.make_transaction(kind, 'X', quantity, price, day)
+        expected = build_ledger(Transaction.objects.filter(portfolio=self.portfolio))
+        actual = load_ledger([self.portfolio])
+
+        self.assertEqual(list(actual.monthly_activity), ['2024-01', '2024-03'])
+        self.assertEqual(actual.monthly_activity, expected.monthly_activity)
+        self.assertEqual(dict(actual.transaction_counts), dict(expected.transaction_counts))
+
+
+@override_settings(LEDGER_CHECKPOINT_INTERVAL=4)
+class LedgerCheckpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user('checkpoints@example.com', 'password')
+        cls.strategy = Strategy.objects.create(
+            account=cls.account, name='Checkpoints', target_return=Decimal('5'),
+            investment_horizon=5, diversification_level=5,
+        )
+
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(name='c', description='', account=self.account, strategy=self.strategy)
+        rng = random.Random(5)
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in range(0, 150, 5):
+                self.make_transaction(rng.choice(['buy', 'buy', 'sell']), rng.choice(SYMBOLS[:3]), rng.randint(1, 10), rng.randint(50, 150), day)
+
+    def make_transaction(self, kind, symbol, quantity, price, day):
+        return Transaction.objects.create(
+            portfolio=self.portfolio, transaction_type=kind, name=symbol, symbol=symbol, quantity=Decimal(quantity),
+            price_per_unit=Decimal(price), total_cost=Decimal(quantity) * Decimal(price),
+            transaction_date=datetime(2024, 1, 1, tzinfo=dt_timezone.utc) + timedelta(days=day),
+        )
+
+    def assert_matches_replay(self, before):
+        expected = build_ledger(Transaction.objects.filter(portfolio=self.portfolio, transaction_date__lt=before))
+        actual = ledger_as_of(self.portfolio.pk, before)
+        self.assertEqual(actual.to_state(), expected.to_state())
+        self.assertEqual([tx.pk for tx in actual.latest], [tx.pk for tx in expected.latest])
+
+    def test_backdated_transaction_invalidates_later_checkpoints(self):
+        end = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        self.assert_matches_replay(end)
+        self.assertGreater(LedgerCheckpoint.objects.filter(portfolio=self.portfolio).count(), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            backdated = self.make_transaction('sell', 'AAPL', 3, 200, 42)
+        checkpoints = LedgerCheckpoint.objects.filter(portfolio=self.portfolio)
+        self.assertTrue(checkpoints.exists())
+        self.assertFalse(checkpoints.filter(as_of__gte=backdated.transaction_date).exists())
+
+        self.assert_matches_replay(end)
+        self.assert_matches_replay(datetime(2024, 3, 10, tzinfo=dt_timezone.utc))
+        self.assertTrue(checkpoints.filter(as_of__gte=backdated.transaction_date).exists())
+
+    def test_write_during_replay_discards_new_checkpoints(self):
+        def checkpoint_then_write(*args):
+            if not bumped:
+                bumped.append(bump_version('portfolio', self.portfolio.pk))
+            return real_checkpoint(*args)
+
+        bumped = []
+        real_checkpoint = _checkpoint
+        with mock.patch('portfolio.checkpoints._checkpoint', side_effect=checkpoint_then_write):
+            self.assert_matches_replay(datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertTrue(bumped)
+        self.assertFalse(LedgerCheckpoint.objects.filter(portfolio=self.portfolio).exists())
+
+
+class LiveIndexTests(TestCase):
+    def setUp(self):
+        rng = random.Random(11)
+        self.positions = {
+            portfolio_id: {
+                symbol: (rng.randint(1, 10_000) / 100, rng.randint(100, 1_000_000) / 100)
+                for symbol in rng.sample(SYMBOLS, rng.randint(1, 3))
+            }
+            for portfolio_id in range(1, 41)
+        }
+        self.index = LiveIndex()
+        for portfolio_id, positions in self.positions.items():
+            self.index.load(portfolio_id, 1, positions)
+        self.index.apply_quotes(PRICES)
+
+    def full_revaluation(self, prices):
+        fresh = LiveIndex()
+        for portfolio_id, positions in self.positions.items():
+            fresh.load(portfolio_id, 1, positions)
+        fresh.apply_quotes(prices)
+        return {portfolio_id: fresh.valuation(portfolio_id) for portfolio_id in self.positions}
+
+    def test_tick_moves_only_the_holders(self):
+        before = {portfolio_id: self.index.valuation(portfolio_id) for portfolio_id in self.positions}
+        self.index.apply_quotes({'msft': 415.5, 'UNHELD': 1.0})
+        holders = {portfolio_id for portfolio_id, positions in self.positions.items() if 'MSFT' in positions}
+        self.assertTrue(holders and holders != set(self.positions))
+
+        for portfolio_id, previous in before.items():
+            current = self.index.valuation(portfolio_id)
+            if portfolio_id in holders:
+                quantity = self.positions[portfolio_id]['MSFT'][0]
+                self.assertAlmostEqual(current['market_value'] - previous['market_value'], quantity * (415.5 - PRICES['MSFT']), places=6)
+                self.assertGreater(current['updated_at'], previous['updated_at'])
+            else:
+                self.assertEqual(current, previous)
+
+    def test_ticks_match_a_full_revaluation(self):
+        rng = random.Random(12)
+        prices = dict(PRICES)
+        for _ in range(500):
+            symbol = rng.choice(SYMBOLS)
+            prices[symbol] = round(prices[symbol] * rng.uniform(0.95, 1.05), 4)
+            self.index.apply_quotes({symbol: prices[symbol]})
+        expected = self.full_revaluation(prices)
+        for portfolio_id, valuation in expected.items():
+            actual = self.index.valuation(portfolio_id)
+            self.assertAlmostEqual(actual['market_value'], valuation['market_value'], places=6)
+            self.assertEqual(actual['cost_basis'], valuation['cost_basis'])
+            self.assertAlmostEqual(
+                actual['market_value'],
+                sum(quantity * prices[symbol] for symbol, (quantity, _) in self.positions[portfolio_id].items()),
+                places=6,
+            )
+
+
+class ProjectionTests(TestCase):
+    def test_long_horizon_memory_is_bounded_by_paths(self):
+        """
+        100 years of 5,000 paths: a (paths x months) matrix alone would take
+        24 MB in float32; only the per-path values and one chunk are held.
+        """
+        returns = np.random.default_rng(1).normal(0.0003, 0.01, 1000)
+        tracemalloc.start()
+        try:
+            bands, final = simulate_growth(returns, months=1200, paths=5000, seed=7, chunk_values=100_000)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 5 * 1024 * 1024)
+        self.assertEqual(bands.shape, (len(PERCENTILES), 1200))
+        self.assertEqual(final.shape, (5000,))
+        self.assertTrue(np.all(np.diff(bands, axis=0) >= 0))
+        self.assertAlmostEqual(bands[2, -1], float(np.median(final)))
+
+    def test_same_seed_same_paths(self):
+        returns = np.random.default_rng(2).normal(0.0003, 0.01, 500)
+        first = simulate_growth(returns, months=24, paths=300, seed=3, chunk_values=1000)
+        second = simulate_growth(returns, months=24, paths=300, seed=3, chunk_values=1000)
+        np.testing.assert_array_equal(first[0], second[0])
+        np.testing.assert_array_equal(first[1], second[1])
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.utils.timezone import localtime, make_aware
+
+from finance.barstore import market_today, read_bars
+from finance.columnar import day_number
+from portfolio.checkpoints import ledger_as_of
+from portfolio.models import PortfolioValuation
+from portfolio.snapshots import get_version
+from transaction.models import Transaction
+
+# Bars fetched before the first day, so a series starting on a holiday still finds a close.
+CLOSE_LOOKBACK_DAYS = 7
+
+
+def _start_of(day):
+    return make_aware(datetime.combine(day, time.min))
+
+
+class _Closes:
+    """
+    Last close on or before a day for each symbol, read once per series
+    extension from the bar store.
+    """
+
+    def __init__(self, first, last):
+        self.first = first - timedelta(days=CLOSE_LOOKBACK_DAYS)
+        self.last = last
+        self.bars = {}
+
+    def on(self, symbol, day):
+        if symbol not in self.bars:
+            self.bars[symbol] = read_bars(symbol, self.first, self.last + timedelta(days=1))
+        bars = self.bars[symbol]
+        i = np.searchsorted(bars.date, day_number(day), side='right') - 1
+        return Decimal(str(bars.close[i])) if i >= 0 else None
+
+
+def extend_valuations(portfolio_id):
+    """
+    Brings the stored daily series of a portfolio up to date and returns the
+    unsaved valuation of today (None before the first transaction).
+
+    The series covers every business day from the first transaction's date.
+    Only the days after the last stored row are computed: the ledger is
+    restored at the first missing day from the nearest checkpoint, then each
+    day's transactions are applied and the open lots valued at that day's
+    close (at cost when no close is known). Settled days (before today) are
+    saved; today's close is not final, so today's row is returned but not stored.
+    """
+    version = get_version('portfolio', portfolio_id)
+    today = market_today()
+    last_row = PortfolioValuation.objects.filter(portfolio_id=portfolio_id).order_by('-date').first()
+    if last_row is not None:
+        first = last_row.date + timedelta(days=1)
+    else:
+        first_tx = Transaction.objects.filter(portfolio_id=portfolio_id).order_by('transaction_date').first()
+        if first_tx is None:
+            return None
+        first = localtime(first_tx.transaction_date).date()
+    if first > today:
+        return None
+
+    ledger = ledger_as_of(portfolio_id, _start_of(first))
+    invested = Decimal(0)
+    if last_row is not None:
+        invested = last_row.invested
+    pending = list(Transaction.objects.filter(portfolio_id=portfolio_id, transaction_date__gte=_start_of(first)).order_by('transaction_date', 'pk'))
+    next_tx = 0
+
+    closes = _Closes(first, today)
+    quantity = {}
+    basis = {}
+    touched = set(ledger.open_lots)
+    rows = []
+    for day in (d.date() for d in pd.bdate_range(first, today)):
+        # Transactions dated on a weekend or holiday count towards the next business day.
+        while next_tx < len(pending) and localtime(pending[next_tx].transaction_date).date() <= day:
+            tx = pending[next_tx]
+            next_tx += 1
+            ledger.apply(tx)
+            touched.add(tx.symbol)
+            if tx.transaction_type == 'buy':
+                invested += tx.total_cost
+        for symbol in touched:
+            lots = ledger.open_lots[symbol]
+            quantity[symbol] = sum((lot[0] for lot in lots), Decimal(0))
+            basis[symbol] = sum((lot[0] * lot[1] for lot in lots), Decimal(0))
+        touched.clear()
+
+        market_value = Decimal(0)
+        for symbol, held in quantity.items():
+            if not held:
+                continue
+            close = closes.on(symbol, day)
+            market_value += basis[symbol] if close is None else held * close
+        rows.append(PortfolioValuation(
+            portfolio_id=portfolio_id, date=day, market_value=market_value,
+            cost_basis=sum(basis.values(), Decimal(0)), realized=sum(ledger.realized.values(), Decimal(0)),
+            invested=invested,
+        ))
+
+    settled = [row for row in rows if row.date < today]
+    if settled and get_version('portfolio', portfolio_id) == version:
+        PortfolioValuation.objects.bulk_create(settled, ignore_conflicts=True)
+    return rows[-1] if rows and rows[-1].date == today else None
+
+
+def invalidate_valuations(portfolio_id, since):
+    """
+    Drops the stored valuations from the local date of `since` on.
+    """
+    PortfolioValuation.objects.filter(portfolio_id=portfolio_id, date__gte=localtime(since).date()).delete()
+
+
+def _point(day, market_value, cost_basis, realized, invested):
+    total_return = realized + market_value - cost_basis
+    return {
+        "date": day,
+        "market_value": market_value,
+        "cost_basis": cost_basis,
+        "realized": realized,
+        "unrealized": market_value - cost_basis,
+        "total_return": total_return,
+        "total_return_pct": total_return / invested * 100 if invested else None,
+    }
+
+
+def portfolio_valuations(portfolio_id, start=None, end=None):
+    """
+    (date, market_value, cost_basis, realized, invested) rows of a portfolio,
+    ordered by date, extending the stored series first. Includes today's
+    unsaved row when it falls in the range.
+    """
+    today_row = extend_valuations(portfolio_id)
+    rows = PortfolioValuation.objects.filter(portfolio_id=portfolio_id).order_by('date')
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+    values = list(rows.values_list('date', 'market_value', 'cost_basis', 'realized', 'invested'))
+    if today_row is not None and (not start or today_row.date >= start) and (not end or today_row.date <= end):
+        values.append((today_row.date, today_row.market_value, today_row.cost_basis, today_row.realized, today_row.invested))
+    return values
+
+
+def valuation_series(portfolio_ids, start=None, end=None):
+    """
+    Daily valuation of one or more portfolios (summed per day). Returns a list
+    of points ordered by date.
+    """
+    totals = defaultdict(lambda: [Decimal(0)] * 4)
+    for portfolio_id in portfolio_ids:
+        for day, *amounts in portfolio_valuations(portfolio_id, start, end):
+            totals[day] = [total + amount for total, amount in zip(totals[day], amounts)]
+    return [_point(day, *totals[day]) for day in sorted(totals)]
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from strategy.models import Strategy
+from strategy.backtest import GRID_PARAMETERS, backtest_settings
 
 class StrategySerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,4 +17,34 @@ class StrategyCreateSerializer(serializers.ModelSerializer):
 class StrategyUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Strategy
-        fields = ['name', 'risk_tolerance', 'investment_type', 'target_return', 'investment_horizon', 'diversification_level', 'automated_trading']
\ No newline at end of file
+        fields = ['name', 'risk_tolerance', 'investment_type', 'target_return', 'investment_horizon', 'diversification_level', 'automated_trading']
+
+class BacktestSerializer(serializers.Serializer):
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    symbols = serializers.ListField(child=serializers.CharField(max_length=50), required=False, min_length=1, max_length=500)
+    rebalance_days = serializers.IntegerField(required=False, min_value=1, max_value=252)
+    grid = serializers.DictField(child=serializers.ListField(min_length=1), required=False)
+
+    def validate_grid(self, grid):
+        unknown = set(grid) - set(GRID_PARAMETERS)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown parameters: {', '.join(sorted(unknown))}. Allowed: {', '.join(GRID_PARAMETERS)}.")
+        for value in grid.get('risk_tolerance', []):
+            if value not in dict(Strategy.RISK_LEVELS):
+                raise serializers.ValidationError(f"Invalid risk_tolerance {value!r}.")
+        for name, low, high in (('diversification_level', 1, 10), ('rebalance_days', 1, 252)):
+            for value in grid.get(name, []):
+                if type(value) is not int or not low <= value <= high:
+                    raise serializers.ValidationError(f"{name} values must be integers from {low} to {high}.")
+        combinations = 1
+        for values in grid.values():
+            combinations *= len(values)
+        if combinations > backtest_settings()['MAX_GRID']:
+            raise serializers.ValidationError(f"The grid has {combinations} combinations; at most {backtest_settings()['MAX_GRID']} are allowed.")
+        return grid
+
+    def validate(self, data):
+        if data.get('start_date') and data.get('end_date') and data['start_date'] >= data['end_date']:
+            raise serializers.ValidationError("start_date must be before end_date.")
+        return data
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import strategy_create, strategy_list, strategy_get, strategy_update, strategy_delete
+from .views import strategy_create, strategy_list, strategy_get, strategy_update, strategy_delete, strategy_backtest
 
 urlpatterns = [
     path('create/', strategy_create, name='strategy-create'),
@@ -7,4 +7,5 @@ urlpatterns = [
     path('<int:pk>/get/', strategy_get, name='strategy-get'),
     path('<int:pk>/update/', strategy_update, name='strategy-update'),
     path('<int:pk>/delete/', strategy_delete, name='strategy-delete'),
+    path('<int:pk>/backtest/', strategy_backtest, name='strategy-backtest'),
 ]
\ No newline at end of file
@@ -5,8 +5,11 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.authentication import TokenAuthentication
 from django.shortcuts import get_object_or_404
 from account.models import Account
-from .serializers import StrategyCreateSerializer, StrategyUpdateSerializer, StrategySerializer
+from datetime import timedelta
+from .serializers import StrategyCreateSerializer, StrategyUpdateSerializer, StrategySerializer, BacktestSerializer
 from strategy.models import Strategy
+from strategy.backtest import load_market_data, parameter_grid, run_backtests, strategy_rules, strategy_universe
+from finance.barstore import market_today
 
 @api_view(['POST'])
 @authentication_classes([TokenAuthentication])
@@ -56,4 +59,50 @@ def strategy_delete(request, pk):
     account = get_object_or_404(Account, pk=request.user.pk)
     strategy = get_object_or_404(Strategy, pk=pk, account=account)
     strategy.delete()
-    return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def strategy_backtest(request, pk):
+    """
+    Replays the strategy's allocation rules over historical daily bars (by default the last year
+    and the strategy's investment type universe). An optional grid of parameter values runs one
+    backtest per combination, in parallel.
+    URL: /strategy/<id>/backtest/
+    """
+    account = get_object_or_404(Account, pk=request.user.pk)
+    strategy = get_object_or_404(Strategy, pk=pk, account=account)
+    query = BacktestSerializer(data=request.data)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    options = query.validated_data
+    end_date = options.get('end_date') or market_today() - timedelta(days=1)
+    start_date = options.get('start_date') or end_date - timedelta(days=365)
+    symbols = options.get('symbols') or strategy_universe(strategy)
+    if not symbols:
+        return Response({"detail": "No symbols to backtest."}, status=status.HTTP_400_BAD_REQUEST)
+
+    overrides = {'rebalance_days': options['rebalance_days']} if 'rebalance_days' in options else {}
+    rule_sets = parameter_grid(strategy_rules(strategy, **overrides), options.get('grid', {}))
+    data = load_market_data(symbols, start_date, end_date)
+    dates = data.days[data.start:].astype('datetime64[D]').tolist()
+
+    results = []
+    for rules, result in zip(rule_sets, run_backtests(data, rule_sets)):
+        if result is None:
+            return Response({"detail": "Not enough price history for the requested period."}, status=status.HTTP_400_BAD_REQUEST)
+        results.append({
+            "parameters": rules,
+            "summary": result['summary'],
+            "holdings": result['holdings'],
+            "equity_curve": [{"date": day, "value": float(value)} for day, value in zip(dates, result['curve'])],
+        })
+    return Response({
+        "strategy": strategy.pk,
+        "start_date": start_date,
+        "end_date": end_date,
+        "symbols": data.symbols,
+        "results": results,
+    }, status=status.HTTP_200_OK)
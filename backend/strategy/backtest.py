@@ -0,0 +1,286 @@
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+
+from finance.barstore import aligned_closes, read_bars_many
+from finance.columnar import day_number
+
+BACKTEST_DEFAULTS = {
+    'BENCHMARK': '^GSPC',
+    'MOMENTUM_DAYS': 126,
+    'VOLATILITY_DAYS': 63,
+    'REBALANCE_DAYS': 21,
+    'COST_BPS': 5,
+    'PROCESSES': None,
+    'PARALLEL_MIN': 8,
+    'MAX_GRID': 64,
+    'UNIVERSES': {},
+}
+TRADING_DAYS_PER_YEAR = 252
+
+# Score = momentum - penalty * volatility over the momentum horizon.
+RISK_PENALTY = {'low': 2.0, 'medium': 1.0, 'high': 0.0}
+GRID_PARAMETERS = ('risk_tolerance', 'diversification_level', 'rebalance_days')
+
+
+def backtest_settings():
+    return {**BACKTEST_DEFAULTS, **getattr(settings, 'STRATEGY_BACKTEST', {})}
+
+
+def strategy_universe(strategy):
+    """
+    Candidate symbols for a strategy's investment type (see STRATEGY_BACKTEST['UNIVERSES']).
+    """
+    universes = backtest_settings()['UNIVERSES']
+    return list(universes.get(strategy.investment_type) or universes.get('mixed', []))
+
+
+def strategy_rules(strategy, **overrides):
+    """
+    The allocation rules derived from a Strategy.
+
+    At every rebalance the symbols are ranked by trailing momentum minus a
+    volatility penalty that grows as risk tolerance falls, and the top
+    diversification_level tenths of the universe are held: equally weighted,
+    or weighted by inverse volatility for a low risk tolerance.
+    """
+    options = backtest_settings()
+    rules = {
+        'risk_tolerance': strategy.risk_tolerance,
+        'diversification_level': strategy.diversification_level,
+        'rebalance_days': options['REBALANCE_DAYS'],
+        'momentum_days': options['MOMENTUM_DAYS'],
+        'volatility_days': options['VOLATILITY_DAYS'],
+        'cost_bps': options['COST_BPS'],
+    }
+    rules.update(overrides)
+    return rules
+
+
+def parameter_grid(rules, grid):
+    """
+    One rule set per combination of the values in `grid` ({parameter: [values]}).
+    """
+    names = list(grid)
+    return [{**rules, **dict(zip(names, values))} for values in itertools.product(*(grid[name] for name in names))]
+
+
+class MarketData:
+    """
+    Aligned daily closes of a universe and the benchmark on the benchmark's
+    trading days. Rows before `start` are the warm-up the rules' trailing
+    windows need.
+    """
+
+    def __init__(self, symbols, days, closes, benchmark, start):
+        self.symbols = symbols
+        self.days = days
+        self.closes = closes
+        self.benchmark = benchmark
+        self.start = start
+
+
+def load_market_data(symbols, first, last, warmup_days=None):
+    """
+    Reads [first, last] plus the warm-up from the bar store (one upstream
+    request for all the missing bars) into a MarketData.
+    """
+    options = backtest_settings()
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    if warmup_days is None:
+        warmup_days = max(options['MOMENTUM_DAYS'], options['VOLATILITY_DAYS'])
+    # Trading days to calendar days, with room for holidays.
+    warmup_start = first - timedelta(days=math.ceil(warmup_days * 7 / 5) + 10)
+    bars = read_bars_many(symbols + [options['BENCHMARK']], warmup_start, last + timedelta(days=1))
+    days = bars[options['BENCHMARK']].date.astype(np.int64)
+    closes = aligned_closes(bars, symbols + [options['BENCHMARK']], days)
+    start = int(np.searchsorted(days, day_number(first), side='left'))
+    return MarketData(symbols, days, closes[:, :-1], closes[:, -1], start)
+
+
+def _rolling_volatility(returns, listed, window):
+    """
+    Standard deviation of daily returns over the trailing `window` rows, from
+    cumulative sums; NaN until a symbol has `window` returns.
+    """
+    zero = np.zeros((1, returns.shape[1]))
+    sums = np.vstack([zero, np.cumsum(returns, axis=0)])
+    squares = np.vstack([zero, np.cumsum(returns ** 2, axis=0)])
+    counts = np.vstack([zero, np.cumsum(listed, axis=0)])
+    volatility = np.full(returns.shape, np.nan)
+    if len(returns) < window:
+        return volatility
+    total = sums[window:] - sums[:-window]
+    variance = (squares[window:] - squares[:-window] - total ** 2 / window) / (window - 1)
+    enough = counts[window:] - counts[:-window] >= window
+    volatility[window - 1:] = np.where(enough, np.sqrt(np.maximum(variance, 0)), np.nan)
+    return volatility
+
+
+def _max_drawdown(curve):
+    return float(-(curve / np.maximum.accumulate(curve) - 1).min())
+
+
+def _daily_returns(closes):
+    previous = np.vstack([np.full((1, closes.shape[1]), np.nan), closes[:-1]])
+    with np.errstate(invalid='ignore'):
+        traded = ~np.isnan(closes) & (previous > 0)
+    return np.where(traded, closes / np.where(traded, previous, 1) - 1, 0.0), traded
+
+
+def target_weights(closes, rules, rows):
+    """
+    Target weights of the universe (the columns of `closes`) at the given rows,
+    as a (rows x symbols) array; the rows of the weights not allocated (nothing
+    ranks yet) sum to less than one and the rest is held as cash.
+
+    Symbols are scored by momentum over momentum_days minus a risk-tolerance
+    penalty on volatility over volatility_days; the top diversification_level
+    tenths of the universe are held, equally weighted or, for a low risk
+    tolerance, in proportion to inverse volatility.
+    """
+    count, width = closes.shape
+    returns, traded = _daily_returns(closes)
+    momentum_days = rules['momentum_days']
+    lagged = np.full_like(closes, np.nan)
+    if momentum_days < count:
+        lagged[momentum_days:] = closes[:-momentum_days]
+    momentum = closes / lagged - 1
+    volatility = _rolling_volatility(returns, traded, rules['volatility_days'])[rows]
+    penalty = RISK_PENALTY.get(rules['risk_tolerance'], 1.0)
+    score = momentum[rows] - penalty * volatility * np.sqrt(momentum_days)
+
+    scores = np.where(np.isfinite(score), score, -np.inf)
+    holdings = max(1, math.ceil(width * rules['diversification_level'] / 10))
+    ranked = np.argsort(-scores, axis=1, kind='stable')[:, :holdings]
+    chosen = np.zeros_like(scores, dtype=bool)
+    np.put_along_axis(chosen, ranked, True, axis=1)
+    chosen &= np.isfinite(scores)
+    if rules['risk_tolerance'] == 'low':
+        with np.errstate(invalid='ignore'):
+            positive = volatility > 0
+        raw = np.where(chosen & positive, 1 / np.where(positive, volatility, 1), 0.0)
+    else:
+        raw = chosen.astype(np.float64)
+    totals = raw.sum(axis=1, keepdims=True)
+    return np.divide(raw, totals, out=np.zeros_like(raw), where=totals > 0)
+
+
+def simulate(data, rules):
+    """
+    Replays `rules` (see target_weights) over `data` from data.start and
+    returns the equity curve (1.0 at the start) and summary statistics.
+
+    Everything is vectorized over dates and symbols: target weights are
+    computed for all rebalance days at once, and holdings drift with their own
+    returns between rebalances (each day's value is the last rebalance's
+    weights times the growth since then). Weights set at a close apply from
+    the next day, so no rule sees a future price. Trading costs of cost_bps
+    are charged on the turnover of each rebalance.
+    """
+    closes = data.closes
+    count, width = closes.shape
+    start = data.start
+    if start >= count - 1 or not width:
+        return None
+
+    returns, _ = _daily_returns(closes)
+    rebalances = np.arange(start, count - 1, max(1, int(rules['rebalance_days'])))
+    weights = target_weights(closes, rules, rebalances)
+
+    # Growth of each symbol since the start; ratios give the growth since a rebalance.
+    growth = np.cumprod(1 + returns[start:], axis=0)
+    local = rebalances - start
+    days = np.arange(1, count - start)
+    segment = np.searchsorted(local, days, side='left') - 1
+    since = growth[days] / growth[local[segment]]
+    # Whatever is not allocated (nothing ranks during a warm-up) is held as cash.
+    cash = 1 - weights.sum(axis=1)
+    within = cash[segment] + (weights[segment] * since).sum(axis=1)
+
+    # Turnover: the new targets against the previous weights after drifting.
+    drifted = np.zeros_like(weights)
+    if len(local) > 1:
+        moved = weights[:-1] * growth[local[1:]] / growth[local[:-1]]
+        drifted[1:] = moved / (cash[:-1, None] + moved.sum(axis=1, keepdims=True))
+    turnover = np.abs(weights - drifted).sum(axis=1)
+    costs = 1 - rules['cost_bps'] / 10_000 * turnover
+
+    ends = np.r_[local[1:], count - start - 1]
+    segment_growth = within[ends - 1]
+    opening = np.cumprod(np.r_[1.0, segment_growth[:-1] * costs[:-1]]) * costs
+    curve = np.r_[1.0, opening[segment] * within]
+
+    benchmark = data.benchmark[start:] / data.benchmark[start]
+    daily = curve[1:] / curve[:-1] - 1
+    years = len(daily) / TRADING_DAYS_PER_YEAR
+    deviation = daily.std(ddof=1) if len(daily) > 1 else 0.0
+    return {
+        'curve': curve,
+        'summary': {
+            'total_return': float(curve[-1] - 1) * 100,
+            'annualized_return': float(curve[-1] ** (1 / years) - 1) * 100 if curve[-1] > 0 else None,
+            'volatility': float(deviation * np.sqrt(TRADING_DAYS_PER_YEAR)) * 100,
+            'sharpe_ratio': float(daily.mean() / deviation * np.sqrt(TRADING_DAYS_PER_YEAR)) if deviation > 0 else None,
+            'max_drawdown': _max_drawdown(curve) * 100,
+            'average_turnover': float(turnover.mean()) * 100,
+            'rebalances': len(rebalances),
+            'benchmark_return': float(benchmark[-1] - 1) * 100 if np.isfinite(benchmark[-1]) else None,
+        },
+        'holdings': [data.symbols[i] for i in np.flatnonzero(weights[-1] > 0)],
+    }
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _process_pool(processes=None):
+    """
+    The shared backtest pool, created on first use and bounded by
+    STRATEGY_BACKTEST['PROCESSES'] whatever the number of concurrent requests.
+    Workers are spawned, not forked, so they inherit neither the web worker's
+    database connections nor its memory.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = processes or backtest_settings()['PROCESSES'] or os.cpu_count() or 1
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool, _pool_workers
+
+
+def _simulate_many(data, rule_sets):
+    return [simulate(data, rules) for rules in rule_sets]
+
+
+def run_backtests(data, rule_sets, processes=None):
+    """
+    simulate() for each rule set, in order. Grids of at least PARALLEL_MIN
+    rule sets are split into one chunk per worker of the shared process pool,
+    so the market data is sent once per chunk, not once per rule set; smaller
+    ones run in-process.
+    """
+    if len(rule_sets) < max(2, backtest_settings()['PARALLEL_MIN']) or processes == 1:
+        return _simulate_many(data, rule_sets)
+    global _pool
+    pool, workers = _process_pool(processes)
+    size = math.ceil(len(rule_sets) / workers)
+    chunks = [rule_sets[first:first + size] for first in range(0, len(rule_sets), size)]
+    try:
+        return [result for results in pool.map(_simulate_many, [data] * len(chunks), chunks) for result in results]
+    except BrokenProcessPool:
+        # A worker died; replace the pool on the next call.
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from finance.barstore import market_today
+from strategy.backtest import RISK_PENALTY, load_market_data, parameter_grid, run_backtests, simulate, strategy_rules
+from strategy.models import Strategy
+
+
+class Command(BaseCommand):
+    help = ("Time the backtesting engine: one strategy with daily rebalancing over a large universe, "
+            "then a parameter grid serially and on the process pool.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbol', action='append',
+                            help="Universe symbols. Defaults to generated tickers, which only have bars with the SyntheticProvider.")
+        parser.add_argument('--symbols', type=int, default=500, help="Number of generated tickers when --symbol is not given.")
+        parser.add_argument('--days', type=int, default=365, help="Backtest period in calendar days, ending yesterday.")
+        parser.add_argument('--rebalance-days', type=int, default=1)
+        parser.add_argument('--processes', type=int, default=None, help="Worker processes for the grid (default: one per CPU).")
+
+    def handle(self, *args, **options):
+        symbols = options['symbol'] or [f'BT{i:04d}' for i in range(options['symbols'])]
+        last = market_today() - timedelta(days=1)
+        first = last - timedelta(days=options['days'])
+
+        started = time.perf_counter()
+        data = load_market_data(symbols, first, last)
+        self.stdout.write(f"Loaded {len(data.symbols)} symbols x {len(data.days)} days in {time.perf_counter() - started:.2f}s "
+                          "(the first run also fills the bar store).")
+
+        strategy = Strategy(risk_tolerance='medium', diversification_level=3)
+        rules = strategy_rules(strategy, rebalance_days=options['rebalance_days'])
+        started = time.perf_counter()
+        result = simulate(data, rules)
+        if result is None:
+            self.stderr.write("Not enough price history for the requested period.")
+            return
+        self.stdout.write(f"One backtest, {result['summary']['rebalances']} rebalances: {time.perf_counter() - started:.3f}s "
+                          f"(total return {result['summary']['total_return']:.2f}%).")
+
+        grid = parameter_grid(rules, {
+            'risk_tolerance': list(RISK_PENALTY),
+            'diversification_level': [1, 2, 3, 5, 7, 10],
+            'rebalance_days': [1, 5, 21],
+        })
+        started = time.perf_counter()
+        run_backtests(data, grid, processes=1)
+        serial = time.perf_counter() - started
+        started = time.perf_counter()
+        run_backtests(data, grid, processes=options['processes'])
+        pooled = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{len(grid)} backtests: {serial:.2f}s serially, {pooled:.2f}s on the process pool."))
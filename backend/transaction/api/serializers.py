@@ -1,7 +1,11 @@
 from decimal import Decimal
 from rest_framework import serializers
 from transaction.models import Transaction
-from finance.helpers import get_stock_price, get_stock_info 
+from django.utils import timezone
+from finance.barstore import market_today
+from finance.helpers import get_stock_close, get_stock_price
+from finance.securities import get_security
+from transaction.imports import FORMATS
 
 class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,18 +15,37 @@ class TransactionSerializer(serializers.ModelSerializer):
 class TransactionCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
-        fields = ['portfolio', 'transaction_type', 'symbol', 'quantity']
-        read_only_fields = ['id', 'transaction_date', 'price_per_unit', 'total_cost', 'name']
+        fields = ['portfolio', 'transaction_type', 'symbol', 'quantity', 'transaction_date']
+        read_only_fields = ['id', 'price_per_unit', 'total_cost', 'name']
+        extra_kwargs = {'transaction_date': {'required': False}}
+
+    def validate_transaction_date(self, value):
+        if value > timezone.now():
+            raise serializers.ValidationError("Transaction date cannot be in the future.")
+        return value
 
     def create(self, validated_data):
         symbol = validated_data.get('symbol')
-        price = get_stock_price(symbol)
-        if price is None:
-            raise serializers.ValidationError(f"Unable to fetch stock price for symbol: {symbol}")
+        transaction_date = validated_data.get('transaction_date')
+        day = timezone.localdate(transaction_date) if transaction_date else None
+        if day is not None and day < market_today():
+            # Backdated: the close of that day from the local bar store, not today's live price.
+            price = get_stock_close(symbol, day)
+            if price is None:
+                raise serializers.ValidationError(f"No closing price for symbol {symbol} on {day}")
+        else:
+            price = get_stock_price(symbol)
+            if price is None:
+                raise serializers.ValidationError(f"Unable to fetch stock price for symbol: {symbol}")
 
         validated_data['price_per_unit'] = Decimal(str(price))
 
-        info = get_stock_info(symbol)
-        validated_data['name'] = info.get('shortName') or symbol
+        validated_data['name'] = get_security(symbol).name
+
+        return super().create(validated_data)
 
-        return super().create(validated_data)
\ No newline at end of file
+class TransactionImportSerializer(serializers.Serializer):
+    portfolio = serializers.IntegerField()
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False, help_text="Inferred from the file name by default.")
+    skip_invalid = serializers.BooleanField(required=False, default=False)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import (transaction_create)
+from .views import (transaction_create, transaction_import)
 
 urlpatterns = [
     path('transact/', transaction_create, name='transaction-create'),
+    path('import/', transaction_import, name='transaction-import'),
 ]
\ No newline at end of file
@@ -4,8 +4,10 @@ from rest_framework import status, permissions
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.authentication import TokenAuthentication
 from django.shortcuts import get_object_or_404
-from .serializers import TransactionCreateSerializer, TransactionSerializer
+import codecs
+from .serializers import TransactionCreateSerializer, TransactionSerializer, TransactionImportSerializer
 from portfolio.models import Portfolio
+from transaction.imports import import_format, import_transactions
 
 @api_view(['POST'])
 @authentication_classes([TokenAuthentication])
@@ -16,4 +18,34 @@ def transaction_create(request):
     if serializer.is_valid():
         serializer.save(portfolio=portfolio)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def transaction_import(request):
+    """
+    Bulk import of trades from an uploaded CSV (with a header row) or NDJSON file (multipart/form-data).
+    Columns: transaction_type, symbol, quantity, price_per_unit and transaction_date (see
+    transaction.imports.COLUMN_ALIASES for the broker export names accepted). Without a price the
+    close of the trade date is used. A file with invalid rows imports nothing unless skip_invalid is set.
+    URL: /transaction/import/
+    """
+    query = TransactionImportSerializer(data=request.data)
+    if not query.is_valid():
+        return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    portfolio = get_object_or_404(Portfolio, id=query.validated_data['portfolio'])
+    if portfolio.account.pk != request.user.pk:
+        return Response({"detail": "Not authorized."}, status=status.HTTP_403_FORBIDDEN)
+
+    upload = query.validated_data['file']
+    result = import_transactions(
+        portfolio,
+        codecs.iterdecode(upload, 'utf-8-sig'),
+        format=import_format(upload.name, query.validated_data.get('format')),
+        skip_invalid=query.validated_data['skip_invalid'],
+    )
+    if result.error_count and not result.committed:
+        return Response(result.as_dict(), status=status.HTTP_400_BAD_REQUEST)
+    return Response(result.as_dict(), status=status.HTTP_201_CREATED)
@@ -0,0 +1,290 @@
+import csv
+import json
+import time
+from datetime import datetime, time as clock
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from finance.helpers import get_stock_closes
+from finance.securities import get_securities
+from portfolio.signals import sync_bulk_created
+from transaction.models import Transaction
+
+IMPORT_DEFAULTS = {
+    'CHUNK_ROWS': 2000,
+    'MAX_REPORTED_ERRORS': 1000,
+}
+FORMATS = ('csv', 'ndjson')
+
+# Column names of common broker exports -> Transaction field.
+COLUMN_ALIASES = {
+    'transaction_type': 'transaction_type', 'type': 'transaction_type', 'action': 'transaction_type', 'side': 'transaction_type',
+    'symbol': 'symbol', 'ticker': 'symbol', 'instrument': 'symbol',
+    'quantity': 'quantity', 'qty': 'quantity', 'shares': 'quantity', 'units': 'quantity',
+    'price_per_unit': 'price_per_unit', 'price': 'price_per_unit', 'unit_price': 'price_per_unit', 'trade_price': 'price_per_unit',
+    'transaction_date': 'transaction_date', 'date': 'transaction_date', 'trade_date': 'transaction_date', 'time': 'transaction_date',
+    'name': 'name', 'description': 'name', 'security': 'name',
+}
+TYPE_ALIASES = {
+    'buy': 'buy', 'bought': 'buy', 'purchase': 'buy',
+    'sell': 'sell', 'sold': 'sell', 'sale': 'sell',
+    'dividend': 'dividend', 'div': 'dividend',
+}
+DATE_FORMATS = ('%m/%d/%Y', '%d.%m.%Y', '%Y/%m/%d')
+QUANTITY_LIMIT = Decimal(10) ** 12
+PLACES = Decimal('0.00000001')
+
+
+def import_settings():
+    return {**IMPORT_DEFAULTS, **getattr(settings, 'TRANSACTION_IMPORT', {})}
+
+
+def import_format(filename, requested=None):
+    if requested:
+        return requested
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+class ImportResult:
+    """
+    Outcome of an import: row counts, the row-level error report (the first
+    MAX_REPORTED_ERRORS of error_count errors) and the time taken.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.errors = []
+        self.error_count = 0
+        self.elapsed = 0.0
+        self.committed = False
+
+    def error(self, row, errors):
+        self.error_count += 1
+        if len(self.errors) < import_settings()['MAX_REPORTED_ERRORS']:
+            self.errors.append({"row": row, "errors": errors})
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "committed": self.committed,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "rows_per_second": self.rows_per_second,
+        }
+
+
+def _csv_rows(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _ndjson_rows(lines):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None
+            continue
+        yield number, row if isinstance(row, dict) else None
+
+
+def _decimal(value):
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    return Decimal(str(value).strip().replace('$', '').replace(',', ''))
+
+
+def _date(value):
+    if isinstance(value, (int, float)):
+        raise ValueError
+    value = str(value).strip()
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            for date_format in DATE_FORMATS:
+                try:
+                    day = datetime.strptime(value, date_format).date()
+                    break
+                except ValueError:
+                    continue
+        if day is None:
+            raise ValueError
+        moment = datetime.combine(day, clock.min)
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+def parse_row(row):
+    """
+    Validates one input row ({column: value}, header names as in
+    COLUMN_ALIASES). Returns (fields, errors); the price is None when it has to
+    be looked up.
+    """
+    values = {}
+    for column, value in row.items():
+        field = COLUMN_ALIASES.get(str(column or '').strip().lower().replace(' ', '_'))
+        if field and value not in (None, '') and field not in values:
+            values[field] = value
+
+    fields, errors = {}, {}
+    transaction_type = TYPE_ALIASES.get(str(values.get('transaction_type', '')).strip().lower())
+    if transaction_type is None:
+        errors['transaction_type'] = f"Expected one of {', '.join(sorted(set(TYPE_ALIASES.values())))}."
+    fields['transaction_type'] = transaction_type
+
+    symbol = str(values.get('symbol', '')).strip().upper()
+    if not symbol or len(symbol) > 50 or '\x00' in symbol:
+        errors['symbol'] = "A symbol of at most 50 characters is required."
+    fields['symbol'] = symbol
+
+    try:
+        quantity = _decimal(values['quantity']).quantize(PLACES)
+        # Exports often list sells as negative quantities.
+        if quantity < 0 and transaction_type == 'sell':
+            quantity = -quantity
+        if not 0 < quantity < QUANTITY_LIMIT:
+            raise ValueError
+        fields['quantity'] = quantity
+    except (KeyError, ValueError, InvalidOperation):
+        errors['quantity'] = "A positive number is required."
+
+    fields['price_per_unit'] = None
+    if 'price_per_unit' in values:
+        try:
+            price = _decimal(values['price_per_unit']).quantize(PLACES)
+            if not 0 < price < QUANTITY_LIMIT:
+                raise ValueError
+            fields['price_per_unit'] = price
+        except (ValueError, InvalidOperation):
+            errors['price_per_unit'] = "Must be a positive number."
+    elif transaction_type == 'dividend':
+        errors['price_per_unit'] = "Required for dividends."
+
+    fields['transaction_date'] = timezone.now()
+    if 'transaction_date' in values:
+        try:
+            fields['transaction_date'] = _date(values['transaction_date'])
+        except ValueError:
+            errors['transaction_date'] = "Expected a date (YYYY-MM-DD, MM/DD/YYYY) or an ISO 8601 datetime."
+        else:
+            if fields['transaction_date'] > timezone.now():
+                errors['transaction_date'] = "Transaction date cannot be in the future."
+
+    fields['name'] = str(values.get('name', '')).replace('\x00', '').strip()[:255]
+    return fields, errors
+
+
+def _historical_closes(pending):
+    """
+    Fills in the price of the (row number, fields) pairs from the close of
+    each symbol on the transaction's date (see get_stock_closes). Returns the
+    row numbers without a close.
+    """
+    keys = [(fields['symbol'], timezone.localdate(fields['transaction_date'])) for _, fields in pending]
+    closes = get_stock_closes(keys)
+    missing = []
+    for (number, fields), key in zip(pending, keys):
+        if closes[key] is None:
+            missing.append(number)
+            continue
+        fields['price_per_unit'] = Decimal(str(closes[key])).quantize(PLACES)
+    return missing
+
+
+def _save_chunk(portfolio, chunk, names, result):
+    pending = [(number, fields) for number, fields in chunk if fields['price_per_unit'] is None]
+    failed = set(_historical_closes(pending)) if pending else set()
+    for number in sorted(failed):
+        result.error(number, {"price_per_unit": "No price given and no close found for that date."})
+    chunk = [(number, fields) for number, fields in chunk if number not in failed]
+
+    unnamed = {fields['symbol'] for _, fields in chunk if not fields['name'] and fields['symbol'] not in names}
+    if unnamed:
+        names.update((symbol, security.name) for symbol, security in get_securities(sorted(unnamed)).items())
+
+    transactions = [
+        Transaction(
+            portfolio=portfolio,
+            transaction_type=fields['transaction_type'],
+            name=fields['name'] or names[fields['symbol']],
+            symbol=fields['symbol'],
+            quantity=fields['quantity'],
+            price_per_unit=fields['price_per_unit'],
+            total_cost=fields['quantity'] * fields['price_per_unit'],
+            transaction_date=fields['transaction_date'],
+        )
+        for _, fields in chunk
+    ]
+    if transactions:
+        Transaction.objects.bulk_create(transactions, batch_size=import_settings()['CHUNK_ROWS'])
+        sync_bulk_created(transactions)
+    result.imported += len(transactions)
+
+
+def import_transactions(portfolio, lines, format='csv', skip_invalid=False):
+    """
+    Imports trades into `portfolio` from an iterable of text lines (a CSV file
+    with a header row, or NDJSON with one object per line).
+
+    Rows are parsed as they are read and saved CHUNK_ROWS at a time with
+    bulk_create, all inside one database transaction. Missing prices are
+    taken from the bar store's close on the trade date, and names from the
+    security master for the distinct symbols only. By default a file with any
+    invalid row imports nothing; with skip_invalid the valid rows are kept.
+    The ImportResult reports every invalid row. A file that cannot be read to
+    the end (not UTF-8, or not parseable as CSV) imports nothing and is
+    reported as an error on the first line that could not be read.
+    """
+    started = time.perf_counter()
+    result = ImportResult()
+    chunk_rows = import_settings()['CHUNK_ROWS']
+    rows = _ndjson_rows(lines) if format == 'ndjson' else _csv_rows(lines)
+    names = {}
+    chunk = []
+    number = 0
+    with db_transaction.atomic():
+        try:
+            for number, row in rows:
+                result.rows += 1
+                if row is None:
+                    result.error(number, {"row": "Not a JSON object."})
+                    continue
+                fields, errors = parse_row(row)
+                if errors:
+                    result.error(number, errors)
+                    continue
+                if result.error_count and not skip_invalid:
+                    # Nothing will be kept; only validate the rest for the report.
+                    chunk = []
+                    continue
+                chunk.append((number, fields))
+                if len(chunk) >= chunk_rows:
+                    _save_chunk(portfolio, chunk, names, result)
+                    chunk = []
+        except (UnicodeDecodeError, csv.Error) as exc:
+            reason = "The file is not UTF-8 text." if isinstance(exc, UnicodeDecodeError) else f"Unreadable CSV: {exc}."
+            result.error(number + 1, {"file": reason})
+            # The rest of the file is lost, so none of it is kept.
+            chunk, skip_invalid = [], False
+        if chunk and (skip_invalid or not result.error_count):
+            _save_chunk(portfolio, chunk, names, result)
+        if result.error_count and not skip_invalid:
+            db_transaction.set_rollback(True)
+            result.imported = 0
+        result.committed = bool(result.imported)
+    result.elapsed = time.perf_counter() - started
+    return result
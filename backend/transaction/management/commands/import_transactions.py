@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.models import Portfolio
+from transaction.imports import FORMATS, import_format, import_transactions
+
+
+class Command(BaseCommand):
+    help = ("Import trades into a portfolio from a CSV (with a header row) or NDJSON file. "
+            "A file with invalid rows imports nothing unless --skip-invalid is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('portfolio', type=int, help="Id of the portfolio to import into.")
+        parser.add_argument('path', help="File to import.")
+        parser.add_argument('--format', choices=FORMATS, help="Inferred from the file name by default.")
+        parser.add_argument('--skip-invalid', action='store_true', help="Import the valid rows even if some are invalid.")
+
+    def handle(self, *args, **options):
+        try:
+            portfolio = Portfolio.objects.get(pk=options['portfolio'])
+        except Portfolio.DoesNotExist:
+            raise CommandError(f"Portfolio {options['portfolio']} does not exist.")
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+            result = import_transactions(
+                portfolio, lines, format=import_format(options['path'], options['format']), skip_invalid=options['skip_invalid'],
+            )
+
+        for error in result.errors:
+            details = '; '.join(f"{field}: {message}" for field, message in error['errors'].items())
+            self.stderr.write(f"row {error['row']}: {details}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more invalid row(s).")
+        summary = (f"Read {result.rows} row(s) in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s); "
+                   f"{result.imported} transaction(s) imported, {result.error_count} invalid row(s).")
+        if result.error_count and not result.committed:
+            raise CommandError(summary + " Nothing was imported; fix the file or use --skip-invalid.")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.utils import timezone
 from portfolio.models import Portfolio
 
@@ -17,10 +17,18 @@ class Transaction(models.Model):
     price_per_unit = models.DecimalField(max_digits=20, decimal_places=8, help_text="Price per unit at the time of transaction.")
     total_cost = models.DecimalField(max_digits=20, decimal_places=8, help_text="Total cost of the transaction.")
     transaction_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['portfolio', 'transaction_date'], name='transaction_portfolio_date'),
+            models.Index(fields=['portfolio', 'symbol'], name='transaction_portfolio_symbol'),
+        ]
     
     def save(self, *args, **kwargs):
         self.total_cost = self.quantity * self.price_per_unit
-        super().save(*args, **kwargs)
+        # Materialized positions are updated from post_save inside the same DB transaction.
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.transaction_type.capitalize()} {self.quantity} {self.name} at {self.price_per_unit}"
\ No newline at end of file
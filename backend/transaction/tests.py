@@ -1,3 +1,142 @@
-from django.test import TestCase
+import io
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from account.models import Account
+from portfolio.models import Portfolio
+from portfolio.positions import verify_position
+from strategy.models import Strategy
+from transaction.imports import import_transactions, parse_row
+from transaction.models import Transaction
+
+
+def csv_lines(rows, header='type,symbol,quantity,price,date,name'):
+    return io.StringIO('\n'.join([header, *rows]) + '\n')
+
+
+class ImportTransactionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user('import@example.com', 'password')
+        cls.strategy = Strategy.objects.create(
+            account=cls.account, name='Import', target_return=Decimal('5'),
+            investment_horizon=5, diversification_level=5,
+        )
+
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(
+            name='i', description='', account=self.account, strategy=self.strategy,
+        )
+
+    def test_invalid_row_imports_nothing(self):
+        result = import_transactions(self.portfolio, csv_lines([
+            'buy,AAPL,10,150,2024-01-02,Apple',
+            'buy,AAPL,-3,150,2024-01-03,Apple',
+            'sell,AAPL,4,160,2024-01-04,Apple',
+        ]))
+        self.assertFalse(result.committed)
+        self.assertEqual(result.imported, 0)
+        self.assertEqual([error['row'] for error in result.errors], [3])
+        self.assertFalse(Transaction.objects.filter(portfolio=self.portfolio).exists())
+        self.assertFalse(self.portfolio.positions.exists())
+
+    def test_skip_invalid_keeps_valid_rows(self):
+        result = import_transactions(self.portfolio, csv_lines([
+            'buy,AAPL,10,150,2024-01-02,Apple',
+            'hold,AAPL,1,150,2024-01-03,Apple',
+            'sell,AAPL,4,160,2024-01-04,Apple',
+        ]), skip_invalid=True)
+        self.assertTrue(result.committed)
+        self.assertEqual(result.imported, 2)
+        self.assertEqual(result.error_count, 1)
+        self.assertEqual(self.portfolio.positions.get(symbol='AAPL').quantity, Decimal(6))
+
+    def test_future_date_is_rejected(self):
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        _, errors = parse_row({'type': 'buy', 'symbol': 'AAPL', 'quantity': '1', 'price': '10', 'date': tomorrow})
+        self.assertIn('transaction_date', errors)
+
+    def test_missing_price_uses_close_of_the_date(self):
+        closes = {('AAPL', datetime(2024, 1, 2).date()): 185.64, ('MSFT', datetime(2024, 1, 3).date()): None}
+        with mock.patch('transaction.imports.get_stock_closes', lambda keys: {key: closes[key] for key in keys}):
+            result = import_transactions(self.portfolio, csv_lines([
+                'buy,AAPL,2,,2024-01-02,Apple',
+                'buy,MSFT,1,,2024-01-03,Microsoft',
+            ]), skip_invalid=True)
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([error['row'] for error in result.errors], [3])
+        tx = Transaction.objects.get(portfolio=self.portfolio)
+        self.assertEqual(tx.price_per_unit, Decimal('185.64'))
+        self.assertEqual(tx.total_cost, Decimal('371.28'))
+
+    @override_settings(TRANSACTION_IMPORT={'CHUNK_ROWS': 25})
+    def test_chunks_dated_out_of_order(self):
+        """
+        Later chunks hold trades dated before earlier ones, so each chunk's
+        position update has to rebuild the FIFO lots instead of appending.
+        """
+        rng = random.Random(3)
+        start = datetime(2023, 1, 2, 15, tzinfo=dt_timezone.utc)
+        rows = []
+        for i in range(200):
+            symbol = rng.choice(['AAPL', 'MSFT', 'VTI'])
+            kind = rng.choices(['buy', 'sell', 'dividend'], weights=[5, 3, 1])[0]
+            when = start + timedelta(days=rng.randint(0, 400), minutes=i)
+            rows.append(f'{kind},{symbol},{rng.randint(1, 40)},{rng.randint(50, 500)}.25,{when.isoformat()},{symbol}')
+        rng.shuffle(rows)
+        result = import_transactions(self.portfolio, csv_lines(rows))
+        self.assertTrue(result.committed)
+        self.assertEqual(result.imported, 200)
+        for symbol in ['AAPL', 'MSFT', 'VTI']:
+            with self.subTest(symbol=symbol):
+                self.assertEqual(verify_position(self.portfolio.pk, symbol), [])
+
+
+class ImportUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create_user('upload@example.com', 'password')
+        cls.strategy = Strategy.objects.create(
+            account=cls.account, name='Upload', target_return=Decimal('5'),
+            investment_horizon=5, diversification_level=5,
+        )
+        cls.portfolio = Portfolio.objects.create(name='u', description='', account=cls.account, strategy=cls.strategy)
+        cls.token = Token.objects.create(user=cls.account)
+
+    def upload(self, content, name='trades.csv', **options):
+        return self.client.post(
+            reverse('transaction-import'),
+            {'portfolio': self.portfolio.pk, 'file': SimpleUploadedFile(name, content), **options},
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+
+    def test_non_utf8_file_is_rejected(self):
+        content = 'type,symbol,quantity,price,date,name\nbuy,AAPL,1,150,2024-01-02,Soci\xe9t\xe9\n'.encode('latin-1')
+        response = self.upload(content, skip_invalid=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['committed'])
+        self.assertEqual(response.json()['errors'][0]['row'], 1)
+        self.assertIn('file', response.json()['errors'][0]['errors'])
+        self.assertFalse(Transaction.objects.filter(portfolio=self.portfolio).exists())
+
+    def test_unparseable_csv_is_rejected(self):
+        content = 'type,symbol,quantity,price,date,name\nbuy,AAPL,1,150,2024-01-02,Apple\nbuy,MSFT,1,400,2024-01-03,"{}"\n'.format('x' * 200_000)
+        response = self.upload(content.encode(), skip_invalid=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['row'], 3)
+        self.assertFalse(Transaction.objects.filter(portfolio=self.portfolio).exists())
+
+    def test_nul_characters_are_a_row_error(self):
+        content = b'type,symbol,quantity,price,date,name\nbuy,AA\x00PL,1,150,2024-01-02,Apple\n'
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [{'row': 2, 'errors': {'symbol': mock.ANY}}])